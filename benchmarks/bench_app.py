@@ -0,0 +1,299 @@
+"""
+Offline load test of the whole service: /sms, /gmail and /chat end to end.
+
+The app runs in-process behind httpx's ASGI transport with its real
+lifespan, but every external dependency is replaced: OpenAI by
+benchmarks.fake_openai (scripted replies after --llm-latency-ms), Google
+Sheets by the local JSON stand-in and Twilio/Gmail by fake dispatcher
+transports. Virtual users (--concurrency) play the scripted PRIVATE_PAY,
+INSURANCE_CASE_MANAGERS and DISCHARGE conversations from
+benchmarks.scenarios, spread round-robin over the channels.
+
+A turn is timed from the webhook request until the reply reaches the fake
+SMS/email transport, or until the /chat stream ends. The report has
+p50/p95/p99 turn latency and turns/sec per channel, per-node latency and
+LLM call counts from /metrics, and the fake server's calls per prompt.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_app --conversations 60 --concurrency 20
+    python -m benchmarks.bench_app --mode fused --fast-ack --caches
+"""
+
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument("--conversations", type=int, default=30)
+parser.add_argument("--concurrency", type=int, default=10)
+parser.add_argument("--channels", default="sms,gmail,chat")
+parser.add_argument(
+    "--scenarios", default="PRIVATE_PAY,INSURANCE_CASE_MANAGERS,DISCHARGE"
+)
+parser.add_argument("--mode", choices=["standard", "fused"], default="standard")
+parser.add_argument("--llm-latency-ms", type=float, default=300)
+parser.add_argument("--token-latency-ms", type=float, default=5)
+parser.add_argument("--send-latency-ms", type=float, default=50)
+parser.add_argument("--debounce", type=float, default=0.0)
+parser.add_argument("--fast-ack", action="store_true", help="set SMS_FAST_ACK")
+parser.add_argument("--caches", action="store_true", help="enable the LLM caches")
+parser.add_argument(
+    "--repeat-messages",
+    action="store_true",
+    help="send identical messages in every conversation (cache hits)",
+)
+parser.add_argument("--timeout", type=float, default=60, help="seconds per turn")
+parser.add_argument("--port", type=int, default=8765, help="fake OpenAI port")
+parser.add_argument("--verbose", action="store_true", help="show the app's logs")
+args = parser.parse_args()
+
+import os
+
+# The app reads its settings at import time, so configure it first.
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("LOCAL_SHEETS_PATH", "data/bench_sheets.json")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+os.environ["DISPATCH_TRANSPORT"] = "fake"
+os.environ["TWILIO_MPS"] = "0"
+os.environ["EMAIL_MPS"] = "0"
+os.environ["SMS_VALIDATE_SIGNATURE"] = "false"
+os.environ["SMS_FAST_ACK"] = str(args.fast_ack).lower()
+os.environ["INBOUND_DEBOUNCE"] = str(args.debounce)
+os.environ["WORKFLOW_MODE"] = args.mode
+os.environ["LLM_CACHE_ENABLED"] = str(args.caches).lower()
+os.environ["INTENT_CACHE_ENABLED"] = str(args.caches).lower()
+os.environ["OPENAI_API_KEY"] = "bench"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+os.environ["OPENAI_API_BASE"] = os.environ["OPENAI_BASE_URL"]
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+
+import asyncio
+import contextlib
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+import httpx
+from benchmarks import fake_openai
+from benchmarks.scenarios import SCENARIOS, with_reference
+
+fake_openai.FakeOpenAIConfig.latency = args.llm_latency_ms / 1000
+fake_openai.FakeOpenAIConfig.token_latency = args.token_latency_ms / 1000
+fake_openai.start_in_thread(args.port)
+
+import main
+from core.dispatcher import FakeTransport, dispatcher
+from core.workflow import get_conversation
+
+ERROR_REPLY = "encountered an error"
+COMPLETION_REPLIES = ("Thanks!", "Thank you!", "Got it!")
+METRIC_LINE = re.compile(r"^(\w+)\{([^}]*)\} ([0-9.e+-]+)$")
+
+
+class SinkTransport(FakeTransport):
+    """Fake transport that hands each delivered reply to the waiting user."""
+
+    def __init__(self, latency: float):
+        super().__init__(latency)
+        self.replies = defaultdict(asyncio.Queue)
+
+    async def send(self, message):
+        result = await super().send(message)
+        self.replies[message.to].put_nowait(message.body)
+        return result
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.completed = defaultdict(int)
+
+
+async def sms_turn(client, sink, contact, message):
+    response = await client.post("/sms/", data={"From": contact, "Body": message})
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return await sink.replies[contact].get()
+
+
+async def gmail_turn(client, sink, contact, message):
+    payload = {
+        "data": {
+            "preview": {"body": message},
+            "sender": f"Bench User <{contact}>",
+        }
+    }
+    response = await client.post("/gmail/", json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return await sink.replies[contact].get()
+
+
+async def run_conversation(client, sinks, results, index, channel, scenario):
+    contact = f"+1555{index:07d}" if channel == "sms" else f"bench{index}@example.com"
+    reference = None if args.repeat_messages else index
+    history = []
+    reply = ""
+    for message, _ in SCENARIOS[scenario]["turns"]:
+        message = with_reference(message, reference)
+        started = time.perf_counter()
+        try:
+            if channel == "chat":
+                history.append({"role": "user", "content": message})
+                response = await asyncio.wait_for(
+                    client.post("/chat/", json={"messages": history}), args.timeout
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"HTTP {response.status_code}: {response.text[:200]}"
+                    )
+                reply = response.text
+                history.append({"role": "assistant", "content": reply})
+            else:
+                turn = sms_turn if channel == "sms" else gmail_turn
+                reply = await asyncio.wait_for(
+                    turn(client, sinks[channel], contact, message), args.timeout
+                )
+            if ERROR_REPLY in reply:
+                raise RuntimeError(reply)
+        except Exception as e:
+            results.errors[channel] += 1
+            print(f"{channel} conversation {index} failed: {e!r}", file=sys.stderr)
+            return
+        results.latencies[channel].append(time.perf_counter() - started)
+    if channel == "chat":
+        # /chat replaces the final JSON summary with a confirmation line.
+        finished = reply.lstrip().startswith(COMPLETION_REPLIES)
+    else:
+        # Ended conversations have their checkpoint deleted.
+        finished = await get_conversation(channel, contact) is None
+    if finished:
+        results.completed[channel] += 1
+
+
+async def virtual_user(client, sinks, results, work):
+    while work:
+        index, channel, scenario = work.pop()
+        await run_conversation(client, sinks, results, index, channel, scenario)
+
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def parse_metrics(text):
+    """{metric name: [(labels dict, value)]} from the Prometheus exposition."""
+    series = defaultdict(list)
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            labels = dict(re.findall(r'(\w+)="([^"]*)"', labels))
+            series[name].append((labels, float(value)))
+    return series
+
+
+def by_label(series, name, label):
+    totals = defaultdict(float)
+    for labels, value in series.get(name, []):
+        totals[labels.get(label, "")] += value
+    return totals
+
+
+def report(results, elapsed, metrics_text):
+    print(
+        f"\nmode={args.mode} fast_ack={args.fast_ack} caches={args.caches} "
+        f"llm_latency={args.llm_latency_ms:.0f}ms concurrency={args.concurrency} "
+        f"conversations={args.conversations}"
+    )
+    print(
+        f"{'channel':<8}{'turns':>7}{'errors':>8}{'done':>6}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'turns/s':>10}"
+    )
+    all_latencies = []
+    for channel in args.channels.split(","):
+        latencies = results.latencies[channel]
+        all_latencies.extend(latencies)
+        print(
+            f"{channel:<8}{len(latencies):>7}{results.errors[channel]:>8}"
+            f"{results.completed[channel]:>6}"
+            f"{percentile(latencies, 50) * 1000:>10.0f}"
+            f"{percentile(latencies, 95) * 1000:>10.0f}"
+            f"{percentile(latencies, 99) * 1000:>10.0f}"
+            f"{len(latencies) / elapsed:>10.2f}"
+        )
+    print(
+        f"{'all':<8}{len(all_latencies):>7}{sum(results.errors.values()):>8}"
+        f"{sum(results.completed.values()):>6}"
+        f"{percentile(all_latencies, 50) * 1000:>10.0f}"
+        f"{percentile(all_latencies, 95) * 1000:>10.0f}"
+        f"{percentile(all_latencies, 99) * 1000:>10.0f}"
+        f"{len(all_latencies) / elapsed:>10.2f}"
+    )
+
+    series = parse_metrics(metrics_text)
+    node_counts = by_label(series, "intake_node_duration_seconds_count", "node")
+    node_sums = by_label(series, "intake_node_duration_seconds_sum", "node")
+    llm_calls = by_label(series, "llm_request_duration_seconds_count", "node")
+    print(f"\n{'node':<26}{'runs':>7}{'mean ms':>10}{'llm calls':>11}")
+    for node in sorted(node_counts):
+        mean = node_sums[node] / node_counts[node] * 1000 if node_counts[node] else 0
+        print(
+            f"{node:<26}{node_counts[node]:>7.0f}{mean:>10.1f}"
+            f"{llm_calls.get(node, 0):>11.0f}"
+        )
+
+    calls = fake_openai.FakeOpenAIConfig.calls
+    tokens = fake_openai.FakeOpenAIConfig.prompt_tokens
+    print(f"\n{'fake OpenAI prompt':<26}{'calls':>7}{'prompt tokens':>15}")
+    for kind in sorted(calls):
+        print(f"{kind:<26}{calls[kind]:>7}{tokens[kind]:>15}")
+    turns = len(all_latencies)
+    if turns:
+        print(f"LLM calls per turn: {sum(calls.values()) / turns:.2f}")
+
+
+async def run():
+    sinks = {
+        "sms": SinkTransport(args.send_latency_ms / 1000),
+        "gmail": SinkTransport(args.send_latency_ms / 1000),
+    }
+    dispatcher.transports = {"sms": sinks["sms"], "email": sinks["gmail"]}
+    channels = args.channels.split(",")
+    scenarios = args.scenarios.split(",")
+    work = [
+        (
+            index,
+            channels[index % len(channels)],
+            scenarios[(index // len(channels)) % len(scenarios)],
+        )
+        for index in range(args.conversations)
+    ]
+    work.reverse()
+    results = Results()
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=args.timeout
+        ) as client:
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    virtual_user(client, sinks, results, work)
+                    for _ in range(args.concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - started
+            metrics_text = (await client.get("/metrics")).text
+    return results, elapsed, metrics_text
+
+
+if __name__ == "__main__":
+    app_logs = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(app_logs):
+        results, elapsed, metrics_text = asyncio.run(run())
+    report(results, elapsed, metrics_text)
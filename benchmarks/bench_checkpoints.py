@@ -0,0 +1,94 @@
+"""
+Conversation checkpoints: what a turn pays to persist its state in SQLite.
+
+"write-through" commits every checkpoint as it is put, which is what a
+plain SQLite checkpointer does with the several checkpoints a turn makes.
+"write-behind" is core.checkpoints.SQLiteCheckpointSaver: ``put`` only
+serializes the state into memory and the flusher thread commits the latest
+checkpoint of every dirty thread in one transaction. --threads conversations
+each put --puts-per-turn checkpoints of a realistic state per turn; the
+table shows the time spent in ``put`` per turn (the latency a reply would
+wait on) and how many rows and commits reached the database.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_checkpoints --threads 500 --turns 8
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from core.checkpoints import SQLiteCheckpointSaver
+
+
+def make_state(thread: int, turn: int) -> dict:
+    messages = []
+    for i in range(turn + 1):
+        messages.append(("user", f"Message {i} from contact {thread} " * 4))
+        messages.append(("assistant", "Could you tell me the pick-up address?"))
+    return {
+        "messages": messages,
+        "contact_info": f"+1555{thread:07d}",
+        "channel": "sms",
+        "intent": "PRIVATE_PAY",
+        "required_fields": ["patient_name", "weight", "pickup_address"],
+        "collected_fields": {"patient_name": "Jane Doe", "weight": "150"},
+        "status": "in_progress",
+    }
+
+
+def run(mode: str, path: str, threads: int, turns: int, puts_per_turn: int):
+    saver = SQLiteCheckpointSaver(86400, path, 0.2)
+    turn_seconds = []
+    checkpoint = empty_checkpoint()
+    started = time.perf_counter()
+    for turn in range(turns):
+        for thread in range(threads):
+            config = {"configurable": {"thread_id": f"sms:{thread}"}}
+            state = make_state(thread, turn)
+            turn_started = time.perf_counter()
+            for step in range(puts_per_turn):
+                checkpoint = create_checkpoint(checkpoint, None, step)
+                checkpoint["channel_values"] = state
+                config = saver.put(config, checkpoint, {"step": step}, {})
+                if mode == "write-through":
+                    saver.flush()
+            turn_seconds.append(time.perf_counter() - turn_started)
+    saver.close()
+    elapsed = time.perf_counter() - started
+    return turn_seconds, elapsed, saver.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--puts-per-turn", type=int, default=6)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<15}{'turn p50 us':>12}{'turn p95 us':>12}{'wall s':>8}"
+        f"{'rows':>8}{'commits':>9}"
+    )
+    for mode in ("write-through", "write-behind"):
+        with tempfile.TemporaryDirectory() as directory:
+            turn_seconds, elapsed, stats = run(
+                mode,
+                os.path.join(directory, "checkpoints.sqlite3"),
+                args.threads,
+                args.turns,
+                args.puts_per_turn,
+            )
+        p50 = statistics.median(turn_seconds) * 1e6
+        p95 = statistics.quantiles(turn_seconds, n=100)[94] * 1e6
+        print(
+            f"{mode:<15}{p50:>12.0f}{p95:>12.0f}{elapsed:>8.2f}"
+            f"{stats['rows_written']:>8}{stats['flushes']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
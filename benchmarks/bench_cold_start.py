@@ -0,0 +1,162 @@
+"""
+Cold start: import time of the app and time until a fresh server answers.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters and
+summarizes the report: wall time, time spent importing ``main`` and the
+top-level packages that cost the most (self time summed over their
+submodules). Then starts uvicorn once per STARTUP_PREWARM mode and measures
+the time from spawning the process to the first successful /metrics
+response. Sheets use the local stand-in and replies the fake transports, so
+no network is needed.
+
+With --output the results are appended as one JSON line (with the git
+revision), so cold start can be tracked from commit to commit.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start --runs 5 --output data/cold_start.jsonl
+"""
+
+from collections import defaultdict
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.setdefault("SHEETS_BACKEND", "local")
+    env.setdefault("LOCAL_SHEETS_PATH", "data/bench_sheets.json")
+    env.setdefault("SHEETS_OUTBOX_PATH", "")
+    env.setdefault("DISPATCH_TRANSPORT", "fake")
+    return env
+
+
+def profile_import(env: dict):
+    """Wall time, ``main``'s cumulative import time and self time per package."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"import main failed:\n{result.stderr[-2000:]}")
+    main_us = 0
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        packages[module.split(".")[0]] += int(self_us)
+        if module == "main" and len(indent) <= 1:
+            main_us = int(cumulative_us)
+    return wall, main_us / 1e6, packages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(env: dict, prewarm: str, timeout: float = 60) -> float:
+    """Seconds from spawning uvicorn until /metrics answers 200."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env={**env, "STARTUP_PREWARM": prewarm},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/metrics", timeout=1
+                ) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"server not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_revision() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+    )
+    return result.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--prewarm-modes", default="off,background,blocking")
+    parser.add_argument("--output", help="append the results to this JSON-lines file")
+    args = parser.parse_args()
+    env = bench_env()
+
+    walls, imports = [], []
+    packages = defaultdict(list)
+    for _ in range(args.runs):
+        wall, import_seconds, run_packages = profile_import(env)
+        walls.append(wall)
+        imports.append(import_seconds)
+        for package, self_us in run_packages.items():
+            packages[package].append(self_us)
+    results = {
+        "revision": git_revision(),
+        "time": round(time.time()),
+        "import_wall_ms": statistics.median(walls) * 1000,
+        "import_main_ms": statistics.median(imports) * 1000,
+        "packages_ms": {
+            package: statistics.median(values) / 1000
+            for package, values in packages.items()
+        },
+        "ready_ms": {},
+    }
+    print(
+        f"python -c 'import main': {results['import_wall_ms']:.0f} ms wall, "
+        f"{results['import_main_ms']:.0f} ms importing main "
+        f"(median of {args.runs})"
+    )
+    print(f"\n{'package':<28}{'self ms':>9}")
+    top = sorted(results["packages_ms"].items(), key=lambda item: -item[1])
+    for package, ms in top[: args.top]:
+        print(f"{package:<28}{ms:>9.1f}")
+
+    print(f"\n{'STARTUP_PREWARM':<28}{'ready ms':>9}")
+    for mode in args.prewarm_modes.split(","):
+        ready = statistics.median(time_to_ready(env, mode) for _ in range(args.runs))
+        results["ready_ms"][mode] = ready * 1000
+        print(f"{mode:<28}{ready * 1000:>9.0f}")
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(results, separators=(",", ":")) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Concurrent conversations: the sync graph in worker threads vs the async graph.
+
+"threads" runs every turn as ``asyncio.to_thread(graph.invoke, state)``, as
+the routers used to, so at most the default executor's worker count
+(min(32, CPUs + 4)) of turns make progress at once and the rest queue for a
+thread. "async" awaits ``graph.ainvoke(state)``, where LLM calls are awaited
+on the event loop. --conversations scripted conversations from
+benchmarks.scenarios all start at once, each playing its turns in order;
+OpenAI is benchmarks.fake_openai with --llm-latency-ms per call, so the
+numbers isolate how many turns can wait on the LLM at the same time.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_concurrency --conversations 50,200,500
+"""
+
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument("--conversations", default="50,200")
+parser.add_argument("--modes", default="threads,async")
+parser.add_argument("--workflow", choices=["standard", "fused"], default="standard")
+parser.add_argument("--llm-latency-ms", type=float, default=300)
+parser.add_argument("--port", type=int, default=8765, help="fake OpenAI port")
+parser.add_argument("--verbose", action="store_true", help="show the app's logs")
+args = parser.parse_args()
+
+import os
+
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("LOCAL_SHEETS_PATH", "data/bench_sheets.json")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["INTENT_CACHE_ENABLED"] = "false"
+os.environ["OPENAI_API_KEY"] = "bench"
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+os.environ["OPENAI_API_BASE"] = os.environ["OPENAI_BASE_URL"]
+
+import asyncio
+import contextlib
+import statistics
+import sys
+import threading
+import time
+from benchmarks import fake_openai
+from benchmarks.scenarios import SCENARIOS, with_reference
+
+fake_openai.FakeOpenAIConfig.latency = args.llm_latency_ms / 1000
+fake_openai.start_in_thread(args.port)
+
+from core.store import form_service
+from core.workflow import IntakeState, create_intake_workflow
+
+
+async def run_conversation(graph, mode, index, latencies):
+    scenario = list(SCENARIOS.values())[index % len(SCENARIOS)]
+    state = IntakeState(
+        messages=[],
+        intent="",
+        required_fields=[],
+        collected_fields={},
+        contact_info=f"+1555{index:07d}",
+        channel="sms",
+        status="initialized",
+    )
+    for message, _ in scenario["turns"]:
+        state["messages"].append(("user", with_reference(message, index)))
+        started = time.perf_counter()
+        if mode == "threads":
+            state = await asyncio.to_thread(graph.invoke, state)
+        else:
+            state = await graph.ainvoke(state)
+        latencies.append(time.perf_counter() - started)
+
+
+async def sample_threads(peak, stop):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.01)
+
+
+async def run(graph, mode, conversations):
+    latencies = []
+    peak = [threading.active_count()]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_threads(peak, stop))
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(run_conversation(graph, mode, i, latencies) for i in range(conversations))
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    return latencies, elapsed, peak[0]
+
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+async def main():
+    app_logs = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(app_logs):
+        graph = create_intake_workflow(args.workflow)
+    print(
+        f"workflow={args.workflow} llm_latency={args.llm_latency_ms:.0f}ms "
+        f"default executor workers={min(32, (os.cpu_count() or 1) + 4)}"
+    )
+    print(
+        f"{'convs':>6} {'mode':<8}{'turns':>7}{'wall s':>8}{'turns/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'threads':>9}"
+    )
+    for conversations in (int(n) for n in args.conversations.split(",")):
+        for mode in args.modes.split(","):
+            with contextlib.redirect_stdout(app_logs):
+                latencies, elapsed, threads = await run(graph, mode, conversations)
+            print(
+                f"{conversations:>6} {mode:<8}{len(latencies):>7}{elapsed:>8.1f}"
+                f"{len(latencies) / elapsed:>9.1f}"
+                f"{percentile(latencies, 50) * 1000:>9.0f}"
+                f"{percentile(latencies, 95) * 1000:>9.0f}{threads:>9}"
+            )
+    with contextlib.redirect_stdout(app_logs):
+        form_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
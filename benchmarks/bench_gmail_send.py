@@ -0,0 +1,172 @@
+"""
+Latency of the email reply path: legacy OpenAI Assistant vs direct Gmail action.
+
+Composio and the OpenAI Assistants API are replaced by stubs that sleep for a
+configurable time per HTTP call (--api-ms) and per assistant run (--run-ms),
+so the numbers show how many round trips each path makes, not real Gmail
+latency. The legacy path is measured the way the router used to call it: a
+fresh toolset per email, run inline on the event loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_gmail_send --emails 50 --api-ms 120 --run-ms 2500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+import composio_openai
+import openai
+from config import settings
+from core import composio_client
+from core.dispatcher import GmailTransport, OutboundMessage
+
+MESSAGE = {
+    "to": "patient@example.com",
+    "subject": "Re: Your Healthcare Intake Request",
+    "message_text": "Could you share the pickup address and appointment date?",
+}
+
+
+class Backend:
+    """Shared counters and simulated latencies for the stubs."""
+
+    api_seconds = 0.1
+    run_seconds = 2.0
+    toolset_seconds = 0.1
+    calls = 0
+
+    @classmethod
+    def call(cls, seconds: float | None = None):
+        cls.calls += 1
+        time.sleep(cls.api_seconds if seconds is None else seconds)
+
+
+class FakeToolSet:
+    def __init__(self, api_key: str = ""):
+        # Client setup fetches apps and connected accounts.
+        Backend.call(Backend.toolset_seconds)
+
+    def get_actions(self, actions):
+        Backend.call()
+        return [{"type": "function", "function": {"name": str(a)}} for a in actions]
+
+    def execute_action(self, action, params, **kwargs):
+        Backend.call()
+        return {"successful": True, "data": {"id": "message-1"}, "error": None}
+
+    def wait_and_handle_assistant_tool_calls(self, client, run, thread):
+        # The model decides to call the tool, then the run is polled to completion.
+        Backend.call(Backend.run_seconds)
+        self.execute_action(None, {})
+        Backend.call()
+        return SimpleNamespace(status="completed")
+
+
+class FakeOpenAI:
+    def __init__(self, api_key: str = ""):
+        def endpoint(result):
+            def call(*args, **kwargs):
+                Backend.call()
+                return result
+
+            return call
+
+        obj = SimpleNamespace(id="obj-1")
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(create=endpoint(obj), delete=endpoint(None)),
+            threads=SimpleNamespace(
+                create=endpoint(obj),
+                messages=SimpleNamespace(create=endpoint(obj)),
+                runs=SimpleNamespace(create=endpoint(obj)),
+            ),
+        )
+
+
+async def legacy_send():
+    # What the router used to do: a new toolset per email, called inline.
+    composio_client._toolset = None
+    composio_client.send_message_with_assistant(MESSAGE)
+
+
+async def direct_send():
+    message = OutboundMessage(
+        "email", MESSAGE["to"], MESSAGE["message_text"], MESSAGE["subject"]
+    )
+    await GmailTransport().send(message)
+
+
+def measure(send, emails: int):
+    composio_client._toolset = None
+    latencies, calls = [], []
+    for _ in range(emails):
+        Backend.calls = 0
+        started = time.perf_counter()
+        asyncio.run(send())
+        latencies.append(time.perf_counter() - started)
+        calls.append(Backend.calls)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "calls": statistics.fmean(calls),
+    }
+
+
+async def measure_loop_lag(send, emails: int):
+    """Worst event-loop stall while ``emails`` replies are sent concurrently."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - started - 0.01)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    await asyncio.gather(*(send() for _ in range(emails)))
+    done.set()
+    await task
+    return worst * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=20)
+    parser.add_argument("--api-ms", type=float, default=120)
+    parser.add_argument("--run-ms", type=float, default=2500)
+    parser.add_argument("--toolset-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    Backend.api_seconds = args.api_ms / 1000
+    Backend.run_seconds = args.run_ms / 1000
+    Backend.toolset_seconds = args.toolset_ms / 1000
+
+    print(
+        f"{'path':<10} {'p50 ms':>9} {'p95 ms':>9} {'calls/email':>12} {'loop lag ms':>12}"
+    )
+    # composio_client imports these when first used; the stubs are only
+    # installed for the run and the real classes restored afterwards.
+    with (
+        patch.object(composio_openai, "ComposioToolSet", FakeToolSet),
+        patch.object(openai, "OpenAI", FakeOpenAI),
+        patch.object(composio_client, "_toolset", None),
+        patch.object(settings, "GMAIL_SEND_MODE", "direct"),
+    ):
+        for mode, send in (("legacy", legacy_send), ("direct", direct_send)):
+            result = measure(send, args.emails)
+            lag = asyncio.run(measure_loop_lag(send, min(args.emails, 5)))
+            print(
+                f"{mode:<10} {result['p50_ms']:>9.0f} {result['p95_ms']:>9.0f} "
+                f"{result['calls']:>12.1f} {lag:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Building Google Sheets rows for large batches: per-key dicts vs compiled schemas.
+
+"dict" is the previous path: a per-intent dict literal of ``data.get`` calls
+per intake, then, per row, every key normalized and looked up again for each
+header column. "schema" is the path through core.schemas: the intake is
+built into the intent's ``__slots__`` record and projected with the position
+vector compiled once for the worksheet header. Both produce identical rows,
+which is checked before timing. Only in-process work is measured; no sheet
+is written.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_row_projection --rows 100000
+"""
+
+import argparse
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.scenarios import SCENARIOS
+from core.schemas import get_schema, normalize_column, schemas
+
+
+def legacy_parse(state: dict, field_names) -> dict:
+    """Equivalent of the removed data_parse: one dict per intake."""
+    collected = state.get("collected_fields", {})
+    parsed = {
+        "channel": state.get("channel", ""),
+        "contact_info": state.get("contact_info", ""),
+    }
+    for name in field_names:
+        parsed[name] = collected.get(name, "")
+    parsed["update_time"] = datetime.now().isoformat()
+    parsed["status"] = state.get("status", "")
+    return parsed
+
+
+def legacy_row(data: dict, keys) -> list:
+    """Equivalent of the removed ContactRowIndex.row_data."""
+    normalized = {normalize_column(key): value for key, value in data.items()}
+    return [normalized.get(key, "") for key in keys]
+
+
+def make_states(intent: str, rows: int):
+    scenario = next(s for s in SCENARIOS.values() if s["intent"] == intent)
+    collected = {}
+    for _, fields in scenario["turns"]:
+        collected.update(fields)
+    states = []
+    for i in range(rows):
+        # Some intakes are still partial, as most in-progress rows are.
+        fields = {k: v for k, v in collected.items() if random.random() < 0.8}
+        states.append(
+            {
+                "intent": intent,
+                "channel": "sms",
+                "contact_info": f"+1555{i:07d}",
+                "collected_fields": fields,
+                "status": "in_progress",
+            }
+        )
+    return states
+
+
+def timed(func, repeats):
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def peak_bytes(func) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    random.seed(1)
+
+    print(
+        f"{'intent':<14}{'path':<8}{'parse ms':>10}{'project ms':>12}"
+        f"{'us/row':>9}{'MB held':>9}"
+    )
+    for intent, schema in schemas.items():
+        states = make_states(intent, args.rows)
+        # A live sheet header: display spellings plus a column the app ignores.
+        header = schema.header + ["notes"]
+        keys = [normalize_column(name) for name in header]
+        names = schema.field_names
+
+        def parse_dicts():
+            return [legacy_parse(state, names) for state in states]
+
+        def parse_records():
+            record = schema.record
+            return [
+                record(
+                    state["channel"],
+                    state["contact_info"],
+                    state["collected_fields"],
+                    state["status"],
+                )
+                for state in states
+            ]
+
+        dicts = parse_dicts()
+        records = parse_records()
+        project = get_schema(intent).projection(keys)
+        for data, record in zip(dicts[:1000], records[:1000]):
+            expected = legacy_row(data, keys)
+            expected[header.index("update_time")] = ""
+            got = project(record)
+            got[header.index("update_time")] = ""
+            if got != expected:
+                sys.exit(f"{intent}: rows differ\n{expected}\n{got}")
+
+        paths = [
+            ("dict", parse_dicts, lambda: [legacy_row(data, keys) for data in dicts]),
+            (
+                "schema",
+                parse_records,
+                lambda: [project(record) for record in records],
+            ),
+        ]
+        for name, parse, rows in paths:
+            parse_seconds, _ = timed(parse, args.repeats)
+            project_seconds, _ = timed(rows, args.repeats)
+            held = peak_bytes(parse) / 1e6
+            per_row = (parse_seconds + project_seconds) / args.rows * 1e6
+            print(
+                f"{intent:<14}{name:<8}{parse_seconds * 1000:>10.1f}"
+                f"{project_seconds * 1000:>12.1f}{per_row:>9.2f}{held:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
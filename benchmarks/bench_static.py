@@ -0,0 +1,120 @@
+"""
+Requests/sec for the index page: read from disk per hit vs served from memory.
+
+"disk" is the previous handler (open and read static/index.html on every
+request, uncompressed, no validators), mounted next to the real routes.
+The other rows go through the app's in-memory StaticAssetCache: plain, with
+gzip/br negotiated, and conditional requests answered with 304. Requests
+run in-process over httpx's ASGI transport with --concurrency clients, so
+req/s includes the middleware stack but no network transfer; bytes/response
+shows the transfer saved and "handler us" the cost of the handler alone.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_static --requests 5000 --concurrency 20
+"""
+
+import os
+
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("LOCAL_SHEETS_PATH", "data/bench_sheets.json")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+os.environ.setdefault("DISPATCH_TRANSPORT", "fake")
+os.environ.setdefault("STARTUP_PREWARM", "off")
+
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+import main
+
+
+async def disk_index():
+    with open("static/index.html", "r", encoding="utf-8") as f:
+        return HTMLResponse(content=f.read())
+
+
+main.app.add_api_route("/bench-disk-index", disk_index, response_class=HTMLResponse)
+
+
+async def measure(client, path, headers, requests, concurrency):
+    sizes = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            async with client.stream("GET", path, headers=headers) as response:
+                # Bytes as sent, before httpx undoes any Content-Encoding
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                sizes.append(len(raw))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, sum(sizes) / len(sizes)
+
+
+async def handler_cost(name, headers, calls):
+    """Microseconds per call of the handler alone, without the ASGI stack."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    request = Request(scope)
+    started = time.perf_counter()
+    for _ in range(calls):
+        if name == "disk":
+            await disk_index()
+        else:
+            main.static_assets.response(request, "index.html", "no-cache")
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def run(args):
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://bench"
+        ) as client:
+            etag = await client.get("/", headers={"Accept-Encoding": "gzip, br"})
+            cases = [
+                ("disk", "/bench-disk-index", {"Accept-Encoding": "identity"}),
+                ("memory", "/", {"Accept-Encoding": "identity"}),
+                ("memory gzip/br", "/", {"Accept-Encoding": "gzip, br"}),
+                (
+                    "memory 304",
+                    "/",
+                    {
+                        "Accept-Encoding": "gzip, br",
+                        "If-None-Match": etag.headers["ETag"],
+                    },
+                ),
+            ]
+            print(
+                f"{'handler':<16}{'req/s':>10}{'bytes/response':>16}"
+                f"{'handler us':>12}"
+            )
+            for name, path, headers in cases:
+                # Warm up, then measure
+                await measure(client, path, headers, 200, args.concurrency)
+                rate, size = await measure(
+                    client, path, headers, args.requests, args.concurrency
+                )
+                cost = await handler_cost(name, headers, args.requests)
+                print(f"{name:<16}{rate:>10.0f}{size:>16.0f}{cost:>12.1f}")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
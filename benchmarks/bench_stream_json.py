@@ -0,0 +1,96 @@
+"""
+Micro-benchmark for JSON detection in the /chat stream generator.
+
+Compares the previous approach (re-join the whole reply and run
+complete_reply + extract_json_from_reply on every token) against
+JsonObjectScanner, which only looks at each new chunk.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_stream_json
+"""
+
+import argparse
+import json
+import time
+from core.helpers import (
+    COMPLETE_REPLY_PREFIX,
+    JsonObjectScanner,
+    complete_reply,
+    extract_json_from_reply,
+)
+
+FINAL_OBJECT = {
+    "intent": "DISCHARGE",
+    "patient_name": "Jane Doe",
+    "pickup_facility_name": "St. Mary's {North} Campus",
+    "pickup_facility_address": "12 Main St",
+    "appointment_date": "2025-07-01",
+    "is_infectious_disease": "no",
+}
+
+
+def synthetic_chunks(words: int, chunk_size: int = 4):
+    """A long conversational reply followed by the final JSON summary."""
+    text = " ".join(f"word{i}" for i in range(words))
+    text += "\nOkay, here’s the information I’ve gathered:\n"
+    text += json.dumps(FINAL_OBJECT, indent=1)
+    return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def legacy(chunks):
+    collected = []
+    completions = 0
+    for chunk in chunks:
+        collected.append(chunk)
+        current_reply = "".join(collected)
+        complete_reply(current_reply)
+        if extract_json_from_reply(current_reply):
+            completions += 1
+    return completions
+
+
+def incremental(chunks):
+    reply_prefix = ""
+    scanner = JsonObjectScanner()
+    completions = 0
+    for chunk in chunks:
+        if len(reply_prefix) < len(COMPLETE_REPLY_PREFIX):
+            reply_prefix += chunk
+            complete_reply(reply_prefix)
+        completions += len(scanner.feed(chunk))
+    return completions
+
+
+def measure(func, chunks, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completions = func(chunks)
+        best = min(best, time.perf_counter() - started)
+    return best, completions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,5000,20000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'words':>8} {'chunks':>8} {'legacy ms':>12} {'scanner ms':>12} "
+        f"{'speedup':>8} {'legacy hits':>12} {'scanner hits':>13}"
+    )
+    for words in (int(size) for size in args.sizes.split(",")):
+        chunks = synthetic_chunks(words)
+        legacy_s, legacy_hits = measure(legacy, chunks, args.repeat)
+        scanner_s, scanner_hits = measure(incremental, chunks, args.repeat)
+        print(
+            f"{words:>8} {len(chunks):>8} {legacy_s * 1000:>12.2f} "
+            f"{scanner_s * 1000:>12.2f} {legacy_s / scanner_s:>7.1f}x "
+            f"{legacy_hits:>12} {scanner_hits:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
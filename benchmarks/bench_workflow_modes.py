@@ -0,0 +1,124 @@
+"""
+Per-turn latency and token comparison of the standard and fused intake graphs.
+
+Replays scripted conversations through both graphs against the configured
+OpenAI endpoint (OPENAI_API_KEY, optionally OPENAI_BASE_URL) and reports
+per-turn latency, LLM calls and tokens. Sheets writes go to the local stand-in.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_workflow_modes --repeat 3
+"""
+
+import os
+
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("LOCAL_SHEETS_PATH", "data/bench_sheets.json")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+
+import argparse
+import statistics
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from core.workflow import IntakeState, create_intake_workflow
+from core.store import form_service
+
+CONVERSATIONS = {
+    "PRIVATE_PAY": [
+        "Hi, I'm paying out of pocket and need a ride for my mother to her appointment.",
+        "Her name is Maria Lopez, she weighs 140 lbs. Pick up at 12 Oak St, Pasadena "
+        "and drop off at 500 Hill Ave, Pasadena on 2025-09-03.",
+        "Round trip, she needs a wheelchair, two stairs and I will ride along.",
+        "I'm Carlos Lopez, 626-555-0199, carlos@example.com",
+    ],
+    "CASE_MANAGER": [
+        "I'm a case manager with Blue Shield and need to book a member ride.",
+        "Patient is John Park, from 1 Main St LA to 20 Elm St LA, auth number 88231, "
+        "appointment 2025-09-10.",
+    ],
+    "DISCHARGE": [
+        "We have a discharge from St. Mary's that needs transport home tomorrow.",
+        "Patient Ann Lee, St. Mary's Medical Center, 1050 Linden Ave Long Beach, "
+        "room 412. Going to Sunrise Care, 22 Palm Dr Long Beach, room 7.",
+        "Appointment 2025-09-05, oxygen needed at 2 liters, no infectious disease, "
+        "weight 160 lbs.",
+    ],
+}
+
+
+class UsageCounter(BaseCallbackHandler):
+    """Counts LLM calls and tokens reported by the OpenAI API."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+
+
+def run_mode(mode: str, repeat: int):
+    workflow = create_intake_workflow(mode)
+    counter = UsageCounter()
+    latencies, calls, prompt_tokens, completion_tokens = [], [], [], []
+    for run in range(repeat):
+        for intent, turns in CONVERSATIONS.items():
+            state = IntakeState(
+                messages=[],
+                contact_info=f"bench-{mode}-{intent}-{run}",
+                intent="",
+                required_fields=[],
+                collected_fields={},
+                channel="sms",
+                status="initialized",
+            )
+            for message in turns:
+                state["messages"].append(("user", message))
+                counter.reset()
+                started = time.perf_counter()
+                state = workflow.invoke(state, config={"callbacks": [counter]})
+                latencies.append(time.perf_counter() - started)
+                calls.append(counter.calls)
+                prompt_tokens.append(counter.prompt_tokens)
+                completion_tokens.append(counter.completion_tokens)
+                if state["status"] in ("complete", "jotform_used"):
+                    break
+    return {
+        "turns": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "llm_calls": statistics.fmean(calls),
+        "prompt_tokens": statistics.fmean(prompt_tokens),
+        "completion_tokens": statistics.fmean(completion_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--modes", default="standard,fused")
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<10} {'turns':>6} {'p50 ms':>9} {'mean ms':>9} "
+        f"{'calls/turn':>11} {'prompt tok':>11} {'compl tok':>10}"
+    )
+    for mode in args.modes.split(","):
+        result = run_mode(mode, args.repeat)
+        print(
+            f"{mode:<10} {result['turns']:>6} {result['p50_ms']:>9.0f} "
+            f"{result['mean_ms']:>9.0f} {result['llm_calls']:>11.2f} "
+            f"{result['prompt_tokens']:>11.0f} {result['completion_tokens']:>10.0f}"
+        )
+    form_service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+OpenAI-compatible stand-in for offline benchmarks.
+
+Serves /v1/chat/completions (plain, streaming and tool calls for structured
+output) and /v1/embeddings. Replies are scripted from benchmarks.scenarios
+by recognising which of the service's prompts is being sent, and every call
+sleeps for a configurable latency. Calls are counted per prompt kind.
+
+Run standalone and point the service at it with OPENAI_BASE_URL:
+
+    python -m benchmarks.fake_openai --port 8765 --latency-ms 300
+"""
+
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from benchmarks.scenarios import SCENARIOS, fields_for, lookup
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+import uvicorn
+import numpy as np
+
+NEXT_QUESTION = "Thanks! Could you share the remaining details for the ride?"
+EMBEDDING_DIMENSIONS = 256
+
+
+class FakeOpenAIConfig:
+    latency = 0.3
+    token_latency = 0.005
+    calls: Counter = Counter()
+    prompt_tokens: Counter = Counter()
+
+
+app = FastAPI()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def prompt_kind(system: str, body: dict) -> str:
+    if body.get("tools"):
+        return "fused_turn"
+    if "intent classification system" in system:
+        return "classify_intent"
+    if "fill out a form" in system:
+        return "classify_jotform"
+    if "extract relevant" in system:
+        return "extract_fields"
+    if "which required fields are still missing" in system:
+        return "next_question"
+    return "chat"
+
+
+def message_input(text: str) -> str:
+    """The latest user message in a prompt that ends with "Message: ..."."""
+    marker = "\nMessage: "
+    return text.rsplit(marker, 1)[1] if marker in text else text
+
+
+def scripted_reply(kind: str, messages: list) -> str:
+    human = next(
+        (m.get("content") or "" for m in reversed(messages) if m["role"] == "user"),
+        "",
+    )
+    if kind == "classify_intent":
+        matches = lookup(human)
+        return SCENARIOS[matches[0][0]]["intent"] if matches else "PRIVATE_PAY"
+    if kind == "classify_jotform":
+        return "NO"
+    if kind == "extract_fields":
+        return json.dumps(fields_for(message_input(human)))
+    if kind == "next_question":
+        return NEXT_QUESTION
+    return chat_reply(messages)
+
+
+def chat_reply(messages: list) -> str:
+    """Reply of the /chat assistant: a question, or the final JSON summary."""
+    user_messages = [m["content"] for m in messages if m["role"] == "user"]
+    matches = [match for text in user_messages for match in lookup(text)]
+    if not matches:
+        return "Hello! Are you booking as a private payer, a case manager or for a discharge?"
+    name, position = matches[-1]
+    scenario = SCENARIOS[name]
+    if position < len(scenario["turns"]) - 1:
+        return NEXT_QUESTION
+    summary = {"intent": scenario["chat_intent"]}
+    for text in user_messages:
+        summary.update(fields_for(text))
+    return "Okay, here’s the information I’ve gathered:\n" + json.dumps(summary)
+
+
+def fused_arguments(messages: list) -> str:
+    human = messages[-1].get("content") or ""
+    text = message_input(human)
+    matches = lookup(text)
+    intent = SCENARIOS[matches[0][0]]["intent"] if matches else "PRIVATE_PAY"
+    return json.dumps(
+        {
+            "intent": intent,
+            "wants_form": False,
+            "extracted_fields": fields_for(text),
+            "next_question": NEXT_QUESTION,
+        }
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body["messages"]
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    kind = prompt_kind(system, body)
+    FakeOpenAIConfig.calls[kind] += 1
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    FakeOpenAIConfig.prompt_tokens[kind] += prompt_tokens
+    await asyncio.sleep(FakeOpenAIConfig.latency)
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4o")
+    if kind == "fused_turn":
+        tool = body["tools"][0]["function"]["name"]
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:8]}",
+                    "type": "function",
+                    "function": {"name": tool, "arguments": fused_arguments(messages)},
+                }
+            ],
+        }
+        finish_reason = "tool_calls"
+        content = message["tool_calls"][0]["function"]["arguments"]
+    else:
+        content = scripted_reply(kind, messages)
+        message = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+
+    if body.get("stream"):
+        return StreamingResponse(
+            stream_chunks(completion_id, created, model, content),
+            media_type="text/event-stream",
+        )
+    completion_tokens = estimate_tokens(content)
+    return JSONResponse(
+        {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+    )
+
+
+async def stream_chunks(completion_id: str, created: int, model: str, content: str):
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    # Roughly one token per four characters.
+    for i in range(0, len(content), 4):
+        if FakeOpenAIConfig.token_latency:
+            await asyncio.sleep(FakeOpenAIConfig.token_latency)
+        yield chunk({"content": content[i : i + 4]})
+    yield chunk({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+    FakeOpenAIConfig.calls["embeddings"] += 1
+    await asyncio.sleep(FakeOpenAIConfig.latency / 3)
+    data = []
+    for i, text in enumerate(inputs):
+        seed = int.from_bytes(hashlib.sha256(str(text).encode()).digest()[:4], "big")
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSIONS)
+        data.append({"object": "embedding", "index": i, "embedding": vector.tolist()})
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", ""),
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+def start_in_thread(port: int) -> uvicorn.Server:
+    """Serve the fake API from a daemon thread and wait until it accepts requests."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, name="fake-openai", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--token-latency-ms", type=float, default=5)
+    args = parser.parse_args()
+    FakeOpenAIConfig.latency = args.latency_ms / 1000
+    FakeOpenAIConfig.token_latency = args.token_latency_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Replay a captured SMS/email trace against the app and check conversation outcomes.
+
+Record real traffic by running the service with CAPTURE_PATH (and a fixed
+CAPTURE_SALT); inbound /sms and /gmail messages are written with PII scrubbed,
+together with the status each conversation ended in. This tool plays the
+trace back against the app in-process, keeping the original gaps between
+messages (divided by --speed; 0 sends each contact's messages back to back),
+so bursts from one sender and long email threads arrive as they did in
+production. --clones N replays every conversation N times under distinct
+contacts for more load.
+
+Each replayed conversation must end in the statuses recorded for it
+(``complete``, ``jotform_used``, or still in progress). The LLM is the one
+configured in the environment; Sheets writes go to the local stand-in and
+replies to fake transports. With --fake-llm the scripted benchmark server
+answers instead, which measures load handling but cannot reproduce outcomes.
+
+Run from the repository root:
+
+    python -m benchmarks.replay_traffic data/capture.jsonl --speed 10 --clones 5
+"""
+
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument("trace", help="JSON-lines file written with CAPTURE_PATH")
+parser.add_argument("--speed", type=float, default=1.0, help="time compression")
+parser.add_argument("--clones", type=int, default=1)
+parser.add_argument("--channels", default="sms,email")
+parser.add_argument("--fast-ack", action="store_true", help="set SMS_FAST_ACK")
+parser.add_argument("--debounce", type=float, help="override INBOUND_DEBOUNCE")
+parser.add_argument("--fake-llm", action="store_true")
+parser.add_argument("--llm-latency-ms", type=float, default=300)
+parser.add_argument("--port", type=int, default=8765, help="fake OpenAI port")
+parser.add_argument("--timeout", type=float, default=120, help="seconds per request")
+parser.add_argument("--verbose", action="store_true", help="show the app's logs")
+args = parser.parse_args()
+
+import os
+
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("LOCAL_SHEETS_PATH", "data/replay_sheets.json")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+os.environ["CAPTURE_PATH"] = ""
+os.environ["DISPATCH_TRANSPORT"] = "fake"
+os.environ["TWILIO_MPS"] = "0"
+os.environ["EMAIL_MPS"] = "0"
+os.environ["SMS_VALIDATE_SIGNATURE"] = "false"
+os.environ["SMS_FAST_ACK"] = str(args.fast_ack).lower()
+if args.debounce is not None:
+    os.environ["INBOUND_DEBOUNCE"] = str(args.debounce)
+if args.fake_llm:
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["OPENAI_API_BASE"] = os.environ["OPENAI_BASE_URL"]
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["INTENT_CACHE_ENABLED"] = "false"
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACreplay")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "replay")
+
+import asyncio
+import contextlib
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+import httpx
+
+if args.fake_llm:
+    from benchmarks import fake_openai
+
+    fake_openai.FakeOpenAIConfig.latency = args.llm_latency_ms / 1000
+    fake_openai.start_in_thread(args.port)
+
+import main
+from core import capture
+from routers import sms
+
+
+class OutcomeCollector:
+    """Stands in for the traffic recorder and keeps the statuses of the replay."""
+
+    def __init__(self):
+        self.outcomes = defaultdict(list)
+
+    def record_inbound(self, channel, contact, message):
+        pass
+
+    def record_outcome(self, channel, contact, status):
+        self.outcomes[(channel, contact)].append(status)
+
+    def close(self):
+        pass
+
+
+class Replay:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.max_lag = 0.0
+
+
+def load_trace(path, channels):
+    """Inbound messages and recorded outcomes per (channel, pseudonym)."""
+    messages = defaultdict(list)
+    outcomes = defaultdict(list)
+    for record in capture.read_trace(path):
+        key = (record.get("ch"), record.get("c"))
+        if key[0] not in channels:
+            continue
+        if "m" in record:
+            messages[key].append((record["t"], record["m"]))
+        elif "s" in record:
+            outcomes[key].append(record["s"])
+    return messages, outcomes
+
+
+def contact_for(channel, pseudonym, clone):
+    if channel == "sms":
+        return f"replay-{pseudonym}-{clone}"
+    return f"{pseudonym}.{clone}@replay.invalid"
+
+
+async def post(client, replay, channel, contact, message):
+    started = time.perf_counter()
+    try:
+        if channel == "sms":
+            response = await client.post(
+                "/sms/", data={"From": contact, "Body": message}
+            )
+        else:
+            payload = {
+                "data": {
+                    "preview": {"body": message},
+                    "sender": f"Replay <{contact}>",
+                }
+            }
+            response = await client.post("/gmail/", json=payload)
+        response.raise_for_status()
+    except Exception as e:
+        replay.errors[channel] += 1
+        print(f"{channel} {contact} failed: {e!r}", file=sys.stderr)
+        return
+    replay.latencies[channel].append(time.perf_counter() - started)
+
+
+async def replay_contact(client, replay, channel, contact, messages, t0, started):
+    if args.speed <= 0:
+        for _, message in messages:
+            await post(client, replay, channel, contact, message)
+        return
+    sends = []
+    for t, message in messages:
+        delay = (t - t0) / args.speed - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            replay.max_lag = max(replay.max_lag, -delay)
+        # Don't wait for the reply: later messages keep their original timing.
+        sends.append(
+            asyncio.create_task(post(client, replay, channel, contact, message))
+        )
+    await asyncio.gather(*sends)
+
+
+async def run(messages):
+    replay = Replay()
+    collector = OutcomeCollector()
+    capture.traffic_recorder = collector
+    t0 = min(t for items in messages.values() for t, _ in items)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app),
+            base_url="http://replay",
+            timeout=args.timeout,
+        ) as client:
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    replay_contact(
+                        client,
+                        replay,
+                        channel,
+                        contact_for(channel, pseudonym, clone),
+                        items,
+                        t0,
+                        started,
+                    )
+                    for (channel, pseudonym), items in messages.items()
+                    for clone in range(args.clones)
+                )
+            )
+    # Leaving the lifespan drains the fast-ack turn queue and the dispatcher.
+    elapsed = time.perf_counter() - started
+    queue_stats = {
+        "p50": sms.sms_queue.latency_percentile(50),
+        "p95": sms.sms_queue.latency_percentile(95),
+        **sms.sms_queue.stats,
+        # Bursts are merged by the coalescer before reaching the queue
+        "merged": sms.sms_turns.stats["merged"],
+    }
+    return replay, collector.outcomes, elapsed, queue_stats
+
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+def report(messages, expected, replay, observed, elapsed, queue_stats):
+    sent = sum(len(items) for items in messages.values()) * args.clones
+    print(
+        f"\n{len(messages) * args.clones} conversations, {sent} messages in "
+        f"{elapsed:.1f}s (speed={args.speed}, clones={args.clones}, "
+        f"fast_ack={args.fast_ack}); max send lag {replay.max_lag * 1000:.0f} ms"
+    )
+    print(
+        f"{'channel':<8}{'requests':>9}{'errors':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+    )
+    for channel in args.channels.split(","):
+        latencies = replay.latencies[channel]
+        print(
+            f"{channel:<8}{len(latencies):>9}{replay.errors[channel]:>8}"
+            f"{percentile(latencies, 50) * 1000:>10.0f}"
+            f"{percentile(latencies, 95) * 1000:>10.0f}"
+            f"{percentile(latencies, 99) * 1000:>10.0f}"
+            f"{len(latencies) / elapsed:>9.2f}"
+        )
+    if args.fast_ack:
+        print(
+            f"fast-ack turns: completed={queue_stats['completed']} "
+            f"merged={queue_stats['merged']} errors={queue_stats['errors']} "
+            f"p50={queue_stats['p50']:.0f} ms p95={queue_stats['p95']:.0f} ms"
+        )
+
+    expected_counts = Counter()
+    observed_counts = Counter()
+    mismatches = []
+    for channel, pseudonym in messages:
+        want = expected.get((channel, pseudonym), [])
+        for clone in range(args.clones):
+            got = observed.get((channel, contact_for(channel, pseudonym, clone)), [])
+            expected_counts.update(want or ["in_progress"])
+            observed_counts.update(got or ["in_progress"])
+            if got != want:
+                mismatches.append((channel, pseudonym, clone, want, got))
+    print(f"\n{'final status':<14}{'expected':>9}{'observed':>9}")
+    for status in sorted(set(expected_counts) | set(observed_counts)):
+        print(f"{status:<14}{expected_counts[status]:>9}{observed_counts[status]:>9}")
+    total = len(messages) * args.clones
+    print(f"outcomes matched: {total - len(mismatches)}/{total}")
+    for channel, pseudonym, clone, want, got in mismatches[:10]:
+        print(
+            f"  {channel} {pseudonym}#{clone}: expected {want or '-'}, got {got or '-'}"
+        )
+    return not mismatches and not sum(replay.errors.values())
+
+
+if __name__ == "__main__":
+    channels = set(args.channels.split(","))
+    messages, expected = load_trace(args.trace, channels)
+    if not messages:
+        sys.exit(f"No {'/'.join(sorted(channels))} messages in {args.trace}")
+    app_logs = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(app_logs):
+        replay, observed, elapsed, queue_stats = asyncio.run(run(messages))
+    ok = report(messages, expected, replay, observed, elapsed, queue_stats)
+    sys.exit(0 if ok else 1)
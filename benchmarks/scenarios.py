@@ -0,0 +1,138 @@
+"""
+Scripted intake conversations shared by the offline benchmarks.
+
+Each turn pairs the user's message with the fields it provides, so the fake
+OpenAI server can answer classification and extraction prompts the way the
+real model would. ``intent`` is what the workflow's classifier returns and
+``chat_intent`` what the /chat prompt puts in its final JSON.
+"""
+
+import re
+
+SCENARIOS = {
+    "PRIVATE_PAY": {
+        "intent": "PRIVATE_PAY",
+        "chat_intent": "PRIVATE_PAY",
+        "turns": [
+            (
+                "Hi, I'm paying out of pocket and need a ride for my mother to her appointment.",
+                {},
+            ),
+            (
+                "Her name is Maria Lopez, she weighs 140 lbs. Pick up at 12 Oak St, "
+                "Pasadena and drop off at 500 Hill Ave, Pasadena on 2025-09-03.",
+                {
+                    "patient_name": "Maria Lopez",
+                    "weight": "140 lbs",
+                    "pickup_address": "12 Oak St, Pasadena",
+                    "drop_off_address": "500 Hill Ave, Pasadena",
+                    "appointment_date": "2025-09-03",
+                },
+            ),
+            (
+                "Round trip, she needs a wheelchair, two stairs and I will ride along.",
+                {
+                    "one_way_or_round_trip": "round trip",
+                    "equipment_needed": "wheelchair",
+                    "any_stairs_and_accompanying_passengers": "two stairs, one passenger",
+                },
+            ),
+            (
+                "I'm Carlos Lopez, 626-555-0199, carlos@example.com",
+                {
+                    "user_name": "Carlos Lopez",
+                    "phone_number": "626-555-0199",
+                    "email": "carlos@example.com",
+                },
+            ),
+        ],
+    },
+    "INSURANCE_CASE_MANAGERS": {
+        "intent": "CASE_MANAGER",
+        "chat_intent": "INSURANCE_CASE_MANAGERS",
+        "turns": [
+            (
+                "I'm a case manager with Blue Shield and need to book a member ride.",
+                {},
+            ),
+            (
+                "Patient is John Park, from 1 Main St LA to 20 Elm St LA, auth number "
+                "88231, appointment 2025-09-10.",
+                {
+                    "patient_name": "John Park",
+                    "pickup_address": "1 Main St LA",
+                    "drop_off_address": "20 Elm St LA",
+                    "authorization_number": "88231",
+                    "appointment_date": "2025-09-10",
+                },
+            ),
+        ],
+    },
+    "DISCHARGE": {
+        "intent": "DISCHARGE",
+        "chat_intent": "DISCHARGE",
+        "turns": [
+            (
+                "We have a discharge from St. Mary's that needs transport home tomorrow.",
+                {},
+            ),
+            (
+                "Patient Ann Lee, St. Mary's Medical Center, 1050 Linden Ave Long Beach, "
+                "room 412. Going to Sunrise Care, 22 Palm Dr Long Beach, room 7.",
+                {
+                    "patient_name": "Ann Lee",
+                    "pickup_facility_name": "St. Mary's Medical Center",
+                    "pickup_facility_address": "1050 Linden Ave Long Beach",
+                    "pickup_facility_room_number": "412",
+                    "drop_off_facility_name": "Sunrise Care",
+                    "drop_off_facility_address": "22 Palm Dr Long Beach",
+                    "drop_off_facility_room_number": "7",
+                },
+            ),
+            (
+                "Appointment 2025-09-05, oxygen needed at 2 liters, no infectious "
+                "disease, weight 160 lbs.",
+                {
+                    "appointment_date": "2025-09-05",
+                    "oxygen_is_needed": "yes",
+                    "oxygen_amount": "2",
+                    "is_infectious_disease": "no",
+                    "weight": "160 lbs",
+                },
+            ),
+        ],
+    },
+}
+
+# Suffix added to messages so caches see a distinct message per conversation
+REFERENCE_SUFFIX = re.compile(r"\s*\[ref \d+\]\s*$")
+
+MESSAGE_INDEX = {
+    message: (name, position)
+    for name, scenario in SCENARIOS.items()
+    for position, (message, _) in enumerate(scenario["turns"])
+}
+
+
+def with_reference(message: str, reference: int | None) -> str:
+    return message if reference is None else f"{message} [ref {reference}]"
+
+
+def lookup(message: str):
+    """Return (scenario name, turn position) for every scripted line in ``message``.
+
+    Bursts merged by the coalescer arrive as several lines in one message.
+    """
+    matches = []
+    for line in message.strip().splitlines():
+        match = MESSAGE_INDEX.get(REFERENCE_SUFFIX.sub("", line.strip()))
+        if match:
+            matches.append(match)
+    return matches
+
+
+def fields_for(message: str) -> dict:
+    fields = {}
+    for name, position in lookup(message):
+        fields.update(SCENARIOS[name]["turns"][position][1])
+    return fields
@@ -13,17 +13,157 @@ class Settings:
 
     # Composio API
     COMPOSIO_API_KEY: str = os.getenv("COMPOSIO_API_KEY", "")
+    # Email replies: "direct" (execute the Gmail action) or "assistant" (legacy)
+    GMAIL_SEND_MODE: str = os.getenv("GMAIL_SEND_MODE", "direct")
+    # Composio action used for email replies: GMAIL_SEND_EMAIL sends them,
+    # GMAIL_CREATE_EMAIL_DRAFT only leaves a draft for staff to review and send
+    GMAIL_SEND_ACTION: str = os.getenv("GMAIL_SEND_ACTION", "GMAIL_SEND_EMAIL")
 
     # Google Sheets API
     GOOGLE_SHEETS_CREDENTIALS_JSON: str = os.getenv(
         "GOOGLE_SHEETS_CREDENTIALS_JSON", ""
     )
+    # Seconds before token expiry at which the cached Sheets client refreshes
+    SHEETS_TOKEN_REFRESH_MARGIN: int = int(
+        os.getenv("SHEETS_TOKEN_REFRESH_MARGIN", "300")
+    )
+    # Seconds after which the contact_info -> row index is resynced from the sheet
+    SHEETS_INDEX_TTL: int = int(os.getenv("SHEETS_INDEX_TTL", "300"))
+    # Write-behind batching of Sheets writes
+    SHEETS_WRITE_BEHIND: bool = (
+        os.getenv("SHEETS_WRITE_BEHIND", "true").lower() == "true"
+    )
+    SHEETS_BATCH_SIZE: int = int(os.getenv("SHEETS_BATCH_SIZE", "50"))
+    SHEETS_FLUSH_INTERVAL: float = float(os.getenv("SHEETS_FLUSH_INTERVAL", "2.0"))
+    SHEETS_MAX_PENDING: int = int(os.getenv("SHEETS_MAX_PENDING", "1000"))
+    SHEETS_SUBMIT_TIMEOUT: float = float(os.getenv("SHEETS_SUBMIT_TIMEOUT", "5.0"))
+    # Durable outbox in front of Sheets writes (empty path disables it)
+    SHEETS_OUTBOX_PATH: str = os.getenv(
+        "SHEETS_OUTBOX_PATH", "data/sheets_outbox.sqlite3"
+    )
+    SHEETS_RETRY_BASE_DELAY: float = float(os.getenv("SHEETS_RETRY_BASE_DELAY", "1.0"))
+    SHEETS_RETRY_MAX_DELAY: float = float(os.getenv("SHEETS_RETRY_MAX_DELAY", "300"))
+    # Attempts before a row is given up: dropped, or with the outbox moved to
+    # its dead_letters table (the default retries for about 45 minutes)
+    SHEETS_MAX_ATTEMPTS: int = int(os.getenv("SHEETS_MAX_ATTEMPTS", "20"))
+    # Seconds between checks that VACUUM the outbox once it is mostly free pages
+    SHEETS_OUTBOX_COMPACT_INTERVAL: float = float(
+        os.getenv("SHEETS_OUTBOX_COMPACT_INTERVAL", "3600")
+    )
+    # "google" or "local" (JSON-file stand-in for offline runs)
+    SHEETS_BACKEND: str = os.getenv("SHEETS_BACKEND", "google")
+    LOCAL_SHEETS_PATH: str = os.getenv("LOCAL_SHEETS_PATH", "data/local_sheets.json")
     # JotForm API (optional)
     JOTFORM_API_KEY: str = os.getenv("JOTFORM_API_KEY", "")
 
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 
+    # Create the OpenAI clients, workflow graph and Sheets connection at
+    # startup: "background" (without delaying startup), "blocking" or "off"
+    STARTUP_PREWARM: str = os.getenv("STARTUP_PREWARM", "background")
+
+    # Intake workflow graph: "standard" (one LLM call per node) or "fused"
+    WORKFLOW_MODE: str = os.getenv("WORKFLOW_MODE", "standard")
+    # Next question wording: "llm" (model-written) or "template" (no LLM call)
+    NEXT_QUESTION_MODE: str = os.getenv("NEXT_QUESTION_MODE", "llm")
+
+    # Conversation context sent to the LLM: messages kept verbatim, rolling
+    # summary size (chars) and per-node token budgets ("node=tokens,...")
+    CONTEXT_MAX_MESSAGES: int = int(os.getenv("CONTEXT_MAX_MESSAGES", "12"))
+    CONTEXT_SUMMARY_CHARS: int = int(os.getenv("CONTEXT_SUMMARY_CHARS", "1200"))
+    CONTEXT_SNIPPET_CHARS: int = int(os.getenv("CONTEXT_SNIPPET_CHARS", "200"))
+    CONTEXT_TOKEN_BUDGETS: str = os.getenv(
+        "CONTEXT_TOKEN_BUDGETS",
+        "extract_fields=1500,determine_next_question=1200,fused_turn=2000",
+    )
+
+    # Exact-match cache of classification replies ("intent", "jotform")
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PROMPTS: str = os.getenv("LLM_CACHE_PROMPTS", "intent,jotform")
+    LLM_CACHE_MAX_SIZE: int = int(os.getenv("LLM_CACHE_MAX_SIZE", "10000"))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "86400"))
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+    # Seconds between background writes of new replies to LLM_CACHE_PATH
+    LLM_CACHE_FLUSH_INTERVAL: float = float(
+        os.getenv("LLM_CACHE_FLUSH_INTERVAL", "1.0")
+    )
+    # Seconds between deletions of expired rows from LLM_CACHE_PATH (0 never)
+    LLM_CACHE_PURGE_INTERVAL: float = float(
+        os.getenv("LLM_CACHE_PURGE_INTERVAL", "3600")
+    )
+
+    # Embedding cache of opening messages -> confirmed intent
+    INTENT_CACHE_ENABLED: bool = (
+        os.getenv("INTENT_CACHE_ENABLED", "true").lower() == "true"
+    )
+    INTENT_CACHE_THRESHOLD: float = float(os.getenv("INTENT_CACHE_THRESHOLD", "0.92"))
+    INTENT_CACHE_MAX_SIZE: int = int(os.getenv("INTENT_CACHE_MAX_SIZE", "5000"))
+    INTENT_CACHE_PATH: str = os.getenv("INTENT_CACHE_PATH", "data/intent_cache.npy")
+
+    # Pooled AsyncOpenAI client used by /chat
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    OPENAI_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+    # Workflow checkpoints (conversation state between turns): "memory" (single
+    # worker) or "sqlite" (survives restarts, shared by workers); SQLite writes
+    # are flushed in the background every CHECKPOINT_FLUSH_INTERVAL seconds; with
+    # SQLite a turn's reply waits for its checkpoint, and a turn that raced
+    # another worker on the same conversation is run again on the newer state
+    CHECKPOINT_STORE: str = os.getenv("CHECKPOINT_STORE", "memory")
+    CHECKPOINT_DB_PATH: str = os.getenv(
+        "CHECKPOINT_DB_PATH", "data/checkpoints.sqlite3"
+    )
+    CHECKPOINT_FLUSH_INTERVAL: float = float(
+        os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.2")
+    )
+    CHECKPOINT_TTL: float = float(os.getenv("CHECKPOINT_TTL", "86400"))
+    CHECKPOINT_SWEEP_INTERVAL: float = float(
+        os.getenv("CHECKPOINT_SWEEP_INTERVAL", "60")
+    )
+    # Answer Twilio webhooks immediately and run the turn on a worker pool
+    SMS_FAST_ACK: bool = os.getenv("SMS_FAST_ACK", "false").lower() == "true"
+    SMS_WORKERS: int = int(os.getenv("SMS_WORKERS", "16"))
+    SMS_MAX_QUEUE: int = int(os.getenv("SMS_MAX_QUEUE", "1000"))
+    # Reject SMS webhooks without a valid X-Twilio-Signature (in both modes)
+    SMS_VALIDATE_SIGNATURE: bool = (
+        os.getenv("SMS_VALIDATE_SIGNATURE", "true").lower() == "true"
+    )
+    # Public webhook URL Twilio signs, when it differs from the URL seen here
+    SMS_WEBHOOK_URL: str = os.getenv("SMS_WEBHOOK_URL", "")
+    # Seconds to wait for follow-up messages before running a turn
+    INBOUND_DEBOUNCE: float = float(os.getenv("INBOUND_DEBOUNCE", "1.5"))
+
+    # Scrubbed capture of inbound SMS/email traffic for replay (empty disables);
+    # set CAPTURE_SALT to keep contact pseudonyms stable across restarts
+    CAPTURE_PATH: str = os.getenv("CAPTURE_PATH", "")
+    CAPTURE_SALT: str = os.getenv("CAPTURE_SALT", "")
+
+    # Outbound SMS/email dispatcher; DISPATCH_TRANSPORT is "live" or "fake".
+    # Workers and queue size are per channel.
+    DISPATCH_TRANSPORT: str = os.getenv("DISPATCH_TRANSPORT", "live")
+    DISPATCH_WORKERS: int = int(os.getenv("DISPATCH_WORKERS", "8"))
+    DISPATCH_MAX_QUEUE: int = int(os.getenv("DISPATCH_MAX_QUEUE", "1000"))
+    DISPATCH_MAX_ATTEMPTS: int = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "4"))
+    DISPATCH_RETRY_BASE_DELAY: float = float(
+        os.getenv("DISPATCH_RETRY_BASE_DELAY", "1.0")
+    )
+    DISPATCH_RETRY_MAX_DELAY: float = float(os.getenv("DISPATCH_RETRY_MAX_DELAY", "30"))
+    DISPATCH_SEND_TIMEOUT: float = float(os.getenv("DISPATCH_SEND_TIMEOUT", "30"))
+    DISPATCH_DRAIN_TIMEOUT: float = float(os.getenv("DISPATCH_DRAIN_TIMEOUT", "10"))
+    # Sends per second per channel (Twilio long codes allow 1 MPS)
+    TWILIO_MPS: float = float(os.getenv("TWILIO_MPS", "1"))
+    EMAIL_MPS: float = float(os.getenv("EMAIL_MPS", "5"))
+
+    # Browser cache lifetime (seconds) of /static files, and how often the
+    # in-memory copies are checked against the files on disk (0 never)
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", "604800"))
+    STATIC_CHECK_INTERVAL: float = float(os.getenv("STATIC_CHECK_INTERVAL", "2.0"))
+
     # STT
     DEEPGRAM_API_KEY: str = os.getenv("DEEPGRAM_API_KEY", "")
 
@@ -0,0 +1,128 @@
+from typing import Dict, Iterator
+from config import settings
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+import time
+
+# Best-effort PII patterns, applied in order. Names are only caught after
+# phrases like "my name is" or "patient"; other free-text names are kept.
+PII_PATTERNS = [
+    (re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"), "<email>"),
+    (
+        re.compile(r"(?<!\w)(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?!\w)"),
+        "<phone>",
+    ),
+    (
+        re.compile(
+            r"\b\d{1,6}\s+(?:[A-Za-z0-9.'-]+\s+){1,4}?"
+            r"(?:St|Street|Ave|Avenue|Rd|Road|Blvd|Boulevard|Dr|Drive|Ln|Lane|Way|"
+            r"Ct|Court|Pl|Place|Pkwy|Parkway|Hwy|Highway|Ter|Terrace|Cir|Circle)\b\.?",
+            re.IGNORECASE,
+        ),
+        "<address>",
+    ),
+    # Long digit runs (member, authorization, record numbers) but not ISO dates
+    (re.compile(r"\b(?!\d{4}-\d{2}-\d{2}\b)\d(?:[\s-]?\d){4,}\b"), "<number>"),
+    (
+        re.compile(
+            r"\b((?i:(?:my |the |patient'?s? )?name is|patient(?: is)?|i'm|i am|this is))"
+            r"\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2}"
+        ),
+        r"\1 <name>",
+    ),
+]
+
+
+def scrub_pii(text: str) -> str:
+    """Replace emails, phone numbers, street addresses, long numbers and names."""
+    for pattern, replacement in PII_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class TrafficRecorder:
+    """Appends scrubbed inbound SMS/email messages to a JSON-lines trace file.
+
+    Each line is either an inbound message ``{"t", "ch", "c", "m"}`` or the
+    status a conversation ended in ``{"t", "ch", "c", "s"}``. ``t`` is the
+    Unix time in seconds and ``c`` an HMAC pseudonym of the phone number or
+    address, stable for a given ``salt`` so replays keep each contact's
+    messages together. benchmarks/replay_traffic.py plays the file back.
+    """
+
+    def __init__(self, path: str, salt: str = ""):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Without a configured salt, pseudonyms are stable only per process.
+        self._salt = (salt or secrets.token_hex(16)).encode()
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.stats = {"messages": 0, "outcomes": 0}
+
+    def pseudonym(self, contact: str) -> str:
+        digest = hmac.new(self._salt, contact.encode(), hashlib.sha256)
+        return digest.hexdigest()[:16]
+
+    def record_inbound(self, channel: str, contact: str, message: str):
+        self._write(
+            {"ch": channel, "c": self.pseudonym(contact), "m": scrub_pii(message)}
+        )
+        self.stats["messages"] += 1
+
+    def record_outcome(self, channel: str, contact: str, status: str):
+        self._write({"ch": channel, "c": self.pseudonym(contact), "s": status})
+        self.stats["outcomes"] += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _write(self, record: Dict):
+        line = json.dumps(
+            {"t": round(time.time(), 3), **record},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        try:
+            with self._lock:
+                self._file.write(line + "\n")
+                self._file.flush()
+        except Exception as e:
+            print(f"Error writing traffic capture: {str(e)}")
+
+
+def read_trace(path: str) -> Iterator[Dict]:
+    """Yield the records of a trace file, skipping blank or truncated lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def create_traffic_recorder() -> TrafficRecorder | None:
+    if not settings.CAPTURE_PATH:
+        return None
+    return TrafficRecorder(settings.CAPTURE_PATH, settings.CAPTURE_SALT)
+
+
+# Replaced by the replay tool to observe conversation outcomes.
+traffic_recorder = create_traffic_recorder()
+
+
+def record_inbound(channel: str, contact: str, message: str):
+    if traffic_recorder is not None:
+        traffic_recorder.record_inbound(channel, contact, message)
+
+
+def record_outcome(channel: str, contact: str, status: str):
+    if traffic_recorder is not None:
+        traffic_recorder.record_outcome(channel, contact, status)
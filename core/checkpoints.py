@@ -0,0 +1,635 @@
+from typing import Any, AsyncIterator, Dict, Iterator, NamedTuple, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from config import settings
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+
+class _Entry(NamedTuple):
+    """The latest checkpoint of a thread, serialized with the saver's serde."""
+
+    checkpoint_id: str
+    parent_id: str | None
+    checkpoint: Tuple[str, bytes]
+    metadata: Tuple[str, bytes]
+    updated_at: float
+
+
+def _thread_key(config: RunnableConfig) -> Tuple[str, str]:
+    configurable = config["configurable"]
+    return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+
+class LatestCheckpointSaver(BaseCheckpointSaver):
+    """In-memory LangGraph checkpointer that keeps only each thread's latest state.
+
+    The intake workflow only ever resumes a conversation from where its last
+    turn ended, so older checkpoints are replaced rather than kept for time
+    travel. Checkpoints are stored serialized, so the running state can keep
+    being changed in place, and threads idle for longer than ``ttl`` expire.
+    Pending writes are kept in memory only; they just let a failed step be
+    retried by the same process.
+    """
+
+    # Whether other workers write the same threads (see ``commit``)
+    shared = False
+
+    def __init__(self, ttl: float):
+        super().__init__()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (thread_id, checkpoint_ns) -> latest checkpoint
+        self._threads: Dict[Tuple[str, str], _Entry | None] = {}
+        # (thread_id, checkpoint_ns) -> (checkpoint_id, {(task_id, idx): write})
+        self._writes: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.stats = {"puts": 0, "reads": 0, "misses": 0, "deletes": 0}
+
+    def _load(self, key: Tuple[str, str]) -> _Entry | None:
+        return self._threads.get(key)
+
+    def _store(self, key: Tuple[str, str], entry: _Entry | None):
+        """Replace a thread's checkpoint; None deletes it."""
+        with self._lock:
+            if entry is None:
+                self._threads.pop(key, None)
+            else:
+                self._threads[key] = entry
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        key = _thread_key(config)
+        entry = self._load(key)
+        self.stats["reads"] += 1
+        if entry is None or entry.updated_at + self.ttl <= time.time():
+            self.stats["misses"] += 1
+            return None
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id != entry.checkpoint_id:
+            return None
+        return self._tuple(key, entry)
+
+    def _tuple(self, key: Tuple[str, str], entry: _Entry) -> CheckpointTuple:
+        thread_id, checkpoint_ns = key
+        written = self._writes.get(key)
+        pending_writes = []
+        if written is not None and written[0] == entry.checkpoint_id:
+            pending_writes = [
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, channel, value, _ in written[1].values()
+            ]
+        parent_config = None
+        if entry.parent_id:
+            parent_config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": entry.parent_id,
+                }
+            }
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": entry.checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(entry.checkpoint),
+            metadata=self.serde.loads_typed(entry.metadata),
+            parent_config=parent_config,
+            pending_writes=pending_writes,
+        )
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        # At most one checkpoint per thread is kept, so ``before`` never matches.
+        if before is not None or limit == 0:
+            return
+        if config is not None:
+            found = self.get_tuple(config)
+            checkpoints = [found] if found is not None else []
+        else:
+            with self._lock:
+                entries = [
+                    (key, entry)
+                    for key, entry in self._threads.items()
+                    if entry is not None
+                ]
+            checkpoints = [self._tuple(key, entry) for key, entry in entries]
+        for found in checkpoints:
+            if filter and any(found.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield found
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        key = _thread_key(config)
+        entry = _Entry(
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            self.serde.dumps_typed(checkpoint),
+            self.serde.dumps_typed(metadata),
+            time.time(),
+        )
+        self._store(key, entry)
+        self.stats["puts"] += 1
+        return {
+            "configurable": {
+                "thread_id": key[0],
+                "checkpoint_ns": key[1],
+                "checkpoint_id": entry.checkpoint_id,
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        key = _thread_key(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            written = self._writes.get(key)
+            if written is None or written[0] != checkpoint_id:
+                # Writes of an older checkpoint are never read again.
+                written = self._writes[key] = (checkpoint_id, {})
+            for idx, (channel, value) in enumerate(writes):
+                write_key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+                if write_key[1] >= 0 and write_key in written[1]:
+                    continue
+                written[1][write_key] = (
+                    task_id,
+                    channel,
+                    self.serde.dumps_typed(value),
+                    task_path,
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        # The workflow has no subgraphs, so threads only use the root namespace.
+        key = (thread_id, "")
+        with self._lock:
+            self._writes.pop(key, None)
+        self._store(key, None)
+        self.stats["deletes"] += 1
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        # Same version format as langgraph's InMemorySaver.
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # Everything is in memory, so the async API just calls the sync one.
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for found in self.list(config, filter=filter, before=before, limit=limit):
+            yield found
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def sweep(self) -> int:
+        """Drop expired threads and return how many were removed."""
+        expires_before = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                key
+                for key, entry in self._threads.items()
+                if entry is not None and entry.updated_at <= expires_before
+            ]
+            for key in expired:
+                del self._threads[key]
+                self._writes.pop(key, None)
+        return len(expired)
+
+    def start_sweeper(self, interval: float):
+        if self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(
+            target=self._sweep_forever,
+            args=(interval,),
+            name="checkpoint-sweeper",
+            daemon=True,
+        )
+        self._sweeper.start()
+
+    def _sweep_forever(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f"Expired {removed} conversation checkpoints")
+            except Exception as e:
+                print(f"Error sweeping checkpoints: {str(e)}")
+
+    def commit(self, config: RunnableConfig) -> bool:
+        """Make the thread's latest checkpoint durable before its reply is sent.
+
+        Returns False if another worker advanced the thread first, in which
+        case the checkpoint was dropped and the turn must be run again. Only
+        one process uses an in-memory saver, so this always succeeds.
+        """
+        return True
+
+    async def acommit(self, config: RunnableConfig) -> bool:
+        return self.commit(config)
+
+    @property
+    def threads_in_memory(self) -> int:
+        """Threads (deletions included) currently held in memory."""
+        return len(self._threads)
+
+    def close(self):
+        self._stop.set()
+
+    # Not __len__: langgraph tests ``if checkpointer``, which must stay true.
+
+
+class SQLiteCheckpointSaver(LatestCheckpointSaver):
+    """Checkpointer that persists each thread's latest state to SQLite (WAL).
+
+    Writes are write-behind: ``put`` only replaces the thread's entry in memory
+    and marks it dirty, and a flusher thread writes every dirty thread in one
+    transaction each ``flush_interval`` seconds. A turn's several checkpoints
+    thus coalesce into one row update and concurrent conversations share a
+    commit. Flushed entries are evicted from memory, so reads of idle threads
+    (and threads written by other workers on the host) go to the database.
+    ``close`` flushes what is left, which makes a clean restart lossless; a
+    crash loses at most the last ``flush_interval`` of turns.
+
+    Each flush only replaces the row this worker read the thread from. If
+    another worker advanced the same thread meanwhile, its checkpoint is kept,
+    ours is dropped (counted in ``conflicts``) and the next read of the thread
+    comes from the database. ``commit`` reports such a conflict to the turn
+    that made the checkpoint, so it can run again on the newer state before
+    anything is replied.
+    """
+
+    shared = True
+
+    def __init__(self, ttl: float, path: str, flush_interval: float):
+        super().__init__(ttl)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._dirty: set = set()
+        # (thread_id, checkpoint_ns) -> (checkpoint_id in the database or None,
+        # time it was read) for threads read from the database and not flushed
+        self._bases: Dict[Tuple[str, str], Tuple[str | None, float]] = {}
+        # (thread_id, checkpoint_ns) -> time a flush dropped its checkpoint
+        self._conflicts: Dict[Tuple[str, str], float] = {}
+        self._db_lock = threading.Lock()
+        # Held for a whole flush, so commit sees the outcome of every flush
+        # that took the thread before it
+        self._flush_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT NOT NULL, "
+            "checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "parent_id TEXT, checkpoint_type TEXT NOT NULL, checkpoint BLOB NOT NULL, "
+            "metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (thread_id, checkpoint_ns))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS checkpoints_updated_at "
+            "ON checkpoints (updated_at)"
+        )
+        self._conn.commit()
+        self.stats.update(
+            {"flushes": 0, "rows_written": 0, "rows_deleted": 0, "conflicts": 0}
+        )
+        self._flusher = threading.Thread(
+            target=self._flush_forever, name="checkpoint-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _load(self, key: Tuple[str, str]) -> _Entry | None:
+        with self._lock:
+            # Unflushed entries, deletions (None) included, win over the database.
+            if key in self._threads:
+                return self._threads[key]
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, parent_id, checkpoint_type, checkpoint, "
+                "metadata_type, metadata, updated_at FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                key,
+            ).fetchone()
+        with self._lock:
+            if key not in self._threads:
+                self._bases[key] = (row[0] if row else None, time.time())
+                # A conflict from before this read no longer concerns anyone.
+                self._conflicts.pop(key, None)
+        if row is None:
+            return None
+        return _Entry(row[0], row[1], (row[2], row[3]), (row[4], row[5]), row[6])
+
+    def _store(self, key: Tuple[str, str], entry: _Entry | None):
+        with self._lock:
+            self._threads[key] = entry
+            self._dirty.add(key)
+
+    def list(
+        self, config: RunnableConfig | None, **kwargs
+    ) -> Iterator[CheckpointTuple]:
+        if config is None:
+            # Listing every thread is only needed for debugging; flush first so
+            # the database holds them all.
+            self.flush()
+            with self._db_lock:
+                keys = self._conn.execute(
+                    "SELECT thread_id, checkpoint_ns FROM checkpoints"
+                ).fetchall()
+            for thread_id, checkpoint_ns in keys:
+                yield from super().list(
+                    {
+                        "configurable": {
+                            "thread_id": thread_id,
+                            "checkpoint_ns": checkpoint_ns,
+                        }
+                    },
+                    **kwargs,
+                )
+            return
+        yield from super().list(config, **kwargs)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        if _thread_key(config) in self._threads:
+            return self.get_tuple(config)
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: RunnableConfig | None, **kwargs):
+        for found in await asyncio.to_thread(lambda: list(self.list(config, **kwargs))):
+            yield found
+
+    def flush(self) -> int:
+        """Write every dirty thread in one transaction; returns how many."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            if not self._dirty:
+                return 0
+            batch = [
+                (key, self._threads.get(key), self._bases.get(key))
+                for key in self._dirty
+            ]
+            self._dirty = set()
+        conflicts = []
+        try:
+            with self._db_lock:
+                for key, entry, base in batch:
+                    if not self._write_row(key, entry, base):
+                        conflicts.append(key)
+                self._conn.commit()
+        except Exception:
+            with self._lock:
+                # Retry on the next flush unless the thread changed meanwhile.
+                self._dirty.update(key for key, _, _ in batch)
+            raise
+        with self._lock:
+            for key, entry, _ in batch:
+                changed = key in self._dirty or self._threads.get(key) is not entry
+                if key in conflicts:
+                    # Another worker advanced the thread; keep its checkpoint.
+                    self._conflicts[key] = time.time()
+                    if not changed:
+                        self._evict(key)
+                        self._writes.pop(key, None)
+                elif changed:
+                    # The newer entry replaces what this flush wrote.
+                    self._bases[key] = (
+                        entry.checkpoint_id if entry is not None else None,
+                        time.time(),
+                    )
+                else:
+                    self._evict(key)
+                    if entry is None:
+                        self._writes.pop(key, None)
+        for key in conflicts:
+            print(
+                f"Checkpoint of thread {key[0]} was advanced by another worker; "
+                "keeping its version"
+            )
+        written = [entry for key, entry, _ in batch if key not in conflicts]
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += sum(1 for e in written if e is not None)
+        self.stats["rows_deleted"] += sum(1 for e in written if e is None)
+        self.stats["conflicts"] += len(conflicts)
+        return len(batch)
+
+    def _write_row(
+        self,
+        key: Tuple[str, str],
+        entry: _Entry | None,
+        base: Tuple[str | None, float] | None,
+    ) -> bool:
+        """Write one thread unless another worker changed its row since it was
+        read; returns False on such a conflict. Runs under ``_db_lock``."""
+        if entry is None:
+            if base is None:
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                    key,
+                )
+                return True
+            if base[0] is None:
+                # Never flushed; a row now would be another worker's.
+                return (
+                    self._conn.execute(
+                        "SELECT 1 FROM checkpoints WHERE thread_id = ? "
+                        "AND checkpoint_ns = ?",
+                        key,
+                    ).fetchone()
+                    is None
+                )
+            cursor = self._conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id = ?",
+                (*key, base[0]),
+            )
+            return cursor.rowcount > 0
+        values = (
+            entry.checkpoint_id,
+            entry.parent_id,
+            *entry.checkpoint,
+            *entry.metadata,
+            entry.updated_at,
+        )
+        if base is not None and base[0] is not None:
+            cursor = self._conn.execute(
+                "UPDATE checkpoints SET checkpoint_id = ?, parent_id = ?, "
+                "checkpoint_type = ?, checkpoint = ?, metadata_type = ?, "
+                "metadata = ?, updated_at = ? "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (*values, *key, base[0]),
+            )
+            return cursor.rowcount > 0
+        # INSERT OR IGNORE keeps a row another worker created first; a thread
+        # never read from the database (no base) is simply replaced.
+        cursor = self._conn.execute(
+            f"INSERT OR {'IGNORE' if base is not None else 'REPLACE'} INTO "
+            "checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id, "
+            "checkpoint_type, checkpoint, metadata_type, metadata, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, *values),
+        )
+        return cursor.rowcount > 0
+
+    def commit(self, config: RunnableConfig) -> bool:
+        key = _thread_key(config)
+        self.flush()
+        with self._lock:
+            return self._conflicts.pop(key, None) is None
+
+    async def acommit(self, config: RunnableConfig) -> bool:
+        return await asyncio.to_thread(self.commit, config)
+
+    def _evict(self, key: Tuple[str, str]):
+        """Forget a thread's in-memory entry; runs under ``_lock``."""
+        self._threads.pop(key, None)
+        self._bases.pop(key, None)
+
+    def _flush_forever(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing checkpoints: {str(e)}")
+
+    def sweep(self) -> int:
+        removed = super().sweep()
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "DELETE FROM checkpoints WHERE updated_at <= ?",
+                (time.time() - self.ttl,),
+            )
+            self._conn.commit()
+        with self._lock:
+            # Pending writes of flushed threads only matter within their turn.
+            for key in [key for key in self._writes if key not in self._threads]:
+                del self._writes[key]
+            # Threads only read (never written back) leave their base behind.
+            stale = time.time() - self.ttl
+            for key in [
+                key
+                for key, (_, read_at) in self._bases.items()
+                if key not in self._threads and read_at <= stale
+            ]:
+                del self._bases[key]
+            # Conflicts of checkpoints no turn committed (e.g. put directly).
+            for key in [key for key, at in self._conflicts.items() if at <= stale]:
+                del self._conflicts[key]
+        return removed + cursor.rowcount
+
+    def close(self):
+        super().close()
+        self._flusher.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def create_checkpointer() -> LatestCheckpointSaver:
+    """Build the configured checkpointer and start its sweeper."""
+    if settings.CHECKPOINT_STORE == "sqlite":
+        saver = SQLiteCheckpointSaver(
+            settings.CHECKPOINT_TTL,
+            settings.CHECKPOINT_DB_PATH,
+            settings.CHECKPOINT_FLUSH_INTERVAL,
+        )
+    elif settings.CHECKPOINT_STORE == "memory":
+        saver = LatestCheckpointSaver(settings.CHECKPOINT_TTL)
+    else:
+        raise ValueError(f"Unknown checkpoint store: {settings.CHECKPOINT_STORE}")
+    saver.start_sweeper(settings.CHECKPOINT_SWEEP_INTERVAL)
+    return saver
+
+
+def get_checkpointer() -> LatestCheckpointSaver:
+    """The process-wide checkpointer, created on first use."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = create_checkpointer()
+    return _checkpointer
+
+
+def close_checkpointer():
+    """Flush and close the checkpointer if one was created."""
+    if _checkpointer is not None:
+        _checkpointer.close()
+
+
+def checkpointer_stats() -> Dict:
+    """Counters of the checkpointer if one was created; never reads the database."""
+    saver = _checkpointer
+    if saver is None:
+        return {}
+    return {**saver.stats, "threads_in_memory": saver.threads_in_memory}
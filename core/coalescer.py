@@ -0,0 +1,77 @@
+from typing import Awaitable, Callable, Dict, List, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class _ContactTurns:
+    __slots__ = ("lock", "pending", "leader", "active")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending: List[str] = []
+        self.leader = False
+        self.active = 0
+
+
+class TurnCoalescer:
+    """Runs at most one workflow turn per contact and merges message bursts.
+
+    The first message of a burst waits ``debounce`` seconds and then for the
+    contact's previous turn to finish; every message that arrives meanwhile is
+    folded into the same turn, so the contact gets a single reply.
+    """
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self._contacts: Dict[str, _ContactTurns] = {}
+        self.stats = {"messages": 0, "turns": 0, "merged": 0}
+
+    async def submit(
+        self,
+        key: str,
+        message: str,
+        run: Callable[[List[str]], Awaitable[T]],
+    ) -> T | None:
+        """Queue ``message`` for ``key``.
+
+        Returns the result of ``run`` for the caller that led the turn, or None
+        when the message was merged into a turn led by an earlier request.
+        """
+        contact = self._contacts.get(key)
+        if contact is None:
+            contact = self._contacts[key] = _ContactTurns()
+        contact.pending.append(message)
+        self.stats["messages"] += 1
+        if contact.leader:
+            self.stats["merged"] += 1
+            return None
+
+        contact.leader = True
+        contact.active += 1
+        drained = False
+        try:
+            if self.debounce > 0:
+                await asyncio.sleep(self.debounce)
+            async with contact.lock:
+                # Messages that arrive from here on start the next turn.
+                messages, contact.pending = contact.pending, []
+                contact.leader = False
+                drained = True
+                self.stats["turns"] += 1
+                return await run(messages)
+        finally:
+            if not drained:
+                # Cancelled before the turn ran; the next message picks these up.
+                contact.leader = False
+            contact.active -= 1
+            if not contact.active and not contact.pending:
+                del self._contacts[key]
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+
+def merge_messages(messages: List[str]) -> str:
+    """Combine a burst of messages into one user message."""
+    return "\n".join(messages)
@@ -0,0 +1,95 @@
+from typing import Dict
+from config import settings
+import threading
+
+# composio_openai takes most of a second to import, so it is only imported
+# when an email is first sent (or by the startup pre-warm).
+_toolset = None
+_toolset_lock = threading.Lock()
+
+
+def get_toolset():
+    """Return the process-wide Composio toolset, creating it on first use."""
+    global _toolset
+    if _toolset is None:
+        with _toolset_lock:
+            if _toolset is None:
+                from composio_openai import ComposioToolSet
+
+                _toolset = ComposioToolSet(api_key=settings.COMPOSIO_API_KEY)
+    return _toolset
+
+
+def gmail_action():
+    from composio_openai import Action
+
+    return getattr(Action, settings.GMAIL_SEND_ACTION)
+
+
+def execute_gmail_action(message: dict[str, str]) -> Dict:
+    """Run ``settings.GMAIL_SEND_ACTION`` for ``message`` directly, without a model."""
+    response = get_toolset().execute_action(
+        action=gmail_action(),
+        params={
+            "recipient_email": message["to"],
+            "subject": message["subject"],
+            "body": message["message_text"],
+        },
+    )
+    # Older Composio releases spell the flag "successfull".
+    if not response.get("successful", response.get("successfull", False)):
+        raise RuntimeError(f"Gmail action failed: {response.get('error')}")
+    return response
+
+
+def send_message_with_assistant(message: dict[str, str]) -> Dict:
+    """
+    Send an email message using Composio's Gmail tool via OpenAI Assistant.
+    """
+    from openai import OpenAI
+
+    openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    composio_tool_set = get_toolset()
+
+    # Get Gmail send email action
+    actions = composio_tool_set.get_actions(actions=[gmail_action()])
+
+    # Define the task for the assistant
+    my_task = (
+        f"Send an email to {message['to']} with subject '{message['subject']}' "
+        f"and body '{message['message_text']}'"
+    )
+
+    # Create the assistant with Gmail tool
+    assistant = openai_client.beta.assistants.create(
+        name="Gmail Assistant",
+        instructions="You can send emails via Gmail.",
+        model="gpt-4o",  # or any supported model
+        tools=actions,
+    )
+
+    try:
+        # Create a thread and add the user message
+        thread = openai_client.beta.threads.create()
+        openai_client.beta.threads.messages.create(
+            thread_id=thread.id,
+            role="user",
+            content=my_task,
+        )
+
+        # Run the assistant
+        run = openai_client.beta.threads.runs.create(
+            thread_id=thread.id,
+            assistant_id=assistant.id,
+        )
+
+        # Handle tool calls and process the response
+        response = composio_tool_set.wait_and_handle_assistant_tool_calls(
+            client=openai_client,
+            run=run,
+            thread=thread,
+        )
+    finally:
+        # Assistants are persistent objects; don't leave one behind per email
+        openai_client.beta.assistants.delete(assistant.id)
+    return response
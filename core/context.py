@@ -0,0 +1,116 @@
+from typing import Dict
+from config import settings
+import json
+import re
+
+
+def parse_token_budgets(spec: str) -> Dict[str, int]:
+    """Parse "node=tokens,node=tokens" into a dict."""
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            node, tokens = item.split("=", 1)
+            budgets[node.strip()] = int(tokens)
+    return budgets
+
+
+NODE_TOKEN_BUDGETS = parse_token_budgets(settings.CONTEXT_TOKEN_BUDGETS)
+
+# Quoted history in email replies: "On <date>, <name> wrote:" and "> ..." lines
+QUOTED_REPLY_HEADER = re.compile(r"^\s*On .{0,200}wrote:\s*$", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def render_message(role: str, content: str) -> str:
+    return f"{role}: {content}"
+
+
+def strip_quoted_reply(text: str) -> str:
+    """Drop the quoted thread an email client appends below a reply."""
+    match = QUOTED_REPLY_HEADER.search(text)
+    if match and match.start() > 0:
+        text = text[: match.start()]
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith(">")]
+    return "\n".join(lines).strip() or text.strip()
+
+
+def compact_messages(state: Dict, max_messages: int = settings.CONTEXT_MAX_MESSAGES):
+    """Fold messages beyond the last ``max_messages`` into the rolling summary.
+
+    Only the user's words are summarized (clipped per message); assistant
+    questions are dropped since ``collected_fields`` already records what was
+    answered. The history is cut down to half the limit so that compaction,
+    and the transcript rebuild it causes, happen only every few turns.
+    """
+    messages = state["messages"]
+    if len(messages) <= max_messages:
+        return
+    keep = max(1, max_messages // 2)
+    dropped = messages[:-keep]
+    if not state.get("opening_message"):
+        state["opening_message"] = next(
+            (content for role, content in dropped if role == "user"), ""
+        )
+    snippets = [
+        " ".join(content.split())[: settings.CONTEXT_SNIPPET_CHARS]
+        for role, content in dropped
+        if role == "user"
+    ]
+    summary = " | ".join(filter(None, [state.get("summary", ""), *snippets]))
+    # Keep the most recent part of the summary within its size limit.
+    state["summary"] = summary[-settings.CONTEXT_SUMMARY_CHARS :]
+    del messages[:-keep]
+    state["transcript"] = "\n".join(render_message(*message) for message in messages)
+    state["transcript_length"] = len(messages)
+
+
+def sync_transcript(state: Dict) -> str:
+    """Append messages added since the last call to the cached transcript."""
+    messages = state["messages"]
+    rendered = state.get("transcript_length", 0)
+    if rendered > len(messages):
+        rendered = 0
+        state["transcript"] = ""
+    if rendered < len(messages):
+        new_lines = "\n".join(
+            render_message(*message) for message in messages[rendered:]
+        )
+        transcript = state.get("transcript", "") if rendered else ""
+        state["transcript"] = f"{transcript}\n{new_lines}" if transcript else new_lines
+        state["transcript_length"] = len(messages)
+    return state.get("transcript", "")
+
+
+def conversation_context(state: Dict, node: str) -> str:
+    """Conversation text for ``node``'s prompt.
+
+    The summary of older turns comes first, then the recent transcript,
+    trimmed from its oldest line to fit the node's token budget.
+    """
+    compact_messages(state)
+    transcript = sync_transcript(state)
+    budget = NODE_TOKEN_BUDGETS.get(node)
+    header = ""
+    if state.get("summary"):
+        summary = state["summary"]
+        if budget:
+            # The summary may use at most half of the budget.
+            summary = summary[-budget * 2 :]
+        collected = json.dumps(state["collected_fields"], separators=(",", ":"))
+        header = (
+            f"Summary of earlier user messages: {summary}\n"
+            f"Fields collected so far: {collected}\n"
+        )
+    if budget:
+        max_chars = max(budget * 4 - len(header), 0)
+        if len(transcript) > max_chars:
+            transcript = transcript[len(transcript) - max_chars :]
+            # Start at a message boundary when one is in range.
+            newline = transcript.find("\n")
+            if newline != -1:
+                transcript = transcript[newline + 1 :]
+    return header + transcript
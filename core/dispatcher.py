@@ -0,0 +1,401 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List
+from twilio.base.exceptions import TwilioRestException
+from config import settings
+from core.composio_client import (
+    execute_gmail_action,
+    get_toolset,
+    send_message_with_assistant,
+)
+from core.metrics import (
+    outbound_in_flight,
+    outbound_messages,
+    outbound_seconds,
+    trace_id_var,
+)
+import asyncio
+import random
+import time
+import uuid
+
+
+class OutboundMessage:
+    """A reply waiting to be delivered on ``channel`` ("sms" or "email")."""
+
+    __slots__ = (
+        "id",
+        "channel",
+        "to",
+        "body",
+        "subject",
+        "attempts",
+        "queued_at",
+        "trace_id",
+    )
+
+    def __init__(self, channel: str, to: str, body: str, subject: str = ""):
+        self.id = uuid.uuid4().hex
+        self.channel = channel
+        self.to = to
+        self.body = body
+        self.subject = subject
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+        self.trace_id = trace_id_var.get()
+
+
+class DeliveryResult:
+    __slots__ = (
+        "message_id",
+        "channel",
+        "to",
+        "status",
+        "attempts",
+        "provider_id",
+        "error",
+        "latency_ms",
+        "trace_id",
+    )
+
+    def __init__(self, message: OutboundMessage, status: str, provider_id=None):
+        self.message_id = message.id
+        self.channel = message.channel
+        self.to = message.to
+        self.status = status
+        self.attempts = message.attempts
+        self.provider_id = provider_id
+        self.error = None
+        self.latency_ms = (time.monotonic() - message.queued_at) * 1000
+        self.trace_id = message.trace_id
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Transport(ABC):
+    """Delivers messages for one channel; ``send`` returns the provider's message id."""
+
+    @abstractmethod
+    async def send(self, message: OutboundMessage) -> str | None:
+        """Deliver ``message``; raises on failure."""
+
+    def is_retryable(self, error: Exception) -> bool:
+        return True
+
+    def warm_up(self):
+        """Load the provider client ahead of the first send (runs in a thread)."""
+
+    async def close(self):
+        pass
+
+
+def twilio_client_classes():
+    """Twilio's REST client and its aiohttp transport, imported on first use."""
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+    from twilio.rest import Client
+
+    return Client, AsyncTwilioHttpClient
+
+
+class TwilioTransport(Transport):
+    """SMS through Twilio's async API on a pooled aiohttp session."""
+
+    def __init__(self):
+        self._client = None
+        self._http_client = None
+
+    def _get_client(self):
+        if self._client is None:
+            Client, AsyncTwilioHttpClient = twilio_client_classes()
+            # The aiohttp session must be created inside the running loop.
+            self._http_client = AsyncTwilioHttpClient(
+                timeout=settings.DISPATCH_SEND_TIMEOUT
+            )
+            self._client = Client(
+                settings.TWILIO_ACCOUNT_SID,
+                settings.TWILIO_AUTH_TOKEN,
+                http_client=self._http_client,
+            )
+        return self._client
+
+    async def send(self, message: OutboundMessage) -> str | None:
+        sent = await self._get_client().messages.create_async(
+            body=message.body, from_=settings.TWILIO_PHONE_NUMBER, to=message.to
+        )
+        return sent.sid
+
+    def warm_up(self):
+        twilio_client_classes()
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, TwilioRestException):
+            return error.status == 429 or error.status >= 500
+        return True
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.close()
+            self._http_client = None
+            self._client = None
+
+
+class GmailTransport(Transport):
+    """Email through the Composio Gmail action, run in a worker thread."""
+
+    async def send(self, message: OutboundMessage) -> str | None:
+        email = {
+            "to": message.to,
+            "subject": message.subject,
+            "message_text": message.body,
+        }
+        if settings.GMAIL_SEND_MODE == "assistant":
+            await asyncio.to_thread(send_message_with_assistant, email)
+            return None
+        response = await asyncio.to_thread(execute_gmail_action, email)
+        return (response.get("data") or {}).get("id")
+
+    def warm_up(self):
+        get_toolset()
+
+
+class FakeTransport(Transport):
+    """Records messages instead of sending them, for local runs and tests."""
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.sent: List[OutboundMessage] = []
+
+    async def send(self, message: OutboundMessage) -> str | None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("fake transport failure")
+        self.sent.append(message)
+        print(f"[fake {message.channel}] to {message.to}: {message.body}")
+        return f"fake-{len(self.sent)}"
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` sends per second with bursts of ``burst``."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class OutboundDispatcher:
+    """Async queues plus bounded pools of workers delivering SMS and email replies.
+
+    Each channel has its own queue, workers, transport and token bucket
+    (Twilio long codes allow about one message per second), so a backlog
+    waiting on one channel's rate limit never delays another channel. Failed
+    sends are retried with jittered exponential backoff without holding a
+    worker, and the outcome of every message is kept in a bounded ``results``
+    map.
+    """
+
+    def __init__(
+        self,
+        transports: Dict[str, Transport],
+        rate_limits: Dict[str, float] | None = None,
+        workers: int = settings.DISPATCH_WORKERS,
+        max_queue: int = settings.DISPATCH_MAX_QUEUE,
+        max_attempts: int = settings.DISPATCH_MAX_ATTEMPTS,
+        retry_base_delay: float = settings.DISPATCH_RETRY_BASE_DELAY,
+        retry_max_delay: float = settings.DISPATCH_RETRY_MAX_DELAY,
+        max_results: int = 1000,
+    ):
+        self.transports = transports
+        self.buckets = {
+            channel: TokenBucket(rate) for channel, rate in (rate_limits or {}).items()
+        }
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_results = max_results
+        self.results: "OrderedDict[str, DeliveryResult]" = OrderedDict()
+        # One queue per channel, served by ``workers`` workers each
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self.stats = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "last_send_ms": 0.0,
+            "max_send_ms": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def _queue_for(self, channel: str) -> asyncio.Queue:
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue(self.max_queue)
+        return queue
+
+    def start(self):
+        """Start each channel's workers on the running event loop."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(
+                self._worker(self._queue_for(channel)),
+                name=f"dispatcher-{channel}-{i}",
+            )
+            for channel in self.transports
+            for i in range(self.workers)
+        ]
+
+    def warm_up(self):
+        """Load every transport's provider client; errors are logged, not raised."""
+        for channel, transport in self.transports.items():
+            try:
+                transport.warm_up()
+            except Exception as e:
+                print(f"Error warming up {channel} transport: {str(e)}")
+
+    async def stop(self, timeout: float = settings.DISPATCH_DRAIN_TIMEOUT):
+        """Deliver what is queued (up to ``timeout`` seconds), then shut down."""
+        if self._queues and self._tasks:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self._queues.values())),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                print(
+                    f"Dispatcher stopped with {self.queue_depth} messages undelivered"
+                )
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self._retries = set()
+        for transport in self.transports.values():
+            await transport.close()
+
+    async def send(self, channel: str, to: str, body: str, subject: str = "") -> str:
+        """Queue a message and return its id; waits only while the queue is full."""
+        if channel not in self.transports:
+            raise ValueError(f"No transport for channel {channel}")
+        message = OutboundMessage(channel, to, body, subject)
+        await self._queue_for(channel).put(message)
+        self.stats["queued"] += 1
+        return message.id
+
+    def result(self, message_id: str) -> DeliveryResult | None:
+        return self.results.get(message_id)
+
+    async def _worker(self, queue: asyncio.Queue):
+        # Waiting on the channel's token bucket only holds this channel's workers.
+        while True:
+            message = await queue.get()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                print(f"Dispatcher error for message {message.id}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, message: OutboundMessage):
+        transport = self.transports[message.channel]
+        bucket = self.buckets.get(message.channel)
+        if bucket is not None:
+            await bucket.acquire()
+        message.attempts += 1
+        trace_token = trace_id_var.set(message.trace_id)
+        outbound_in_flight.inc(channel=message.channel)
+        started = time.perf_counter()
+        try:
+            provider_id = await transport.send(message)
+        except Exception as e:
+            if message.attempts < self.max_attempts and transport.is_retryable(e):
+                outbound_messages.inc(channel=message.channel, status="retried")
+                self._schedule_retry(message, e)
+                return
+            print(
+                f"Failed to send {message.channel} to {message.to} after "
+                f"{message.attempts} attempts: {str(e)}"
+            )
+            result = DeliveryResult(message, "failed")
+            result.error = str(e)
+            self.stats["failed"] += 1
+        else:
+            print(f"Sent {message.channel} to {message.to} ({provider_id})")
+            result = DeliveryResult(message, "sent", provider_id)
+            self.stats["sent"] += 1
+        finally:
+            elapsed = time.perf_counter() - started
+            outbound_in_flight.dec(channel=message.channel)
+            outbound_seconds.observe(elapsed, channel=message.channel)
+            trace_id_var.reset(trace_token)
+        self.stats["last_send_ms"] = elapsed * 1000
+        self.stats["max_send_ms"] = max(self.stats["max_send_ms"], elapsed * 1000)
+        outbound_messages.inc(channel=message.channel, status=result.status)
+        self._record(result)
+
+    def _schedule_retry(self, message: OutboundMessage, error: Exception):
+        delay = min(
+            self.retry_max_delay, self.retry_base_delay * 2 ** (message.attempts - 1)
+        )
+        delay = random.uniform(delay / 2, delay)
+        print(
+            f"Retrying {message.channel} to {message.to} in {delay:.1f}s: {str(error)}"
+        )
+        self.stats["retries"] += 1
+        task = asyncio.create_task(self._requeue(message, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, message: OutboundMessage, delay: float):
+        await asyncio.sleep(delay)
+        await self._queue_for(message.channel).put(message)
+
+    def _record(self, result: DeliveryResult):
+        self.results[result.message_id] = result
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+
+def create_dispatcher() -> OutboundDispatcher:
+    """Dispatcher with the configured transports ("live" or "fake")."""
+    if settings.DISPATCH_TRANSPORT == "fake":
+        transports = {"sms": FakeTransport(), "email": FakeTransport()}
+    elif settings.DISPATCH_TRANSPORT == "live":
+        transports = {"sms": TwilioTransport(), "email": GmailTransport()}
+    else:
+        raise ValueError(f"Unknown dispatch transport: {settings.DISPATCH_TRANSPORT}")
+    return OutboundDispatcher(
+        transports,
+        rate_limits={"sms": settings.TWILIO_MPS, "email": settings.EMAIL_MPS},
+    )
+
+
+dispatcher = create_dispatcher()
@@ -1,6 +1,14 @@
 import re
-from datetime import datetime
+from typing import List
 import json
+from core.messages import (
+    NEXT_QUESTION_CHAT_MESSAGE,
+    NEXT_QUESTION_EMAIL_MESSAGE,
+    NEXT_QUESTION_SMS_MESSAGE,
+)
+from core.schemas import IntakeRecord, get_schema
+
+COMPLETE_REPLY_PREFIX = "Okay"
 
 
 def extract_json_from_reply(reply: str):
@@ -14,10 +22,117 @@ def extract_json_from_reply(reply: str):
 
 
 def complete_reply(reply: str):
-    match = reply.startswith("Okay")
+    match = reply.startswith(COMPLETE_REPLY_PREFIX)
     return match
 
 
+class JsonObjectScanner:
+    """
+    Incrementally finds top-level JSON objects in a streamed reply.
+    Each call to feed() only scans the new chunk, and every completed object
+    is returned exactly once.
+    """
+
+    _STRUCTURAL = re.compile(r'[{}"]')
+    _STRING_END = re.compile(r'["\\]')
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._parts: List[str] = []
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume a chunk and return the objects it completed."""
+        objects = []
+        start = 0 if self._depth else None
+        pos = 0
+        while pos < len(chunk):
+            if self._escaped:
+                self._escaped = False
+                pos += 1
+                continue
+            if self._in_string:
+                match = self._STRING_END.search(chunk, pos)
+                if not match:
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                continue
+            if not self._depth:
+                pos = chunk.find("{", pos)
+                if pos < 0:
+                    break
+                start = pos
+                self._depth = 1
+                pos += 1
+                continue
+            match = self._STRUCTURAL.search(chunk, pos)
+            if not match:
+                break
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if not self._depth:
+                    self._parts.append(chunk[start:pos])
+                    parsed = self._parse("".join(self._parts))
+                    self._parts = []
+                    start = None
+                    if parsed is not None:
+                        objects.append(parsed)
+        if self._depth and start is not None:
+            self._parts.append(chunk[start:])
+        return objects
+
+    @staticmethod
+    def _parse(text: str):
+        try:
+            parsed = json.loads(text)
+        except Exception:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+
+def missing_fields(required_fields: List[str], collected_fields: dict) -> List[str]:
+    """
+    Returns the required fields that have not been collected yet, in order.
+    """
+    return [
+        field
+        for field in required_fields
+        if not str(collected_fields.get(field) or "").strip()
+    ]
+
+
+def build_next_question(intent: str, missing: List[str], channel: str) -> str:
+    """
+    Builds the follow-up question for the missing fields from templates,
+    phrased for the channel: a bulleted list for email, one sentence otherwise.
+    """
+    schema = get_schema(intent)
+    known = schema.labels if schema else {}
+    labels = [known.get(field) or field.replace("_", " ") for field in missing]
+    if channel == "email":
+        return NEXT_QUESTION_EMAIL_MESSAGE.format(
+            fields="\n".join(f"- {label.capitalize()}" for label in labels)
+        )
+    if len(labels) > 1:
+        fields = ", ".join(labels[:-1]) + " and " + labels[-1]
+    else:
+        fields = labels[0]
+    if channel == "sms":
+        return NEXT_QUESTION_SMS_MESSAGE.format(fields=fields)
+    return NEXT_QUESTION_CHAT_MESSAGE.format(fields=fields)
+
+
 def extract_email(email: str) -> str | None:
     """
     Extracts the first email address found in the given text.
@@ -28,159 +143,36 @@ def extract_email(email: str) -> str | None:
     return match.group(0) if match else None
 
 
-def data_parse(data: dict) -> dict:
+def data_parse(data: dict) -> IntakeRecord | None:
     """
-    Parses the data dictionary to extract relevant fields for storage.
-    Returns a dictionary with the parsed data.
+    Builds the sheet row for a workflow state from its intent's schema.
+    Returns None when the intent is unknown.
     """
-    if data.get("intent") == "PRIVATE_PAY":
-        parsed_data = {
-            "channel": data.get("channel", ""),
-            "contact_info": data.get("contact_info", ""),
-            "patient_name": data.get("collected_fields", {}).get("patient_name", ""),
-            "weight": data.get("collected_fields", {}).get("weight", ""),
-            "pickup_address": data.get("collected_fields", {}).get(
-                "pickup_address", ""
-            ),
-            "drop_off_address": data.get("collected_fields", {}).get(
-                "drop_off_address", ""
-            ),
-            "appointment_date": data.get("collected_fields", {}).get(
-                "appointment_date", ""
-            ),
-            "one_way_or_round_trip": data.get("collected_fields", {}).get(
-                "one_way_or_round_trip", ""
-            ),
-            "equipment_needed": data.get("collected_fields", {}).get(
-                "equipment_needed", ""
-            ),
-            "any_stairs_and_accompanying_passengers": data.get(
-                "collected_fields", {}
-            ).get("any_stairs_and_accompanying_passengers", ""),
-            "user_name": data.get("collected_fields", {}).get("user_name", ""),
-            "phone_number": data.get("collected_fields", {}).get("phone_number", ""),
-            "email": data.get("collected_fields", {}).get("email", ""),
-            "update_time": datetime.now().isoformat(),
-            "status": data.get("status", ""),
-        }
-    elif data.get("intent") == "INSURANCE_CASE_MANAGERS":
-        parsed_data = {
-            "channel": data.get("channel", ""),
-            "contact_info": data.get("contact_info", ""),
-            "patient_name": data.get("collected_fields", {}).get("patient_name", ""),
-            "pickup_address": data.get("collected_fields", {}).get(
-                "pickup_address", ""
-            ),
-            "drop_off_address": data.get("collected_fields", {}).get(
-                "drop_off_address", ""
-            ),
-            "authorization_number": data.get("collected_fields", {}).get(
-                "authorization_number", ""
-            ),
-            "appointment_date": data.get("collected_fields", {}).get(
-                "appointment_date", ""
-            ),
-            "update_time": datetime.now().isoformat(),
-            "status": data.get("status", ""),
-        }
-    elif data.get("intent") == "DISCHARGE":
-        parsed_data = {
-            "channel": data.get("channel", ""),
-            "contact_info": data.get("contact_info", ""),
-            "patient_name": data.get("collected_fields", {}).get("patient_name", ""),
-            "pickup_facility_name": data.get("collected_fields", {}).get(
-                "pickup_facility_name", ""
-            ),
-            "pickup_facility_address": data.get("collected_fields", {}).get(
-                "pickup_facility_address", ""
-            ),
-            "pickup_facility_room_number": data.get("collected_fields", {}).get(
-                "pickup_facility_room_number", ""
-            ),
-            "drop_off_facility_name": data.get("collected_fields", {}).get(
-                "drop_off_facility_name", ""
-            ),
-            "drop_off_facility_address": data.get("collected_fields", {}).get(
-                "drop_off_facility_address", ""
-            ),
-            "drop_off_facility_room_number": data.get("collected_fields", {}).get(
-                "drop_off_facility_room_number", ""
-            ),
-            "appointment_date": data.get("collected_fields", {}).get(
-                "appointment_date", ""
-            ),
-            "oxygen_is_needed": data.get("collected_fields", {}).get(
-                "oxygen_is_needed", ""
-            ),
-            "oxygen_amount": data.get("collected_fields", {}).get("oxygen_amount", ""),
-            "is_infectious_disease": data.get("collected_fields", {}).get(
-                "is_infectious_disease", ""
-            ),
-            "weight": data.get("collected_fields", {}).get("weight", ""),
-            "update_time": datetime.now().isoformat(),
-            "status": data.get("status", ""),
-        }
+    schema = get_schema(data.get("intent"))
+    if schema is None:
+        print("No intake schema for intent:", data.get("intent"))
+        return None
+    parsed_data = schema.record(
+        data.get("channel", ""),
+        data.get("contact_info", ""),
+        data.get("collected_fields") or {},
+        data.get("status", ""),
+    )
     print("parsed_data:", parsed_data)
     return parsed_data
 
 
-def data_parse_from_chat(data: dict, channel: str, contact_info: str) -> dict:
+def data_parse_from_chat(
+    data: dict, channel: str, contact_info: str
+) -> IntakeRecord | None:
     """
-    Parses the data dictionary to extract relevant fields for storage.
-    Returns a dictionary with the parsed data.
+    Builds the completed sheet row for a /chat summary from its intent's schema.
+    Returns None when the intent is unknown.
     """
-    if data.get("intent") == "PRIVATE_PAY":
-        parsed_data = {
-            "channel": channel,
-            "contact_info": contact_info,
-            "patient_name": data.get("patient_name", ""),
-            "weight": data.get("weight", ""),
-            "pickup_address": data.get("pickup_address", ""),
-            "drop_off_address": data.get("dropoff_address", ""),
-            "appointment_date": data.get("appointment_date", ""),
-            "one_way_or_round_trip": data.get("one_way_or_round_trip", ""),
-            "equipment_needed": data.get("equipment_needed", ""),
-            "any_stairs_and_accompanying_passengers": data.get(
-                "any_stairs_and_accompanying_passengers", ""
-            ),
-            "user_name": data.get("user_name", ""),
-            "phone_number": data.get("phone_number", ""),
-            "email": data.get("email", ""),
-            "update_time": datetime.now().isoformat(),
-            "status": "completed",
-        }
-    elif data.get("intent") == "INSURANCE_CASE_MANAGERS":
-        parsed_data = {
-            "channel": channel,
-            "contact_info": contact_info,
-            "patient_name": data.get("patient_name", ""),
-            "pickup_address": data.get("pickup_address", ""),
-            "drop_off_address": data.get("dropoff_address", ""),
-            "authorization_number": data.get("authorization_number", ""),
-            "appointment_date": data.get("appointment_date", ""),
-            "update_time": datetime.now().isoformat(),
-            "status": "completed",
-        }
-    elif data.get("intent") == "DISCHARGE":
-        parsed_data = {
-            "channel": channel,
-            "contact_info": contact_info,
-            "patient_name": data.get("patient_name", ""),
-            "pickup_facility_name": data.get("pickup_facility_name", ""),
-            "pickup_facility_address": data.get("pickup_facility_address", ""),
-            "pickup_facility_room_number": data.get("pickup_facility_room_number", ""),
-            "drop_off_facility_name": data.get("dropoff_facility_name", ""),
-            "drop_off_facility_address": data.get("dropoff_facility_address", ""),
-            "drop_off_facility_room_number": data.get(
-                "dropoff_facility_room_number", ""
-            ),
-            "appointment_date": data.get("appointment_date", ""),
-            "is_oxygen_needed": data.get("is_oxygen_needed", ""),
-            "oxygen_amount": data.get("oxygen_amount", ""),
-            "is_infectious_disease": data.get("is_infectious_disease", ""),
-            "weight": data.get("weight", ""),
-            "update_time": datetime.now().isoformat(),
-            "status": "completed",
-        }
+    schema = get_schema(data.get("intent"))
+    if schema is None:
+        print("No intake schema for intent:", data.get("intent"))
+        return None
+    parsed_data = schema.record_from_chat(data, channel, contact_info)
     print("parsed_data:", parsed_data)
     return parsed_data
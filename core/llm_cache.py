@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+from langchain_core.prompts import ChatPromptTemplate
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def normalize_input(text: str) -> str:
+    """Case- and whitespace-insensitive form of a user message."""
+    return " ".join(text.lower().split()).strip(" .!?")
+
+
+class LLMResponseCache:
+    """Exact-match cache of LLM replies: an in-memory LRU plus an optional SQLite tier.
+
+    Keys combine the model, the prompt name, a hash of the prompt template and
+    the normalized input, so editing a prompt invalidates its entries.
+
+    ``set`` never touches the disk: new replies are buffered and written in
+    one transaction every ``flush_interval`` seconds by a background thread.
+    ``aget`` reads the SQLite tier in a worker thread, so callers on the
+    event loop never block on it. The same thread deletes expired rows every
+    ``purge_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        prompts: Iterable[str],
+        max_size: int,
+        ttl: float,
+        path: str = "",
+        flush_interval: float = 1.0,
+        purge_interval: float = 3600,
+    ):
+        self.prompts = set(prompts)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self._purged_at = time.monotonic()
+        self._lock = threading.Lock()
+        # Guards the connection, so disk reads never hold up memory hits
+        self._db_lock = threading.Lock()
+        # key -> (content, expires_at) not yet written to disk
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._flusher = None
+        self._stop = threading.Event()
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._prompt_hashes: Dict[int, str] = {}
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        self.stats: Dict[str, Dict[str, int]] = {
+            name: {"hits": 0, "disk_hits": 0, "misses": 0} for name in self.prompts
+        }
+
+    def enabled_for(self, prompt_name: str) -> bool:
+        return prompt_name in self.prompts
+
+    def key(
+        self, model: str, prompt_name: str, prompt: ChatPromptTemplate, text: str
+    ) -> str:
+        prompt_hash = self._prompt_hashes.get(id(prompt))
+        if prompt_hash is None:
+            prompt_hash = hashlib.sha256(repr(prompt.messages).encode()).hexdigest()
+            self._prompt_hashes[id(prompt)] = prompt_hash
+        raw = "\x1f".join((model, prompt_name, prompt_hash, normalize_input(text)))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, prompt_name: str, key: str) -> str | None:
+        """Return the cached reply, checking memory first and then disk."""
+        content = self._memory_get(prompt_name, key)
+        if content is None and self._conn is not None:
+            content = self._disk_get(prompt_name, key)
+        if content is None:
+            self.stats[prompt_name]["misses"] += 1
+        return content
+
+    async def aget(self, prompt_name: str, key: str) -> str | None:
+        """``get`` for the event loop: the disk tier is read in a worker thread."""
+        content = self._memory_get(prompt_name, key)
+        if content is None and self._conn is not None:
+            content = await asyncio.to_thread(self._disk_get, prompt_name, key)
+        if content is None:
+            self.stats[prompt_name]["misses"] += 1
+        return content
+
+    def set(self, key: str, content: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, content)
+            if self._conn is not None:
+                self._pending[key] = (content, expires_at)
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_forever,
+                        name="llm-cache-flusher",
+                        daemon=True,
+                    )
+                    self._flusher.start()
+
+    def flush(self):
+        """Write buffered replies to the SQLite tier in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, content, expires_at) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, content, expires_at)
+                    for key, (content, expires_at) in pending.items()
+                ],
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the SQLite tier; returns how many went."""
+        with self._db_lock:
+            deleted = self._conn.execute(
+                "DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def close(self):
+        """Stop the flusher and write what is still buffered."""
+        self._stop.set()
+        if self._conn is not None:
+            self.flush()
+
+    def _flush_forever(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                self._maybe_purge()
+            except Exception as e:
+                print(f"Error writing the LLM cache: {str(e)}")
+
+    def _maybe_purge(self):
+        """Purge expired rows every ``purge_interval`` seconds (0 never)."""
+        if not self.purge_interval:
+            return
+        if time.monotonic() - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = time.monotonic()
+        deleted = self.purge_expired()
+        if deleted:
+            print(f"Purged {deleted} expired LLM cache rows")
+
+    def _memory_get(self, prompt_name: str, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.stats[prompt_name]["hits"] += 1
+            return entry[1]
+
+    def _disk_get(self, prompt_name: str, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            content, expires_at = pending
+        else:
+            with self._db_lock:
+                row = self._conn.execute(
+                    "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            content, expires_at = row
+        if expires_at <= now:
+            return None
+        with self._lock:
+            self._remember(key, expires_at, content)
+        self.stats[prompt_name]["disk_hits"] += 1
+        return content
+
+    def _remember(self, key: str, expires_at: float, content: str):
+        self._memory[key] = (expires_at, content)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
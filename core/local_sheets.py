@@ -0,0 +1,161 @@
+from typing import Dict, List
+import gspread
+from core.schemas import sheet_headers
+import json
+import os
+import re
+import threading
+
+# Header rows used when a local worksheet is first created.
+LOCAL_SHEET_HEADERS: Dict[str, List[str]] = sheet_headers()
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def _parse_range(a1: str):
+    """Parse "A2:C2", "1:1" or "B:B" into 1-indexed (row1, col1, row2, col2)."""
+    a1 = a1.split("!")[-1]
+    start, _, end = a1.partition(":")
+    end = end or start
+    bounds = []
+    for cell in (start, end):
+        letters, digits = re.fullmatch(r"([A-Z]*)(\d*)", cell).groups()
+        bounds.append(
+            (int(digits) if digits else None, _column_number(letters) or None)
+        )
+    (row1, col1), (row2, col2) = bounds
+    return row1, col1, row2, col2
+
+
+class LocalWorksheet:
+    """Subset of :class:`gspread.Worksheet` backed by a :class:`LocalSpreadsheet`."""
+
+    def __init__(self, spreadsheet: "LocalSpreadsheet", title: str):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    @property
+    def _rows(self) -> List[List[str]]:
+        return self.spreadsheet._data[self.title]
+
+    def get_all_values(self) -> List[List[str]]:
+        with self.spreadsheet._lock:
+            return [list(row) for row in self._rows]
+
+    def row_values(self, row: int) -> List[str]:
+        with self.spreadsheet._lock:
+            values = self._rows[row - 1] if row <= len(self._rows) else []
+            return _trim(list(values))
+
+    def col_values(self, col: int) -> List[str]:
+        with self.spreadsheet._lock:
+            return _trim(
+                [row[col - 1] if len(row) >= col else "" for row in self._rows]
+            )
+
+    def batch_get(self, ranges: List[str], major_dimension: str = "ROWS"):
+        with self.spreadsheet._lock:
+            return [self._get(a1, major_dimension) for a1 in ranges]
+
+    def update(self, range_name: str, values: List[List]):
+        self.batch_update([{"range": range_name, "values": values}])
+        return {"updatedRange": f"'{self.title}'!{range_name}"}
+
+    def batch_update(self, data: List[Dict]):
+        with self.spreadsheet._lock:
+            for item in data:
+                row1, col1, _, _ = _parse_range(item["range"])
+                for offset, values in enumerate(item["values"]):
+                    self._write_row(row1 + offset, col1 or 1, values)
+            self.spreadsheet._save()
+        return {"totalUpdatedRows": sum(len(item["values"]) for item in data)}
+
+    def append_row(self, values: List) -> Dict:
+        return self.append_rows([values])
+
+    def append_rows(self, values: List[List]) -> Dict:
+        with self.spreadsheet._lock:
+            rows = self._rows
+            while rows and not any(rows[-1]):
+                rows.pop()
+            first = len(rows) + 1
+            rows.extend([_cell(value) for value in row] for row in values)
+            self.spreadsheet._save()
+            return {
+                "updates": {
+                    "updatedRange": f"'{self.title}'!A{first}:A{len(rows)}",
+                    "updatedRows": len(values),
+                }
+            }
+
+    def _get(self, a1: str, major_dimension: str) -> List[List[str]]:
+        row1, col1, row2, col2 = _parse_range(a1)
+        rows = self._rows
+        width = max((len(row) for row in rows), default=0)
+        row1, row2 = row1 or 1, row2 or len(rows)
+        col1, col2 = col1 or 1, col2 or width
+        grid = [
+            [row[c - 1] if len(row) >= c else "" for c in range(col1, col2 + 1)]
+            for row in rows[row1 - 1 : row2]
+        ]
+        if major_dimension.upper() == "COLUMNS":
+            grid = [list(column) for column in zip(*grid)]
+        return [_trim(line) for line in _trim(grid, empty=lambda line: not any(line))]
+
+    def _write_row(self, row_number: int, col: int, values: List):
+        rows = self._rows
+        while len(rows) < row_number:
+            rows.append([])
+        row = rows[row_number - 1]
+        while len(row) < col - 1 + len(values):
+            row.append("")
+        for offset, value in enumerate(values):
+            row[col - 1 + offset] = _cell(value)
+
+
+class LocalSpreadsheet:
+    """JSON-file stand-in for a Google spreadsheet, for offline runs and tests."""
+
+    def __init__(self, path: str, headers: Dict[str, List[str]] = None):
+        self.path = path
+        self.headers = LOCAL_SHEET_HEADERS if headers is None else headers
+        self._lock = threading.RLock()
+        self._data: Dict[str, List[List[str]]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    def worksheet(self, title: str) -> LocalWorksheet:
+        with self._lock:
+            if title not in self._data:
+                if title not in self.headers:
+                    raise gspread.exceptions.WorksheetNotFound(title)
+                self._data[title] = [list(self.headers[title])]
+                self._save()
+            return LocalWorksheet(self, title)
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp_path, self.path)
+
+
+def _cell(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _trim(values: List, empty=lambda value: value == "") -> List:
+    """Drop trailing empty cells the way the Sheets API does."""
+    end = len(values)
+    while end and empty(values[end - 1]):
+        end -= 1
+    return values[:end]
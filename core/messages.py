@@ -19,3 +19,14 @@ Happy to help here. Please reply with:
 
 COMPLETE_MESSAGE = """Thank you — we’ve received the transport request for {patient_name}. We’ll forward this to dispatch for review and follow up shortly."""
 COMPLETE_DISCHARGE_MESSAGE = """Thank you — we’ve received the discharge request for {patient_name}. Our dispatch team will review availability. If we’re unavailable at the requested time, we’ll call back with the next available option."""
+
+CLARIFY_INTENT_MESSAGE = """Thanks for reaching out! Is this a private-pay ride, a request from an insurance case manager, or a hospital discharge?"""
+
+NEXT_QUESTION_SMS_MESSAGE = """Thanks! Could you please send {fields}?"""
+NEXT_QUESTION_CHAT_MESSAGE = (
+    """Thank you! To continue, could you please provide {fields}?"""
+)
+NEXT_QUESTION_EMAIL_MESSAGE = """Thank you for the details so far!
+To complete the request, please reply with:
+
+{fields}"""
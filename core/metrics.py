@@ -0,0 +1,316 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+import functools
+import inspect
+import threading
+import time
+import uuid
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Trace ID of the request being handled; copied into worker threads by
+# asyncio.to_thread and into background turns by TurnQueue.
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="")
+# LangGraph node currently running, used to label LLM calls.
+current_node_var: ContextVar[str] = ContextVar("current_node", default="")
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra="") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels):
+        self.inc(-value, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts, then sum and count.
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = format_labels(self.labels, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                labels = format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Besides counters, gauges and histograms, components that already keep a
+    ``stats`` dict can be exported with ``register_stats``; they are read at
+    scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._stats: List[Tuple[str, Callable[[], Dict]]] = []
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict]):
+        """Export every numeric value of ``stats()`` as gauge ``<prefix>_<key>``."""
+        self._stats.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self._stats:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Error collecting {prefix} metrics: {str(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+metrics = MetricsRegistry()
+
+http_request_seconds = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ("method", "route", "status"),
+)
+node_seconds = metrics.histogram(
+    "intake_node_duration_seconds",
+    "Intake workflow node latency",
+    ("node", "intent", "channel"),
+)
+node_errors = metrics.counter(
+    "intake_node_errors_total",
+    "Intake workflow node failures",
+    ("node", "intent", "channel"),
+)
+node_in_flight = metrics.gauge(
+    "intake_node_in_flight", "Intake workflow nodes currently running", ("node",)
+)
+llm_seconds = metrics.histogram(
+    "llm_request_duration_seconds", "LLM call latency", ("model", "node")
+)
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "LLM tokens reported by the API", ("model", "node", "type")
+)
+llm_errors = metrics.counter("llm_errors_total", "Failed LLM calls", ("model", "node"))
+llm_in_flight = metrics.gauge("llm_in_flight", "LLM calls currently running")
+sheets_seconds = metrics.histogram(
+    "sheets_operation_duration_seconds",
+    "FormService Google Sheets operation latency",
+    ("operation",),
+)
+sheets_errors = metrics.counter(
+    "sheets_operation_errors_total", "Failed FormService operations", ("operation",)
+)
+outbound_seconds = metrics.histogram(
+    "outbound_send_duration_seconds", "Outbound SMS/email send latency", ("channel",)
+)
+outbound_messages = metrics.counter(
+    "outbound_messages_total", "Outbound messages by outcome", ("channel", "status")
+)
+outbound_in_flight = metrics.gauge(
+    "outbound_in_flight", "Outbound sends currently running", ("channel",)
+)
+turn_seconds = metrics.histogram(
+    "sms_turn_duration_seconds",
+    "Fast-ack SMS turn latency from webhook to reply queued",
+)
+
+
+@contextmanager
+def node_span(name: str, state, known_intents):
+    """Record latency, errors and in-flight count of one node run."""
+    channel = state.get("channel", "")
+    node_token = current_node_var.set(name)
+    node_in_flight.inc(node=name)
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        node_in_flight.dec(node=name)
+        current_node_var.reset(node_token)
+        intent = state.get("intent") or "none"
+        if intent not in known_intents and intent != "none":
+            intent = "other"
+        labels = {"node": name, "intent": intent, "channel": channel}
+        node_seconds.observe(elapsed, **labels)
+        if failed:
+            node_errors.inc(**labels)
+        trace_id = trace_id_var.get()
+        prefix = f"[{trace_id}] " if trace_id else ""
+        print(f"{prefix}{name} took {elapsed * 1000:.0f} ms")
+
+
+def instrument_node(name: str, func: Callable, intents: Iterable[str] = ()):
+    """Wrap a LangGraph node (sync or async) with latency, error and in-flight metrics."""
+    known_intents = set(intents)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(state):
+            with node_span(name, state, known_intents):
+                return await func(state)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with node_span(name, state, known_intents):
+            return func(state)
+
+    return wrapper
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency, tokens and errors of every chat model call."""
+
+    def __init__(self):
+        self._started: Dict = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        llm_in_flight.dec()
+        started_at, model, node = started
+        llm_seconds.observe(time.perf_counter() - started_at, model=model, node=node)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                llm_tokens.inc(usage[kind], model=model, node=node, type=kind)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        llm_in_flight.dec()
+        llm_errors.inc(model=started[1], node=started[2])
+
+    def _start(self, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or ""
+        llm_in_flight.inc()
+        self._started[run_id] = (time.perf_counter(), model, current_node_var.get())
+
+
+state_persists = metrics.counter(
+    "intake_state_persist_total",
+    "Intake states written by store_current_state, by outcome",
+    ("outcome",),
+)
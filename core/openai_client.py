@@ -0,0 +1,44 @@
+from config import settings
+import httpx
+import threading
+
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def create_async_client():
+    """Build an AsyncOpenAI client on a pooled, keep-alive HTTP connection pool."""
+    # Imported here: the openai package is slow to import and only /chat uses it.
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=10.0),
+    )
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client)
+
+
+def get_async_client():
+    """Return the process-wide client.
+
+    The app creates it at startup and closes it at shutdown; scripts and tests
+    that run without the lifespan get one on first use.
+    """
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = create_async_client()
+    return _async_client
+
+
+async def close_async_client():
+    """Close the process-wide client and its connection pool."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -0,0 +1,210 @@
+from typing import Dict, List, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# compact() only rewrites the file once this many pages are free
+COMPACT_MIN_FREE_PAGES = 256
+
+
+class SheetsOutbox:
+    """Durable append-only SQLite outbox for intake rows bound for Google Sheets.
+
+    Concurrent appends are group-committed: whichever caller finds no commit in
+    progress writes every queued record in one transaction, so a burst of
+    requests shares a single fsync. Rows that keep failing are moved to a
+    ``dead_letters`` table for inspection instead of being retried forever.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                intent TEXT NOT NULL,
+                contact_info TEXT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS dead_letters (
+                id INTEGER PRIMARY KEY,
+                intent TEXT NOT NULL,
+                contact_info TEXT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                dead_at REAL NOT NULL
+            )""")
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, str, str, str]] = []
+        self._next_seq = 0
+        self._committing = False
+        self._results: Dict[int, int | Exception] = {}
+        self.stats = {
+            "appends": 0,
+            "commits": 0,
+            "acked": 0,
+            "deferred": 0,
+            "dead_lettered": 0,
+            "compactions": 0,
+        }
+
+    def append(self, intent: str, data: Dict) -> int:
+        """Durably record a row and return its outbox id."""
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.append(
+                (seq, intent, data.get("contact_info"), json.dumps(data))
+            )
+            while seq not in self._results and self._committing:
+                self._cond.wait()
+            if seq in self._results:
+                return self._result(seq)
+            self._committing = True
+            batch = self._queue
+            self._queue = []
+
+        try:
+            results = self._write(batch)
+        except Exception as e:
+            results = {item[0]: e for item in batch}
+        with self._cond:
+            self._committing = False
+            self._results.update(results)
+            self._cond.notify_all()
+            return self._result(seq)
+
+    def load(self) -> List[Tuple[int, str, Dict, int, float]]:
+        """Return every undelivered record as (id, intent, data, attempts, next_attempt_at)."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, intent, payload, attempts, next_attempt_at "
+                "FROM outbox ORDER BY id"
+            ).fetchall()
+        return [
+            (record_id, intent, json.loads(payload), attempts, next_attempt_at)
+            for record_id, intent, payload, attempts, next_attempt_at in rows
+        ]
+
+    def ack(self, ids: List[int]):
+        """Delete records that reached Google Sheets."""
+        if not ids:
+            return
+        self._execute_many("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+        self.stats["acked"] += len(ids)
+
+    def defer(self, ids: List[int], attempts: int, next_attempt_at: float):
+        """Record a failed delivery so the backoff survives a restart."""
+        if not ids:
+            return
+        self._execute_many(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+            [(attempts, next_attempt_at, i) for i in ids],
+        )
+        self.stats["deferred"] += len(ids)
+
+    def dead_letter(self, ids: List[int], attempts: int):
+        """Move records that will never be delivered out of the outbox."""
+        if not ids:
+            return
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for i in ids:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters (id, intent, "
+                        "contact_info, payload, created_at, attempts, dead_at) "
+                        "SELECT id, intent, contact_info, payload, created_at, ?, ? "
+                        "FROM outbox WHERE id = ?",
+                        (attempts, now, i),
+                    )
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (i,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.stats["dead_lettered"] += len(ids)
+
+    def dead_letters(self) -> List[Tuple[int, str, Dict, int]]:
+        """Every dead-lettered record as (id, intent, data, attempts)."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, intent, payload, attempts FROM dead_letters ORDER BY id"
+            ).fetchall()
+        return [
+            (record_id, intent, json.loads(payload), attempts)
+            for record_id, intent, payload, attempts in rows
+        ]
+
+    def compact(self) -> bool:
+        """Give the space of acknowledged rows back to the filesystem.
+
+        Deleted rows only leave free pages behind, so once at least half of
+        the file (and COMPACT_MIN_FREE_PAGES) is free it is rewritten with
+        VACUUM and the WAL truncated. Returns whether it was.
+        """
+        with self._db_lock:
+            free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            total = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            if free < COMPACT_MIN_FREE_PAGES or free * 2 < total:
+                return False
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.stats["compactions"] += 1
+        return True
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _write(self, batch: List[Tuple[int, str, str, str]]) -> Dict[int, int]:
+        now = time.time()
+        results = {}
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for seq, intent, contact_info, payload in batch:
+                    cursor = self._conn.execute(
+                        "INSERT INTO outbox (intent, contact_info, payload, created_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (intent, contact_info, payload, now),
+                    )
+                    results[seq] = cursor.lastrowid
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.stats["appends"] += len(batch)
+        self.stats["commits"] += 1
+        return results
+
+    def _execute_many(self, sql: str, params: List[Tuple]):
+        """Run ``sql`` for every parameter set inside a single transaction."""
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _result(self, seq: int) -> int:
+        result = self._results.pop(seq)
+        if isinstance(result, Exception):
+            raise result
+        return result
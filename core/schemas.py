@@ -0,0 +1,337 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+import threading
+
+
+class FieldSpec(NamedTuple):
+    """One intake field: its key, how the extraction prompt describes it,
+    how follow-up questions name it and other keys /chat summaries use for it."""
+
+    name: str
+    description: str
+    label: str
+    aliases: Tuple[str, ...] = ()
+
+
+# The single source of truth for every intent: the worksheet its rows go to,
+# other names the LLMs use for it, and its fields in sheet column order.
+# Required fields, the extraction prompt, the follow-up question labels, the
+# /chat and workflow parsers and the local sheet headers are all derived
+# from it.
+INTAKE_SCHEMAS = {
+    "PRIVATE_PAY": {
+        "sheet": "PRIVATE_PAY",
+        "fields": [
+            FieldSpec("patient_name", "Full human name(Patient name)", "patient name"),
+            FieldSpec("weight", "Human weight", "patient weight"),
+            FieldSpec("pickup_address", "Address", "pick-up address"),
+            FieldSpec(
+                "drop_off_address",
+                "Address",
+                "drop-off address",
+                ("dropoff_address",),
+            ),
+            FieldSpec("appointment_date", "Date", "appointment date"),
+            FieldSpec(
+                "one_way_or_round_trip",
+                "one way or round trip(Yes/No)",
+                "one-way or round-trip",
+            ),
+            FieldSpec(
+                "equipment_needed",
+                "wheelchair or gurney or if don't need, 'No'",
+                "equipment needed (wheelchair or gurney)",
+            ),
+            FieldSpec(
+                "any_stairs_and_accompanying_passengers",
+                "any stairs and accompanying passengers",
+                "any stairs or accompanying passengers",
+            ),
+            FieldSpec("user_name", "Full human name(Your name)", "your name"),
+            FieldSpec("phone_number", "Phone number", "your phone number"),
+            FieldSpec("email", "valid email", "your email"),
+        ],
+    },
+    "CASE_MANAGER": {
+        "sheet": "INSURANCE_CASE_MANAGERS",
+        "aliases": ["INSURANCE_CASE_MANAGERS"],
+        "fields": [
+            FieldSpec("patient_name", "Full human name(Patient name)", "patient name"),
+            FieldSpec("pickup_address", "Address", "pick-up address"),
+            FieldSpec(
+                "drop_off_address",
+                "Address",
+                "drop-off address",
+                ("dropoff_address",),
+            ),
+            FieldSpec(
+                "authorization_number",
+                "Number (if applicable)",
+                "authorization number (if applicable)",
+            ),
+            FieldSpec("appointment_date", "Date", "appointment date"),
+        ],
+    },
+    "DISCHARGE": {
+        "sheet": "DISCHARGE",
+        "aliases": ["DISCHARGES"],
+        "fields": [
+            FieldSpec("patient_name", "Full human name(Patient name)", "patient name"),
+            FieldSpec(
+                "pickup_facility_name",
+                "Pick-Up facility name",
+                "pick-up facility name",
+            ),
+            FieldSpec(
+                "pickup_facility_address",
+                "Pick-Up facility address",
+                "pick-up facility address",
+            ),
+            FieldSpec(
+                "pickup_facility_room_number",
+                "Pick-Up facility room number",
+                "pick-up room number",
+            ),
+            FieldSpec(
+                "drop_off_facility_name",
+                "Drop-Off facility name",
+                "drop-off facility name",
+                ("dropoff_facility_name",),
+            ),
+            FieldSpec(
+                "drop_off_facility_address",
+                "Drop-Off facility address",
+                "drop-off facility address",
+                ("dropoff_facility_address",),
+            ),
+            FieldSpec(
+                "drop_off_facility_room_number",
+                "Drop-Off facility room number",
+                "drop-off room number",
+                ("dropoff_facility_room_number",),
+            ),
+            FieldSpec("appointment_date", "Date", "appointment date"),
+            FieldSpec(
+                "oxygen_is_needed",
+                'Is oxygen needed? ("yes" or "no")',
+                "whether oxygen is needed",
+                ("is_oxygen_needed",),
+            ),
+            FieldSpec(
+                "oxygen_amount", "Oxygen amount (number)", "oxygen amount (L/min)"
+            ),
+            FieldSpec(
+                "is_infectious_disease",
+                'Is infectious disease? ("yes" or "no")',
+                "whether the patient has an infectious disease",
+            ),
+            FieldSpec("weight", "Human weight", "patient weight (lbs)"),
+        ],
+    },
+}
+
+# Bookkeeping columns around the intake fields on every worksheet.
+LEADING_COLUMNS = ("channel", "contact_info")
+TRAILING_COLUMNS = ("update_time", "status")
+# Header spellings that differ from the column key.
+HEADER_NAMES = {"contact_info": "Contact_Info"}
+
+
+def normalize_column(name: str) -> str:
+    """Normalize a sheet header or data key ("Contact_Info" -> "contact_info")."""
+    return name.strip().lower()
+
+
+class IntakeRecord(ABC):
+    """Base of the compiled per-intent row types; one slot per sheet column."""
+
+    __slots__ = ()
+    schema: "IntakeSchema"
+    # Stands in for header columns the schema does not know.
+    _blank = ""
+
+    @abstractmethod
+    def values(self) -> Tuple:
+        """Column values in schema order, followed by the blank."""
+
+    def as_dict(self) -> Dict:
+        return dict(zip(self.__slots__, self.values()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+
+class IntakeSchema:
+    """An intent's fields compiled into a record type and row projections."""
+
+    def __init__(
+        self,
+        intent: str,
+        sheet: str,
+        fields: Iterable[FieldSpec],
+        aliases: Iterable[str] = (),
+    ):
+        self.intent = intent
+        self.sheet = sheet
+        self.aliases = tuple(aliases)
+        self.fields = tuple(fields)
+        self.field_names = tuple(field.name for field in self.fields)
+        self.columns = LEADING_COLUMNS + self.field_names + TRAILING_COLUMNS
+        self.header = [HEADER_NAMES.get(column, column) for column in self.columns]
+        self.labels = {field.name: field.label for field in self.fields}
+        # Keys tried, in order, for each field of a /chat summary.
+        self._chat_keys = tuple((field.name,) + field.aliases for field in self.fields)
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+        self._projections: Dict[Tuple[str, ...], Callable] = {}
+        self._lock = threading.Lock()
+        self.record_type = self._compile_record_type()
+
+    def _compile_record_type(self) -> type:
+        columns = self.columns
+        getter = attrgetter(*columns, "_blank")
+
+        # Generated like namedtuple's __new__: plain slot stores, no loop.
+        source = "def __init__(self, {}):\n{}".format(
+            ", ".join(columns),
+            "\n".join(f"    self.{column} = {column}" for column in columns),
+        )
+        namespace = {}
+        exec(source, namespace)
+
+        name = "".join(part.capitalize() for part in self.intent.split("_"))
+        return type(
+            f"{name}Record",
+            (IntakeRecord,),
+            {
+                "__slots__": columns,
+                "__init__": namespace["__init__"],
+                "values": lambda self: getter(self),
+                "schema": self,
+            },
+        )
+
+    def record(
+        self, channel: str, contact_info: str, fields: Mapping, status: str
+    ) -> IntakeRecord:
+        """A row from collected fields keyed by their canonical names."""
+        get = fields.get
+        return self.record_type(
+            channel,
+            contact_info,
+            *[get(name, "") for name in self.field_names],
+            datetime.now().isoformat(),
+            status,
+        )
+
+    def record_from_chat(
+        self, data: Mapping, channel: str, contact_info: str
+    ) -> IntakeRecord:
+        """A completed row from a /chat summary, which may use alias keys."""
+        values = []
+        for keys in self._chat_keys:
+            value = ""
+            for key in keys:
+                if key in data:
+                    value = data[key]
+                    break
+            values.append(value)
+        return self.record_type(
+            channel,
+            contact_info,
+            *values,
+            datetime.now().isoformat(),
+            "completed",
+        )
+
+    def from_dict(self, data: Mapping) -> IntakeRecord:
+        """A row from a plain dict, e.g. a replayed outbox entry or /store body."""
+        normalized = {normalize_column(key): value for key, value in data.items()}
+        return self.record_type(
+            *[normalized.get(column, "") for column in self.columns]
+        )
+
+    def coerce(self, data) -> IntakeRecord:
+        if isinstance(data, self.record_type):
+            return data
+        return self.from_dict(data)
+
+    def projection(self, header_keys: Iterable[str]) -> Callable[[IntakeRecord], List]:
+        """Compiled row builder for a normalized sheet header, cached per header.
+
+        The header is turned once into a vector of positions in the record's
+        values, with unknown columns pointing at the trailing blank, so each
+        row is then built in a single indexed pass.
+        """
+        header_keys = tuple(header_keys)
+        projection = self._projections.get(header_keys)
+        if projection is None:
+            blank = len(self.columns)
+            positions = [self._positions.get(key, blank) for key in header_keys]
+            if not positions:
+                projection = lambda record: []
+            elif len(positions) == 1:
+                position = positions[0]
+                projection = lambda record: [record.values()[position]]
+            else:
+                getter = itemgetter(*positions)
+                projection = lambda record: list(getter(record.values()))
+            with self._lock:
+                self._projections[header_keys] = projection
+        return projection
+
+    def project(self, record: IntakeRecord, header_keys: Iterable[str]) -> List:
+        """``record`` as a sheet row ordered by ``header_keys``."""
+        return self.projection(header_keys)(record)
+
+    def prompt_block(self) -> str:
+        """This intent's entry in the field extraction instructions."""
+        lines = [f"- {self.intent}:"]
+        lines.extend(f"    {field.name}: {field.description}" for field in self.fields)
+        return "\n".join(lines)
+
+
+def compile_schemas(definitions: Mapping) -> Dict[str, IntakeSchema]:
+    return {
+        intent: IntakeSchema(
+            intent,
+            definition["sheet"],
+            definition["fields"],
+            definition.get("aliases", ()),
+        )
+        for intent, definition in definitions.items()
+    }
+
+
+schemas = compile_schemas(INTAKE_SCHEMAS)
+# Intent names and aliases (as the classifier, /chat prompt or an old outbox
+# row may spell them) -> schema.
+_schemas_by_name = {
+    name: schema
+    for schema in schemas.values()
+    for name in (schema.intent, *schema.aliases)
+}
+
+
+def get_schema(intent: str | None) -> IntakeSchema | None:
+    return _schemas_by_name.get(intent)
+
+
+def required_fields(intent: str | None) -> List[str]:
+    schema = get_schema(intent)
+    return list(schema.field_names) if schema else []
+
+
+def required_fields_by_intent() -> Dict[str, List[str]]:
+    return {intent: list(schema.field_names) for intent, schema in schemas.items()}
+
+
+def sheet_headers() -> Dict[str, List[str]]:
+    """Header row of each intent's worksheet, keyed by sheet title."""
+    return {schema.sheet: list(schema.header) for schema in schemas.values()}
+
+
+def extraction_prompt_fields() -> str:
+    """The "intents and their fields" section of the extraction instructions."""
+    return "\n\n".join(schema.prompt_block() for schema in schemas.values())
@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from typing import Callable, List
+import json
+import numpy as np
+import os
+import threading
+import zlib
+
+
+class SemanticIntentCache:
+    """Cosine nearest-neighbour cache of opening messages and their confirmed intents.
+
+    Embeddings are kept L2-normalized in one float32 matrix, so a lookup is a
+    single matrix-vector product. When ``path`` is set the matrix lives in a
+    memory-mapped ``.npy`` file with a JSON sidecar for intents, so the cache
+    survives restarts. The sidecar also holds a checksum of each slot's
+    vector: rows rewritten after the last save (e.g. by an eviction before a
+    crash) no longer match and are dropped on load instead of being paired
+    with a stale intent; the remaining rows are compacted to the front.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], List[float]],
+        threshold: float,
+        max_size: int,
+        path: str = "",
+        save_every: int = 20,
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_size = max_size
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._intents: List[str] = []
+        self._checksums: List[int] = []
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+        self._unsaved = 0
+        # Vectors of recent misses, reused when the intent is confirmed.
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "inserts": 0,
+            "evictions": 0,
+        }
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        return (
+            self.stats["hits"] / self.stats["lookups"] if self.stats["lookups"] else 0.0
+        )
+
+    def lookup(self, text: str) -> str | None:
+        """Return the cached intent of the most similar past message, if close enough."""
+        vector = self._embed(text)
+        with self._lock:
+            self.stats["lookups"] += 1
+            self._check_dim(vector)
+            if self._size:
+                similarities = self._vectors[: self._size] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.stats["hits"] += 1
+                    self._touch(best)
+                    return self._intents[best]
+            self.stats["misses"] += 1
+            self._recent[text] = vector
+            while len(self._recent) > 256:
+                self._recent.popitem(last=False)
+        return None
+
+    def confirm(self, text: str, intent: str):
+        """Remember ``intent`` for ``text`` once the conversation has confirmed it."""
+        with self._lock:
+            vector = self._recent.pop(text, None)
+        if vector is None:
+            vector = self._embed(text)
+        with self._lock:
+            self._check_dim(vector)
+            if self._size:
+                similarities = self._vectors[: self._size] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= 0.999:
+                    self._intents[best] = intent
+                    self._touch(best)
+                    return
+            if self._vectors is None:
+                self._allocate(len(vector))
+            if self._size < self.max_size:
+                slot = self._size
+                self._size += 1
+                self._intents.append(intent)
+                self._checksums.append(0)
+            else:
+                # Evict the least recently used entry.
+                slot = int(np.argmin(self._last_used[: self._size]))
+                self._intents[slot] = intent
+                self.stats["evictions"] += 1
+            self._vectors[slot] = vector
+            self._checksums[slot] = row_checksum(self._vectors[slot])
+            self._touch(slot)
+            self.stats["inserts"] += 1
+            self._unsaved += 1
+            if self.path and self._unsaved >= self.save_every:
+                self._save()
+
+    def save(self):
+        """Flush the memory-mapped matrix and the intent sidecar to disk."""
+        with self._lock:
+            if self.path and self._vectors is not None:
+                self._save()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_dim(self, vector: np.ndarray):
+        """Start over if the embedding size changed (e.g. a new model)."""
+        if self._vectors is not None and self._vectors.shape[1] != len(vector):
+            print(
+                f"Intent cache vectors have {self._vectors.shape[1]} dimensions, "
+                f"embeddings have {len(vector)}; starting with an empty cache."
+            )
+            self._vectors = None
+            self._intents = []
+            self._checksums = []
+            self._last_used[:] = 0
+            self._size = 0
+            self._recent.clear()
+
+    def _touch(self, slot: int):
+        self._tick += 1
+        self._last_used[slot] = self._tick
+
+    def _allocate(self, dim: int):
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._vectors = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=np.float32, shape=(self.max_size, dim)
+            )
+        else:
+            self._vectors = np.zeros((self.max_size, dim), dtype=np.float32)
+
+    def _load(self):
+        sidecar = f"{self.path}.json"
+        if not os.path.exists(sidecar):
+            return
+        with open(sidecar, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(self.path, mmap_mode="r+")
+        if vectors.shape[0] != self.max_size:
+            print("Intent cache size changed, starting with an empty cache.")
+            return
+        self._vectors = vectors
+        self._intents = meta["intents"]
+        self._size = len(self._intents)
+        self._last_used[: self._size] = meta["last_used"]
+        self._tick = int(max(meta["last_used"], default=0))
+        self._checksums = meta.get("checksums") or [None] * self._size
+        # Rows rewritten after the sidecar was saved are dropped, and the
+        # rest compacted to the front so the freed slots are reused first.
+        kept = [
+            slot
+            for slot, checksum in enumerate(self._checksums)
+            if row_checksum(vectors[slot]) == checksum
+        ]
+        dropped = self._size - len(kept)
+        if dropped:
+            size = len(kept)
+            vectors[:size] = vectors[kept]
+            vectors[size : self._size] = 0
+            self._intents = [self._intents[slot] for slot in kept]
+            self._checksums = [self._checksums[slot] for slot in kept]
+            self._last_used[:size] = self._last_used[kept]
+            self._last_used[size : self._size] = 0
+            self._size = size
+            self._save()
+            print(f"Dropped {dropped} intent cache entries changed since last save")
+        print(f"Loaded {self._size} cached intents from {self.path}")
+
+    def _save(self):
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        sidecar = f"{self.path}.json"
+        with open(f"{sidecar}.tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "intents": self._intents,
+                    "last_used": self._last_used[: self._size].tolist(),
+                    "checksums": self._checksums,
+                },
+                f,
+            )
+        os.replace(f"{sidecar}.tmp", sidecar)
+        self._unsaved = 0
+
+
+def row_checksum(row: np.ndarray) -> int:
+    return zlib.crc32(np.ascontiguousarray(row).tobytes())
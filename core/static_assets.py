@@ -0,0 +1,181 @@
+from typing import Dict
+from fastapi import Request, Response
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; start() warns when it is missing
+    brotli = None
+
+# Types worth compressing; images and fonts are already compressed.
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)
+MIN_COMPRESS_SIZE = 256
+
+
+class StaticAsset:
+    """One file with its precompressed variants and their strong ETags."""
+
+    __slots__ = ("path", "content_type", "mtime", "variants", "etags")
+
+    def __init__(self, path: str, body: bytes, mtime: float):
+        self.path = path
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.mtime = mtime
+        # Content-Encoding -> body; "identity" is the file as stored.
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(
+            COMPRESSIBLE_TYPES
+        ):
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            for encoding in ("br", "gzip"):
+                if len(self.variants.get(encoding, body)) >= len(body):
+                    self.variants.pop(encoding, None)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        # Each encoding is a different representation, so it gets its own ETag.
+        self.etags = {
+            encoding: (
+                f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            )
+            for encoding in self.variants
+        }
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """Best available encoding the client accepts (br, then gzip)."""
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in accept_encoding.split(",")
+            if part.strip() and not part.replace(" ", "").endswith(";q=0")
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+
+class StaticAssetCache:
+    """Files of a directory held in memory, precompressed, reloaded on change.
+
+    A watcher thread rescans the directory every ``check_interval`` seconds
+    (0 disables it) and rebuilds the files that changed, so edits are picked
+    up without a restart while requests never touch the disk or compress.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 2.0):
+        self.directory = os.path.realpath(directory)
+        self.check_interval = check_interval
+        self._assets: Dict[str, StaticAsset] = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.stats = {"hits": 0, "not_modified": 0, "reloads": 0}
+
+    def load(self):
+        """Read new and changed files under the directory and drop deleted ones."""
+        found = set()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                relative = os.path.relpath(os.path.join(root, name), self.directory)
+                path = relative.replace(os.sep, "/")
+                found.add(path)
+                asset = self._assets.get(path)
+                try:
+                    mtime = os.stat(os.path.join(root, name)).st_mtime
+                except OSError:
+                    continue
+                if asset is None or asset.mtime != mtime:
+                    self._load(path)
+        with self._lock:
+            for path in [path for path in self._assets if path not in found]:
+                del self._assets[path]
+
+    def start(self):
+        """Start the watcher thread; call after ``load``."""
+        if brotli is None:
+            print(
+                "WARNING: brotli is not installed; static files are served "
+                "without br variants (pip install -r requirements.txt)"
+            )
+        if not self.check_interval or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_forever, name="static-assets-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_forever(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Error reloading static files: {str(e)}")
+
+    def get(self, path: str) -> StaticAsset | None:
+        return self._assets.get(path)
+
+    def response(
+        self, request: Request, path: str, cache_control: str
+    ) -> Response | None:
+        """The asset as a 200 or 304 response, or None if there is no such file."""
+        asset = self.get(path)
+        if asset is None:
+            return None
+        encoding = asset.negotiate(request.headers.get("accept-encoding", ""))
+        etag = asset.etags[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag
+            in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        ):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        self.stats["hits"] += 1
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=asset.content_type, headers=headers)
+
+    def _resolve(self, path: str) -> str | None:
+        """Absolute path of ``path`` if it stays inside the directory."""
+        full_path = os.path.realpath(os.path.join(self.directory, path))
+        if os.path.commonpath([full_path, self.directory]) != self.directory:
+            return None
+        return full_path if os.path.isfile(full_path) else None
+
+    def _load(self, path: str) -> StaticAsset | None:
+        full_path = self._resolve(path)
+        if full_path is None:
+            return None
+        with open(full_path, "rb") as f:
+            body = f.read()
+        asset = StaticAsset(path, body, os.stat(full_path).st_mtime)
+        with self._lock:
+            if path in self._assets:
+                self.stats["reloads"] += 1
+            self._assets[path] = asset
+        return asset
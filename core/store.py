@@ -1,68 +1,328 @@
-from typing import Dict
+from datetime import datetime, timezone
+from typing import Dict, List
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.service_account import Credentials
 from googleapiclient.errors import HttpError
 import gspread
 import requests
 from config import settings
-import json
+from core.local_sheets import LocalSpreadsheet
+from core.metrics import sheets_errors, sheets_seconds
+from core.outbox import SheetsOutbox
+from core.schemas import IntakeRecord, IntakeSchema, get_schema, normalize_column
+from core.write_behind import SheetsWriteBehind
+import copy
 import os
-import tempfile
-
-
-# 1. Build the credentials dict from environment variables
-sa_info = {
-    "type": os.environ["SA_TYPE"],
-    "project_id": os.environ["SA_PROJECT_ID"],
-    "private_key_id": os.environ["SA_PRIVATE_KEY_ID"],
-    "private_key": os.environ["SA_PRIVATE_KEY"].replace("\\n", "\n"),
-    "client_email": os.environ["SA_CLIENT_EMAIL"],
-    "client_id": os.environ["SA_CLIENT_ID"],
-    "auth_uri": os.environ["SA_AUTH_URI"],
-    "token_uri": os.environ["SA_TOKEN_URI"],
-    "auth_provider_x509_cert_url": os.environ["SA_AUTH_PROVIDER_CERT_URL"],
-    "client_x509_cert_url": os.environ["SA_CLIENT_CERT_URL"],
-    "universe_domain": os.environ["SA_DOMAIN"],
+import re
+import threading
+import time
+
+# Service account credentials fields and the environment variables holding them
+SERVICE_ACCOUNT_ENV = {
+    "type": "SA_TYPE",
+    "project_id": "SA_PROJECT_ID",
+    "private_key_id": "SA_PRIVATE_KEY_ID",
+    "private_key": "SA_PRIVATE_KEY",
+    "client_email": "SA_CLIENT_EMAIL",
+    "client_id": "SA_CLIENT_ID",
+    "auth_uri": "SA_AUTH_URI",
+    "token_uri": "SA_TOKEN_URI",
+    "auth_provider_x509_cert_url": "SA_AUTH_PROVIDER_CERT_URL",
+    "client_x509_cert_url": "SA_CLIENT_CERT_URL",
+    "universe_domain": "SA_DOMAIN",
 }
 
-# 2. Write to a temporary file and set GOOGLE_APPLICATION_CREDENTIALS
-with tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".json") as tempf:
-    json.dump(sa_info, tempf)
-    tempf.flush()
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = tempf.name
 
+def service_account_info() -> Dict[str, str]:
+    """Build the service account credentials dict from the SA_* variables."""
+    missing = [name for name in SERVICE_ACCOUNT_ENV.values() if name not in os.environ]
+    if missing:
+        raise ValueError(f"Missing service account settings: {', '.join(missing)}")
+    info = {key: os.environ[name] for key, name in SERVICE_ACCOUNT_ENV.items()}
+    info["private_key"] = info["private_key"].replace("\\n", "\n")
+    return info
 
-class FormService:
-    def __init__(self):
-        self.sheets_service = None
-        self.jotform_api_key = settings.JOTFORM_API_KEY
 
-    def get_sheets_service(self):
-        """Get or create Google Sheets service."""
-        # Path to your service account key file
-        spreadsheet_url = "https://docs.google.com/spreadsheets/d/1Zb-Wj_7ofYbsyVxztFSTgmUJkHrLBnCddEs9s6NbeEQ/edit?usp=sharing"
-        # Define the scope
-        SCOPES = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1Zb-Wj_7ofYbsyVxztFSTgmUJkHrLBnCddEs9s6NbeEQ/edit?usp=sharing"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+CONTACT_INFO_COLUMN = "contact_info"
+
+
+class ContactRowIndex:
+    """In-memory contact_info -> row number index for one worksheet."""
+
+    def __init__(
+        self, worksheet: gspread.Worksheet, ttl: int = settings.SHEETS_INDEX_TTL
+    ):
+        self.worksheet = worksheet
+        self.ttl = ttl
+        self.header: List[str] = []
+        self.keys: List[str] = []
+        self.contact_col = 0  # 1-indexed, as gspread expects
+        self.rows: Dict[str, int] = {}
+        self.last_row = 1
+        self.loaded_at = 0.0
+        self.stats = {"loads": 0, "resyncs": 0, "drifts": 0}
+
+    def ensure_fresh(self):
+        """Load the index on first use and resync it once it is older than the TTL."""
+        if not self.loaded_at:
+            self.load()
+        elif self.ttl and time.monotonic() - self.loaded_at > self.ttl:
+            self.resync()
+
+    def load(self):
+        """Read the header row and the Contact_Info column."""
+        self._set_header(self.worksheet.row_values(1))
+        self._set_rows(self.worksheet.col_values(self.contact_col))
+        self.stats["loads"] += 1
+
+    def resync(self):
+        """Re-read the Contact_Info column, and the header only if it moved."""
+        if not self.contact_col:
+            self.load()
+            return
+        try:
+            column = self.worksheet.col_values(self.contact_col)
+        except gspread.exceptions.APIError as e:
+            if e.code != 400:
+                raise
+            # The cached column is past the sheet's edge: columns were removed.
+            self.load()
+            return
+        if not column or normalize_column(column[0]) != CONTACT_INFO_COLUMN:
+            # Columns moved: the cached Contact_Info position is no longer valid.
+            self.load()
+            return
+        self._set_rows(column)
+        self.stats["resyncs"] += 1
+
+    def row_for(self, contact_info: str) -> int | None:
+        return self.rows.get(contact_info)
+
+    def row_range(self, row_number: int) -> str:
+        return (
+            f"A{row_number}:"
+            f"{gspread.utils.rowcol_to_a1(row_number, len(self.header))}"
+        )
+
+    def record_appends(self, contacts: List[str], response: Dict):
+        """Register appended rows, resyncing if they did not land where expected."""
+        updated_range = response.get("updates", {}).get("updatedRange", "")
+        match = re.search(r"![A-Z]+(\d+)", updated_range)
+        if not match:
+            self.resync()
+            return
+        first_row = int(match.group(1))
+        if first_row != self.last_row + 1:
+            print(
+                f"Row index drift on {self.worksheet.title}: expected row "
+                f"{self.last_row + 1}, append landed on {first_row}"
+            )
+            self.stats["drifts"] += 1
+            self.resync()
+        for row_number, contact_info in enumerate(contacts, start=first_row):
+            self.rows.setdefault(contact_info, row_number)
+        self.last_row = max(self.last_row, first_row + len(contacts) - 1)
+
+    def _set_header(self, header: List[str]):
+        keys = [normalize_column(name) for name in header]
+        # Raises ValueError when the sheet has no Contact_Info column.
+        self.contact_col = keys.index(CONTACT_INFO_COLUMN) + 1
+        self.header = header
+        self.keys = keys
+
+    def _set_rows(self, column: List[str]):
+        rows = {}
+        for row_number, value in enumerate(column[1:], start=2):
+            if value and value not in rows:
+                rows[value] = row_number
+        self.rows = rows
+        self.last_row = max(len(column), 1)
+        self.loaded_at = time.monotonic()
+
+
+class SheetsClientCache:
+    """Long-lived gspread client, spreadsheet and per-intent worksheet handles."""
+
+    def __init__(
+        self,
+        spreadsheet_url: str = SPREADSHEET_URL,
+        refresh_margin: int = settings.SHEETS_TOKEN_REFRESH_MARGIN,
+    ):
+        self.spreadsheet_url = spreadsheet_url
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._spreadsheet = None
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+        self._row_indexes: Dict[str, ContactRowIndex] = {}
+        self._refresh_timer = None
+        self.stats = {
+            "spreadsheet_hits": 0,
+            "worksheet_hits": 0,
+            "worksheet_misses": 0,
+            "worksheet_invalidations": 0,
+            "reauths": 0,
+            "token_refreshes": 0,
+            "token_refresh_errors": 0,
+        }
+
+    def spreadsheet(self) -> gspread.Spreadsheet:
+        """Return the cached spreadsheet, authorizing on first use."""
+        with self._lock:
+            if self._spreadsheet is not None:
+                self.stats["spreadsheet_hits"] += 1
+                return self._spreadsheet
+            return self._authorize()
+
+    def worksheet(self, title: str) -> gspread.Worksheet:
+        """Return the memoized worksheet handle for ``title``."""
+        with self._lock:
+            worksheet = self._worksheets.get(title)
+            if worksheet is not None:
+                self.stats["worksheet_hits"] += 1
+                return worksheet
+            self.stats["worksheet_misses"] += 1
+            worksheet = self.spreadsheet().worksheet(title)
+            self._worksheets[title] = worksheet
+            return worksheet
+
+    def row_index(self, title: str) -> ContactRowIndex:
+        """Return the contact_info row index for ``title``, creating it lazily."""
+        with self._lock:
+            index = self._row_indexes.get(title)
+            if index is None:
+                index = ContactRowIndex(self.worksheet(title))
+                self._row_indexes[title] = index
+            return index
+
+    def invalidate_worksheet(self, title: str):
+        """Drop a memoized worksheet handle (e.g. after a 404)."""
+        with self._lock:
+            self._row_indexes.pop(title, None)
+            if self._worksheets.pop(title, None) is not None:
+                self.stats["worksheet_invalidations"] += 1
+
+    def reset(self):
+        """Forget the client entirely; the next access re-authorizes."""
+        with self._lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+            self._credentials = None
+            self._spreadsheet = None
+            self._worksheets.clear()
+            self._row_indexes.clear()
+
+    def _authorize(self) -> gspread.Spreadsheet:
+        if settings.SHEETS_BACKEND == "local":
+            print("Using local Sheets stand-in at", settings.LOCAL_SHEETS_PATH)
+            self._spreadsheet = LocalSpreadsheet(settings.LOCAL_SHEETS_PATH)
+            self._worksheets.clear()
+            self.stats["reauths"] += 1
+            return self._spreadsheet
 
         print("Initializing Google Sheets service...")
-        credentials = Credentials.from_service_account_file(
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"], scopes=SCOPES
+        credentials = Credentials.from_service_account_info(
+            service_account_info(), scopes=SCOPES
         )
+        # Fetch the first token eagerly so its expiry is known for scheduling.
+        credentials.refresh(GoogleAuthRequest())
         client = gspread.authorize(credentials)
         print("Credentials authorized successfully.", client)
-        spreadsheet = client.open_by_url(spreadsheet_url)
+        spreadsheet = client.open_by_url(self.spreadsheet_url)
         print("Google Sheets service initialized successfully.", spreadsheet)
-        self.sheets_service = spreadsheet
-        return self.sheets_service
+        self._credentials = credentials
+        self._spreadsheet = spreadsheet
+        self._worksheets.clear()
+        self.stats["reauths"] += 1
+        self._schedule_refresh()
+        return spreadsheet
+
+    def _schedule_refresh(self, delay: float | None = None):
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        if delay is None:
+            expiry = self._credentials.expiry
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            delay = (expiry - now).total_seconds() - self.refresh_margin
+        self._refresh_timer = threading.Timer(max(delay, 1.0), self._refresh_token)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_token(self):
+        """Refresh the access token ahead of expiry so writes never wait on it.
+
+        The network round trip runs on a copy of the credentials outside the
+        lock, so worksheet lookups and flushes are not held up by it; only
+        the new token is swapped into the live credentials under the lock.
+        """
+        with self._lock:
+            credentials = self._credentials
+        if credentials is None:
+            return
+        try:
+            fresh = copy.copy(credentials)
+            fresh.refresh(GoogleAuthRequest())
+        except Exception as e:
+            print(f"Error refreshing Google Sheets token: {str(e)}")
+            self.stats["token_refresh_errors"] += 1
+            with self._lock:
+                if self._credentials is credentials:
+                    self._schedule_refresh(delay=30)
+            return
+        with self._lock:
+            if self._credentials is not credentials:
+                # Reset or re-authorized meanwhile; that path scheduled its own.
+                return
+            credentials.token = fresh.token
+            credentials.expiry = fresh.expiry
+            self.stats["token_refreshes"] += 1
+            self._schedule_refresh()
 
-    def store_intake_data(self, data: Dict, intent: str) -> bool:
+
+class FormService:
+    def __init__(self):
+        self.sheets = SheetsClientCache()
+        self.jotform_api_key = settings.JOTFORM_API_KEY
+        self.write_behind = None
+        if settings.SHEETS_WRITE_BEHIND:
+            outbox = (
+                SheetsOutbox(settings.SHEETS_OUTBOX_PATH)
+                if settings.SHEETS_OUTBOX_PATH
+                else None
+            )
+            self.write_behind = SheetsWriteBehind(self._store_rows_in_sheets, outbox)
+
+    def get_sheets_service(self):
+        """Get the cached Google Sheets spreadsheet."""
+        return self.sheets.spreadsheet()
+
+    def store_intake_data(self, data: IntakeRecord | Dict, intent: str) -> bool:
         """Store intake data in Google Sheets and optionally JotForm."""
         # try:
 
+        schema = get_schema(intent)
+        if schema is None or data is None:
+            print(f"No intake schema for intent {intent}, not storing")
+            sheets_errors.inc(operation="store_intake_data")
+            return False
+        record = schema.coerce(data)
+
         # Store in Google Sheets
-        sheets_success = self._store_in_sheets(data, intent)
+        with sheets_seconds.time(operation="store_intake_data"):
+            if self.write_behind is not None:
+                sheets_success = self.write_behind.submit(record, schema.intent)
+            else:
+                sheets_success = self._store_in_sheets(record, schema.intent)
+        if not sheets_success:
+            sheets_errors.inc(operation="store_intake_data")
 
         jotform_success = True
         # if self.jotform_api_key:
@@ -74,58 +334,85 @@ class FormService:
         #     print(f"Error storing intake data: {str(e)}")
         #     return False
 
-    def _store_in_sheets(self, data: Dict, intent: str) -> bool:
+    def start(self):
+        """Replay undelivered outbox rows and start the background drainer."""
+        if self.write_behind is not None:
+            self.write_behind.start()
+
+    def close(self):
+        """Flush queued Sheets writes; called on application shutdown."""
+        if self.write_behind is not None:
+            self.write_behind.stop()
+
+    def _store_in_sheets(self, data: IntakeRecord, intent: str) -> bool:
         """Store data in Google Sheets."""
+        return self._store_rows_in_sheets(intent, [data])
+
+    def _store_rows_in_sheets(self, intent: str, rows: List[IntakeRecord]) -> bool:
+        """Upsert rows with at most one batch_update and one append_rows call."""
+        schema = get_schema(intent)
+        if schema is None:
+            print(f"No intake schema for intent {intent}")
+            sheets_errors.inc(operation="write_rows")
+            return False
+        with sheets_seconds.time(operation="write_rows"):
+            success = self._write_rows(schema, rows)
+        if not success:
+            sheets_errors.inc(operation="write_rows")
+        return success
+
+    def _write_rows(self, schema: IntakeSchema, rows: List[IntakeRecord]) -> bool:
+        sheet = schema.sheet
         try:
-            sheet = self.get_sheets_service()
-            print("intent", intent)
-            worksheet = sheet.worksheet(intent)
-            contact_info = data.get("contact_info")
-            all_rows = worksheet.get_all_values()
-            header = all_rows[0]
+            print("intent", schema.intent)
+            worksheet = self.sheets.worksheet(sheet)
+            index = self.sheets.row_index(sheet)
             try:
-                contact_info_col_index = (
-                    header.index("Contact_Info") + 1
-                )  # gspread is 1-indexed for columns
+                index.ensure_fresh()
             except ValueError:
                 print("contact_info column not found in sheet header.")
                 return False
 
-            # Search for the row with matching contact_info
-            row_to_update = None
-            for i, row in enumerate(
-                all_rows[1:], start=2
-            ):  # start=2 because sheet rows start at 1 and first row is header
-                if (
-                    len(row) >= contact_info_col_index
-                    and row[contact_info_col_index - 1] == contact_info
-                ):
-                    row_to_update = i
-                    break
-
-            # Prepare the row data in the order of the header columns
-            row_data = []
-            for col_name in header:
-                row_data.append(
-                    data.get(col_name, "")
-                )  # fill with empty string if key missing
-
-            if row_to_update:
-                # Update the existing row
-                worksheet.update(
-                    f"A{row_to_update}:{chr(64 + len(header))}{row_to_update}",
-                    [row_data],
-                )
-                print(f"Updated row {row_to_update} for contact_info: {contact_info}")
-            else:
-                # Append new row
-                worksheet.append_row(row_data)
-                print(f"Appended new row for contact_info: {contact_info}")
+            # Header positions are resolved once per batch, not per cell.
+            project = schema.projection(index.keys)
+            updates = []
+            appends = []
+            appended_contacts = []
+            for data in rows:
+                contact_info = data.contact_info
+                # Prepare the row data in the order of the header columns
+                row_data = project(data)
+                row_to_update = index.row_for(contact_info)
+                if row_to_update:
+                    updates.append(
+                        {"range": index.row_range(row_to_update), "values": [row_data]}
+                    )
+                else:
+                    appends.append(row_data)
+                    appended_contacts.append(contact_info)
 
-            row = list(data.values())
-            worksheet.append_row(row)
+            if updates:
+                # Update the existing rows
+                worksheet.batch_update(updates)
+                print(f"Updated {len(updates)} rows in {sheet}")
+            if appends:
+                # Append new rows
+                response = worksheet.append_rows(appends)
+                index.record_appends(appended_contacts, response)
+                print(f"Appended {len(appends)} new rows to {sheet}")
             return True
 
+        except gspread.exceptions.WorksheetNotFound as e:
+            print(f"Worksheet not found for intent {schema.intent}: {str(e)}")
+            self.sheets.invalidate_worksheet(sheet)
+            return False
+        except gspread.exceptions.APIError as e:
+            print(f"Error storing in Google Sheets: {str(e)}")
+            if e.code == 404:
+                self.sheets.invalidate_worksheet(sheet)
+            elif e.code == 401:
+                self.sheets.reset()
+            return False
         except HttpError as e:
             print(f"Error storing in Google Sheets: {str(e)}")
             return False
@@ -0,0 +1,64 @@
+from typing import Coroutine, Set
+from core.metrics import metrics, trace_id_var
+import asyncio
+import time
+
+background_task_errors = metrics.counter(
+    "background_task_errors_total", "Detached tasks that raised", ("kind",)
+)
+
+
+class TaskTracker:
+    """Keeps detached tasks referenced, counts how they end and drains them.
+
+    asyncio only holds weak references to tasks, so fire-and-forget work must
+    be kept somewhere until it finishes; ``drain`` waits for it on shutdown.
+    Failures are logged with the trace ID of the request that started them.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"started": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine, kind: str) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=kind)
+        self._tasks.add(task)
+        self.stats["started"] += 1
+        trace_id = trace_id_var.get()
+        task.add_done_callback(lambda task: self._finished(task, kind, trace_id))
+        return task
+
+    async def drain(self, timeout: float = 30.0):
+        """Wait up to ``timeout`` seconds for running tasks, then cancel the rest."""
+        started = time.monotonic()
+        while self._tasks:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                print(f"Cancelling {len(self._tasks)} background tasks at shutdown")
+                for task in list(self._tasks):
+                    task.cancel()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+                return
+            # Tasks may spawn more tasks, so wait on a snapshot and loop.
+            await asyncio.wait(list(self._tasks), timeout=remaining)
+
+    def _finished(self, task: asyncio.Task, kind: str, trace_id: str):
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.stats["cancelled"] += 1
+            return
+        error = task.exception()
+        if error is None:
+            self.stats["succeeded"] += 1
+            return
+        self.stats["failed"] += 1
+        background_task_errors.inc(kind=kind)
+        prefix = f"[{trace_id}] " if trace_id else ""
+        print(f"{prefix}Background {kind} failed: {error!r}")
+
+
+background_tasks = TaskTracker()
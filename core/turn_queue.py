@@ -0,0 +1,133 @@
+from collections import deque
+from typing import Awaitable, Callable, List, TypeVar
+from core.metrics import trace_id_var, turn_seconds
+import asyncio
+import time
+
+T = TypeVar("T")
+
+
+class TurnQueue:
+    """Bounded queue of conversation turns processed by a fixed pool of workers.
+
+    Webhooks ``admit`` a message and return immediately; once the message's
+    turn is ready to run (debounced and serialized per contact outside the
+    queue, so waiting never holds a worker), ``run`` queues it and at most
+    ``workers`` turns run at once. ``stats`` tracks queue depth and end-to-end
+    latency from the webhook to the end of the turn (reply handed to the
+    dispatcher).
+    """
+
+    def __init__(self, workers: int, max_queue: int, latency_window: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._tasks: List[asyncio.Task] = []
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._busy = 0
+        self.stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "completed": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "last_latency_ms": 0.0,
+            "max_latency_ms": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def busy_workers(self) -> int:
+        return self._busy
+
+    def latency_percentile(self, percentile: float) -> float:
+        """End-to-end latency (ms) at ``percentile`` over the recent window."""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    def start(self):
+        if self._tasks:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"turn-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 30.0):
+        """Finish queued turns (up to ``timeout`` seconds), then stop the workers."""
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"Turn queue stopped with {self.queue_depth} turns unprocessed")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def admit(self) -> bool:
+        """Whether a new message may be accepted; False when the queue is full."""
+        if self.queue_depth >= self.max_queue:
+            self.stats["rejected"] += 1
+            return False
+        return True
+
+    async def run(
+        self, turn: Callable[[], Awaitable[T]], received_at: float | None = None
+    ) -> T | None:
+        """Queue ``turn``, wait for a worker to run it and return its result.
+
+        A turn that raises is logged and counted by the queue and returns None.
+        ``received_at`` (``time.perf_counter()``) is when the webhook got the
+        message, the start of the end-to-end latency; default now. Turns
+        admitted while the queue filled up wait here for room.
+        """
+        if not self._tasks:
+            raise RuntimeError("Turn queue is not running")
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(
+            (received_at or time.perf_counter(), trace_id_var.get(), turn, done)
+        )
+        self.stats["enqueued"] += 1
+        self.stats["max_queue_depth"] = max(
+            self.stats["max_queue_depth"], self._queue.qsize()
+        )
+        return await done
+
+    async def _worker(self):
+        while True:
+            received_at, trace_id, turn, done = await self._queue.get()
+            self._busy += 1
+            # Keep the webhook's trace ID for logs and outbound messages.
+            trace_id_var.set(trace_id)
+            try:
+                result = await turn()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Background turn failed: {str(e)}")
+                if not done.done():
+                    done.set_result(None)
+            else:
+                self.stats["completed"] += 1
+                self._record_latency(received_at)
+                if not done.done():
+                    done.set_result(result)
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    def _record_latency(self, enqueued_at: float):
+        latency = time.perf_counter() - enqueued_at
+        turn_seconds.observe(latency)
+        latency_ms = latency * 1000
+        self._latencies.append(latency_ms)
+        self.stats["last_latency_ms"] = latency_ms
+        self.stats["max_latency_ms"] = max(self.stats["max_latency_ms"], latency_ms)
@@ -1,28 +1,127 @@
-from typing import Dict, List, Tuple, TypedDict
+from typing import Dict, List, Literal, NotRequired, Tuple, TypedDict
+from pydantic import BaseModel, Field
 from langgraph.graph import Graph, StateGraph, END
-from langchain_openai import ChatOpenAI
+from langgraph.utils.runnable import RunnableCallable
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import OpenAIEmbeddings
 from langchain.output_parsers.boolean import BooleanOutputParser
+import asyncio
 import json
+import threading
 from config import settings
-from core.helpers import data_parse
+from core.checkpoints import get_checkpointer
+from core.context import conversation_context
+from core.metrics import LLMMetricsCallback, instrument_node, state_persists
+from core.helpers import build_next_question, data_parse, missing_fields
+from core.schemas import (
+    extraction_prompt_fields,
+    get_schema,
+    required_fields,
+    required_fields_by_intent,
+)
 from core.store import form_service
+from core.tasks import background_tasks
+from core.semantic_cache import SemanticIntentCache
+from core.llm_cache import LLMResponseCache
 from core.messages import (
+    CLARIFY_INTENT_MESSAGE,
     JOTFORM_LINK_MESSAGE,
     COMPLETE_MESSAGE,
     COMPLETE_DISCHARGE_MESSAGE,
 )
 import re
 
-# Validate API keys first
-if not settings.OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY is not set in settings")
+# "standard" runs one LLM call per node; "fused" runs a single structured call per turn
+WORKFLOW_MODES = ("standard", "fused")
+# Nodes whose output holds the turn's reply; later nodes only persist it.
+REPLY_NODES = ("determine_next_question", "fused_turn")
+# Statuses that end a conversation; its checkpoint is then deleted.
+ENDED_STATUSES = ("complete", "jotform_used")
+# Runs of a turn whose checkpoint lost to another worker before giving up
+TURN_ATTEMPTS = 3
+
+# The OpenAI clients and compiled graphs are built on first use (or by the
+# startup pre-warm in main.py) so that importing this module stays cheap.
+_llm = None
+_fused_llm = None
+_embeddings = None
+_workflows: Dict[str, Graph] = {}
+# Latest run of each checkpointer thread; done once its checkpoint is written
+_thread_runs: Dict[str, asyncio.Future] = {}
+_init_lock = threading.RLock()
+
+
+def get_llm():
+    """The shared ChatOpenAI model."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                from langchain_openai import ChatOpenAI
+
+                if not settings.OPENAI_API_KEY:
+                    raise ValueError("OPENAI_API_KEY is not set in settings")
+                _llm = ChatOpenAI(
+                    model="gpt-4o",
+                    temperature=0.0,
+                    api_key=settings.OPENAI_API_KEY,
+                    callbacks=[LLMMetricsCallback()],
+                )
+    return _llm
+
+
+def get_fused_llm():
+    """The chat model bound to the TurnResult schema of the fused graph."""
+    global _fused_llm
+    if _fused_llm is None:
+        with _init_lock:
+            if _fused_llm is None:
+                _fused_llm = get_llm().with_structured_output(TurnResult)
+    return _fused_llm
+
+
+def get_embeddings():
+    """The OpenAIEmbeddings client used by the intent cache."""
+    global _embeddings
+    if _embeddings is None:
+        with _init_lock:
+            if _embeddings is None:
+                from langchain_openai import OpenAIEmbeddings
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0.0, api_key=settings.OPENAI_API_KEY)
+                _embeddings = OpenAIEmbeddings(
+                    model="text-embedding-ada-002", api_key=settings.OPENAI_API_KEY
+                )
+    return _embeddings
+
+
+def embed_query(text: str) -> List[float]:
+    return get_embeddings().embed_query(text)
 
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-ada-002", api_key=settings.OPENAI_API_KEY
+
+# Exact-match cache of deterministic (temperature 0) classification replies
+llm_cache = (
+    LLMResponseCache(
+        prompts=[name.strip() for name in settings.LLM_CACHE_PROMPTS.split(",")],
+        max_size=settings.LLM_CACHE_MAX_SIZE,
+        ttl=settings.LLM_CACHE_TTL,
+        path=settings.LLM_CACHE_PATH,
+        flush_interval=settings.LLM_CACHE_FLUSH_INTERVAL,
+        purge_interval=settings.LLM_CACHE_PURGE_INTERVAL,
+    )
+    if settings.LLM_CACHE_ENABLED
+    else None
+)
+
+# Opening message -> confirmed intent, looked up before asking the LLM
+intent_cache = (
+    SemanticIntentCache(
+        embed_query,
+        threshold=settings.INTENT_CACHE_THRESHOLD,
+        max_size=settings.INTENT_CACHE_MAX_SIZE,
+        path=settings.INTENT_CACHE_PATH,
+    )
+    if settings.INTENT_CACHE_ENABLED
+    else None
 )
 
 
@@ -35,6 +134,18 @@ class IntakeState(TypedDict):
     collected_fields: Dict[str, str]
     channel: str
     status: str
+    # Bounded context (see core.context): summary of messages dropped from
+    # ``messages``, the cached transcript of the ones kept, and the first message
+    summary: NotRequired[str]
+    transcript: NotRequired[str]
+    transcript_length: NotRequired[int]
+    opening_message: NotRequired[str]
+    # Input of a checkpointed turn; open_turn moves it into ``messages``
+    new_message: NotRequired[str]
+
+
+# Required fields per intent, from the schema registry
+REQUIRED_FIELDS = required_fields_by_intent()
 
 
 # Define prompts
@@ -70,11 +181,8 @@ Do not include any other words or explanations.""",
     ]
 )
 
-FIELD_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            """You are a healthcare intake assistant. Your task is to extract relevant, explicitly provided information from the user's message based on the identified intent and conversation history. Only extract information that is directly and clearly stated by the user—do not infer, guess, or fill in missing details.
+FIELD_EXTRACTION_INSTRUCTIONS = (
+    """You are a healthcare intake assistant. Your task is to extract relevant, explicitly provided information from the user's message based on the identified intent and conversation history. Only extract information that is directly and clearly stated by the user—do not infer, guess, or fill in missing details.
 Extraction Rules:
 - Extract only the fields listed for the identified intent (see below).
 - If a field is not explicitly mentioned or is ambiguous, omit it from your output.
@@ -93,45 +201,22 @@ Field Extraction Guidelines:
 
 Intents and Their Fields to Extract:
 
-- PRIVATE_PAY:
-    patient_name: Full human name(Patient name)
-    weight: Human weight
-    pickup_address: Address
-    drop_off_address: Address
-    appointment_date: Date
-    one_way_or_round_trip: one way or round trip(Yes/No)
-    equipment_needed: wheelchair or gurney or if don't need, 'No'
-    any_stairs_and_accompanying_passengers: any stairs and accompanying passengers
-    user_name: Full human name(Your name)
-    phone_number: Phone number
-    email: valid email
-
-- INSURANCE_CASE_MANAGERS:
-    patient_name: Full human name(Patient name)
-    pickup_address: Address
-    drop_off_address: Address
-    authorization_number: Number (if applicable)
-    appointment_date: Date
-
-- DISCHARGE:
-    patient_name: Full human name(Patient name)
-    pickup_facility_name: Pick-Up facility name
-    pickup_facility_address: Pick-Up facility address
-    pickup_facility_room_number: Pick-Up facility room number
-    drop_off_facility_name: Drop-Off facility name
-    drop_off_facility_address: Drop-Off facility address
-    drop_off_facility_room_number: Drop-Off facility room number
-    appointment_date: Date
-    oxygen_is_needed: Is oxygen needed? ("yes" or "no")
-    oxygen_amount: Oxygen amount (number)
-    is_infectious_disease: Is infectious disease? ("yes" or "no")
-    weight: Human weight
+"""
+    + extraction_prompt_fields()
+    + """
 
 Formatting Instructions:
 - Return your output as a JSON object containing only the fields relevant to the identified intent.
 - Exclude any fields not explicitly mentioned in the user's message.
 - Do not include any explanatory text, only the JSON object.
-- The JSON keys must exactly match the field names above.""",
+- The JSON keys must exactly match the field names above."""
+)
+
+FIELD_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            FIELD_EXTRACTION_INSTRUCTIONS,
         ),
         (
             "human",
@@ -162,22 +247,226 @@ Conversation history: {conversation}""",
     ]
 )
 
+FUSED_TURN_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """You are a healthcare intake assistant handling one turn of an intake conversation. Fill in every field of the TurnResult in a single response.
+
+1. intent: If a current intent is given, repeat it unchanged. Otherwise classify the user's latest message into one of these categories:
+- PRIVATE_PAY: For private pay patients
+- CASE_MANAGER: For case manager referrals
+- DISCHARGE: For hospital discharge transportation
+
+2. wants_form: true only if the user explicitly asks to fill out a form, requests a form, or expresses intent to complete a form. Otherwise false.
+
+3. extracted_fields: the fields explicitly provided in the user's latest message, following the instructions below.
+
+"""
+            + FIELD_EXTRACTION_INSTRUCTIONS
+            + """
+
+4. next_question: Compare the required fields for the intent with the collected fields plus the fields you just extracted. If all required fields are collected, respond with 'COMPLETE'.
+Otherwise generate one clear, concise, and polite question that asks the user to provide all the missing information at once.
+In this case, the patient name is just patient name, not 'your name'.
+List the missing fields in a natural and user-friendly way.""",
+        ),
+        (
+            "human",
+            """Current intent: {intent}
+Required fields by intent: {required_fields}
+Collected fields: {collected_fields}
+Conversation: {conversation}
+Message: {input}""",
+        ),
+    ]
+)
+
+
+class TurnResult(BaseModel):
+    """Intent, form request, extracted fields and next question for one turn."""
+
+    intent: Literal["PRIVATE_PAY", "CASE_MANAGER", "DISCHARGE"] = Field(
+        description="Intent category of the conversation"
+    )
+    wants_form: bool = Field(description="Whether the user asks to fill out a form")
+    extracted_fields: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Fields explicitly provided in the latest message",
+    )
+    next_question: str = Field(
+        description="Question for the missing fields, or 'COMPLETE'"
+    )
+
+
+def response_cache_key(
+    prompt_name: str, prompt: ChatPromptTemplate, text: str
+) -> str | None:
+    """Cache key for a single-input prompt, or None when caching is off for it."""
+    if llm_cache is None or not llm_cache.enabled_for(prompt_name):
+        return None
+    return llm_cache.key(get_llm().model_name, prompt_name, prompt, text)
+
+
+def invoke_cached(prompt_name: str, prompt: ChatPromptTemplate, text: str) -> str:
+    """Run a single-input prompt through the LLM, answering repeats from the cache."""
+    cache_key = response_cache_key(prompt_name, prompt, text)
+    if cache_key:
+        cached = llm_cache.get(prompt_name, cache_key)
+        if cached is not None:
+            return cached
+    content = get_llm().invoke(prompt.format_messages(input=text)).content
+    if cache_key:
+        llm_cache.set(cache_key, content)
+    return content
+
+
+async def ainvoke_cached(
+    prompt_name: str, prompt: ChatPromptTemplate, text: str
+) -> str:
+    """Async version of ``invoke_cached``."""
+    cache_key = response_cache_key(prompt_name, prompt, text)
+    if cache_key:
+        cached = await llm_cache.aget(prompt_name, cache_key)
+        if cached is not None:
+            return cached
+    content = (await get_llm().ainvoke(prompt.format_messages(input=text))).content
+    if cache_key:
+        llm_cache.set(cache_key, content)
+    return content
+
+
+def thread_id(channel: str, contact_info: str) -> str:
+    """Checkpointer thread of a conversation."""
+    return f"{channel}:{contact_info}"
+
+
+def thread_config(channel: str, contact_info: str) -> Dict:
+    return {"configurable": {"thread_id": thread_id(channel, contact_info)}}
+
+
+# Define nodes. Nodes that call the LLM or Sheets come in a sync version for
+# invoke() and an async one (a-prefixed) for ainvoke()/astream(), sharing
+# everything but the I/O.
+def open_turn(state: IntakeState) -> IntakeState:
+    """Start a turn: set up a new conversation and add the new message.
+
+    With a checkpointer the caller only passes channel, contact_info and
+    ``new_message``; everything else comes from the thread's last checkpoint,
+    or is initialized here when there is none.
+    """
+    if "messages" not in state:
+        state.update(
+            messages=[],
+            intent="",
+            required_fields=[],
+            collected_fields={},
+            status="initialized",
+        )
+    else:
+        # Checkpoints store message tuples as lists.
+        state["messages"] = [tuple(message) for message in state["messages"]]
+    if state.get("new_message"):
+        state["messages"].append(("user", state["new_message"]))
+        state["new_message"] = ""
+    return state
+
+
+async def aopen_turn(state: IntakeState) -> IntakeState:
+    # No I/O; async only so that ainvoke() does not hand it to a thread.
+    return open_turn(state)
+
+
+def intent_cache_key(state: IntakeState) -> Tuple[str, str | None]:
+    """The last user message and its response cache key for classification."""
+    messages = state["messages"]
+    last_message = messages[-1][1] if messages else ""
+    return last_message, response_cache_key(
+        "intent", INTENT_CLASSIFICATION_PROMPT, last_message
+    )
+
+
+def response_cached_intent(cache_key: str | None) -> str | None:
+    if cache_key:
+        return log_cached_intent(llm_cache.get("intent", cache_key))
+    return None
+
+
+async def aresponse_cached_intent(cache_key: str | None) -> str | None:
+    if cache_key:
+        return log_cached_intent(await llm_cache.aget("intent", cache_key))
+    return None
+
+
+def log_cached_intent(cached_intent: str | None) -> str | None:
+    if cached_intent:
+        print("Intent response cache hit:", cached_intent)
+        return cached_intent
+    return None
+
+
+def semantic_cached_intent(last_message: str, cache_key: str | None) -> str | None:
+    """Intent of a similar past opening message; embeds with a blocking client."""
+    if intent_cache is None or not last_message:
+        return None
+    try:
+        cached_intent = intent_cache.lookup(last_message)
+    except Exception as e:
+        print(f"Intent cache lookup failed: {str(e)}")
+        return None
+    if cached_intent:
+        print("Intent cache hit:", cached_intent)
+        if cache_key:
+            llm_cache.set(cache_key, cached_intent)
+    return cached_intent
+
+
+def apply_intent(state: IntakeState, content: str, cache_key: str | None):
+    print("Classify result:", content.strip())
+    state["intent"] = content.strip()
+    if cache_key:
+        llm_cache.set(cache_key, state["intent"])
+
 
-# Define nodes
 def classify_intent(state: IntakeState) -> IntakeState:
     """Classify the user's intent from their message."""
     print("Classifying intent...")
     if state["intent"]:
         print("Intent already classified:", state["intent"])
         return state
-    messages = state["messages"]
-    last_message = messages[-1][1] if messages else ""
+    last_message, cache_key = intent_cache_key(state)
+    intent = response_cached_intent(cache_key) or semantic_cached_intent(
+        last_message, cache_key
+    )
+    if intent:
+        state["intent"] = intent
+        return state
+    response = get_llm().invoke(
+        INTENT_CLASSIFICATION_PROMPT.format_messages(input=last_message)
+    )
+    apply_intent(state, response.content, cache_key)
+    return state
 
-    response = llm.invoke(
+
+async def aclassify_intent(state: IntakeState) -> IntakeState:
+    """Async version of ``classify_intent``."""
+    print("Classifying intent...")
+    if state["intent"]:
+        print("Intent already classified:", state["intent"])
+        return state
+    last_message, cache_key = intent_cache_key(state)
+    intent = await aresponse_cached_intent(cache_key)
+    if not intent and intent_cache is not None:
+        intent = await asyncio.to_thread(
+            semantic_cached_intent, last_message, cache_key
+        )
+    if intent:
+        state["intent"] = intent
+        return state
+    response = await get_llm().ainvoke(
         INTENT_CLASSIFICATION_PROMPT.format_messages(input=last_message)
     )
-    print("Classify result:", response.content.strip())
-    state["intent"] = response.content.strip()
+    apply_intent(state, response.content, cache_key)
     return state
 
 
@@ -192,18 +481,33 @@ def classify_intent_router(state: IntakeState):
         return "get_required_fields"
 
 
+def apply_jotform_reply(state: IntakeState, reply: str):
+    parser = BooleanOutputParser()
+    result = parser.parse(reply.strip())
+    if result:
+        print("User wants to fill out the form.")
+        state["status"] = "jotform_used"
+
+
 def classify_jotform_is_required(state: IntakeState) -> bool:
     messages = state["messages"]
     last_message = messages[-1][1] if messages else ""
 
-    response = llm.invoke(
-        JOTFORM_IS_REQUIRED_CLASSIFICATION_PROMPT.format_messages(input=last_message)
+    reply = invoke_cached(
+        "jotform", JOTFORM_IS_REQUIRED_CLASSIFICATION_PROMPT, last_message
     )
-    parser = BooleanOutputParser()
-    result = parser.parse(response.content.strip())
-    if result:
-        print("User wants to fill out the form.")
-        state["status"] = "jotform_used"
+    apply_jotform_reply(state, reply)
+    return state
+
+
+async def aclassify_jotform_is_required(state: IntakeState) -> IntakeState:
+    messages = state["messages"]
+    last_message = messages[-1][1] if messages else ""
+
+    reply = await ainvoke_cached(
+        "jotform", JOTFORM_IS_REQUIRED_CLASSIFICATION_PROMPT, last_message
+    )
+    apply_jotform_reply(state, reply)
     return state
 
 
@@ -221,63 +525,31 @@ def get_required_fields(state: IntakeState) -> IntakeState:
     print("Retrieving required fields...")
     intent = state["intent"]
 
-    default_fields = {
-        "PRIVATE_PAY": [
-            "patient_name",
-            "weight",
-            "pickup_address",
-            "drop_off_address",
-            "appointment_date",
-            "one_way_or_round_trip",
-            "equipment_needed",
-            "any_stairs_and_accompanying_passengers",
-            "user_name",
-            "phone_number",
-            "email",
-        ],
-        "CASE_MANAGER": [
-            "patient_name",
-            "pickup_address",
-            "drop_off_address",
-            "authorization_number",
-            "appointment_date",
-        ],
-        "DISCHARGE": [
-            "patient_name",
-            "pickup_facility_name",
-            "pickup_facility_address",
-            "pickup_facility_room_number",
-            "drop_off_facility_name",
-            "drop_off_facility_address",
-            "drop_off_facility_room_number",
-            "appointment_date",
-            "oxygen_is_needed",
-            "oxygen_amount",
-            "is_infectious_disease",
-            "weight",
-        ],
-    }
-
-    state["required_fields"] = default_fields.get(intent, [])
+    state["required_fields"] = required_fields(intent)
 
     print("required fields:", state["required_fields"])
     return state
 
 
-def extract_fields(state: IntakeState) -> IntakeState:
-    """Extract relevant fields from the user's message."""
+async def aget_required_fields(state: IntakeState) -> IntakeState:
+    # No I/O; async only so that ainvoke() does not hand it to a thread.
+    return get_required_fields(state)
+
+
+def extraction_prompt(state: IntakeState):
     print("Extracting fields...")
     messages = state["messages"]
-    conversation = "\n".join([f"{role}: {content}" for role, content in messages])
+    conversation = conversation_context(state, "extract_fields")
     user_message = messages[-1][1] if messages else ""
-    response = llm.invoke(
-        FIELD_EXTRACTION_PROMPT.format_messages(
-            intent=state["intent"], conversation=conversation, input=user_message
-        )
+    return FIELD_EXTRACTION_PROMPT.format_messages(
+        intent=state["intent"], conversation=conversation, input=user_message
     )
 
+
+def apply_extracted_fields(state: IntakeState, content: str):
+    extracted_fields = None
     try:
-        json_fields = re.search(r"\{[\s\S]*\}", response.content.strip())
+        json_fields = re.search(r"\{[\s\S]*\}", content.strip())
         if json_fields:
             extracted_fields = json.loads(json_fields.group(0))
         if isinstance(extracted_fields, dict):
@@ -285,26 +557,87 @@ def extract_fields(state: IntakeState) -> IntakeState:
     except json.JSONDecodeError as e:
         print(f"Failed to parse JSON of extracted_fields: {e}")
         # Continue without updating fields
-    print("Extracted fields:", response.content)
+    print("Extracted fields:", content)
+
+
+def extract_fields(state: IntakeState) -> IntakeState:
+    """Extract relevant fields from the user's message."""
+    response = get_llm().invoke(extraction_prompt(state))
+    apply_extracted_fields(state, response.content)
     return state
 
 
-def determine_next_question(state: IntakeState) -> IntakeState:
-    """Determine what information is still needed."""
+async def aextract_fields(state: IntakeState) -> IntakeState:
+    """Async version of ``extract_fields``."""
+    response = await get_llm().ainvoke(extraction_prompt(state))
+    apply_extracted_fields(state, response.content)
+    return state
+
+
+def next_question_prompt(state: IntakeState):
+    """Prompt for the next question, or None when it was answered without the LLM."""
     print("Determining next question...")
-    messages = state["messages"]
-    conversation = "\n".join([f"{role}: {content}" for role, content in messages])
-
-    response = llm.invoke(
-        NEXT_QUESTION_PROMPT.format_messages(
-            intent=state["intent"],
-            required_fields=state["required_fields"],
-            collected_fields=state["collected_fields"],
-            conversation=conversation,
-        )
+    missing = missing_fields(state["required_fields"], state["collected_fields"])
+    known_intent = get_schema(state["intent"]) is not None
+    # An unknown intent has no required fields, which must not read as complete.
+    if known_intent and not missing:
+        print("All required fields collected, skipping LLM.")
+        apply_next_question(state, "COMPLETE")
+        return None
+    if settings.NEXT_QUESTION_MODE == "template":
+        if not known_intent:
+            ask_for_intent(state)
+            return None
+        question = build_next_question(state["intent"], missing, state["channel"])
+        apply_next_question(state, question)
+        print("Next question (template):", question)
+        return None
+
+    conversation = conversation_context(state, "determine_next_question")
+    return NEXT_QUESTION_PROMPT.format_messages(
+        intent=state["intent"],
+        required_fields=state["required_fields"],
+        collected_fields=state["collected_fields"],
+        conversation=conversation,
     )
 
-    if response.content.strip() == "COMPLETE":
+
+def determine_next_question(state: IntakeState) -> IntakeState:
+    """Determine what information is still needed."""
+    prompt = next_question_prompt(state)
+    if prompt is None:
+        return state
+    response = get_llm().invoke(prompt)
+    apply_next_question(state, response.content)
+    print("Next question:", response.content.strip())
+    return state
+
+
+async def adetermine_next_question(state: IntakeState) -> IntakeState:
+    """Async version of ``determine_next_question``."""
+    prompt = next_question_prompt(state)
+    if prompt is None:
+        return state
+    response = await get_llm().ainvoke(prompt)
+    apply_next_question(state, response.content)
+    print("Next question:", response.content.strip())
+    return state
+
+
+def ask_for_intent(state: IntakeState):
+    """Ask which kind of request this is when the intent was not recognized.
+
+    The intent is cleared so that the answer is classified again.
+    """
+    print(f"Unknown intent {state['intent']!r}, asking the user")
+    state["intent"] = ""
+    state["required_fields"] = []
+    apply_next_question(state, CLARIFY_INTENT_MESSAGE)
+
+
+def apply_next_question(state: IntakeState, reply: str):
+    """Record the next question, or the completion message when nothing is missing."""
+    if reply.strip() == "COMPLETE":
         state["status"] = "complete"
         if state["intent"] == "DISCHARGE":
             state["messages"].append(
@@ -326,33 +659,155 @@ def determine_next_question(state: IntakeState) -> IntakeState:
             )
     else:
         state["status"] = "in_progress"
-        state["messages"].append(("assistant", response.content))
-    print("Next question:", response.content.strip())
+        state["messages"].append(("assistant", reply))
+
+
+def fused_turn_prompt(state: IntakeState):
+    print("Running fused turn...")
+    messages = state["messages"]
+    conversation = conversation_context(state, "fused_turn")
+    user_message = messages[-1][1] if messages else ""
+    return FUSED_TURN_PROMPT.format_messages(
+        intent=state["intent"] or "none",
+        required_fields=REQUIRED_FIELDS,
+        collected_fields=state["collected_fields"],
+        conversation=conversation,
+        input=user_message,
+    )
+
+
+def apply_turn_result(state: IntakeState, result: TurnResult):
+    print("Fused turn result:", result)
+
+    if not state["intent"]:
+        state["intent"] = result.intent
+    if state["intent"] == "PRIVATE_PAY" and result.wants_form:
+        print("User wants to fill out the form.")
+        state["status"] = "jotform_used"
+        state["messages"].append(("assistant", JOTFORM_LINK_MESSAGE))
+        return
+
+    get_required_fields(state)
+    state["collected_fields"].update(result.extracted_fields)
+    missing = missing_fields(state["required_fields"], state["collected_fields"])
+    known_intent = get_schema(state["intent"]) is not None
+    if known_intent and not missing:
+        apply_next_question(state, "COMPLETE")
+    elif settings.NEXT_QUESTION_MODE == "template":
+        if known_intent:
+            apply_next_question(
+                state, build_next_question(state["intent"], missing, state["channel"])
+            )
+        else:
+            ask_for_intent(state)
+    else:
+        apply_next_question(state, result.next_question)
+
+
+def fused_turn(state: IntakeState) -> IntakeState:
+    """Classify, check for a form request, extract and ask next in one LLM call."""
+    apply_turn_result(state, get_fused_llm().invoke(fused_turn_prompt(state)))
+    return state
+
+
+async def afused_turn(state: IntakeState) -> IntakeState:
+    """Async version of ``fused_turn``."""
+    result = await get_fused_llm().ainvoke(fused_turn_prompt(state))
+    apply_turn_result(state, result)
     return state
 
 
+def fused_turn_router(state: IntakeState):
+    if state["status"] == "jotform_used":
+        return END
+    return "store_current_state"
+
+
 def store_current_state(state: IntakeState) -> bool:
     """Store the current state of the intake process."""
     print("Storing current state...")
     store_data = data_parse(state)
     success = form_service.store_intake_data(store_data, state.get("intent"))
+    state_persists.inc(outcome="stored" if success else "failed")
     if success:
         print("State stored successfully.")
+    if state["status"] == "complete":
+        confirm_cached_intent(state)
     return state
 
 
-def create_intake_workflow() -> Graph:
-    """Create the LangGraph workflow for the intake process."""
-    print("Creating intake workflow...")
+async def astore_current_state(state: IntakeState) -> IntakeState:
+    """Async version of ``store_current_state``.
+
+    gspread, the outbox and the intent cache's embeddings are blocking
+    clients, so the write runs in a worker thread.
+    """
+    return await asyncio.to_thread(store_current_state, state)
+
+
+def confirm_cached_intent(state: IntakeState):
+    """Teach the intent cache the opening message of a completed intake."""
+    if intent_cache is None or state["intent"] not in REQUIRED_FIELDS:
+        return
+    first_message = state.get("opening_message") or next(
+        (content for role, content in state["messages"] if role == "user"), ""
+    )
+    if not first_message:
+        return
+    try:
+        intent_cache.confirm(first_message, state["intent"])
+    except Exception as e:
+        print(f"Intent cache update failed: {str(e)}")
+
+
+def create_intake_workflow(
+    mode: str = settings.WORKFLOW_MODE, checkpointer: BaseCheckpointSaver | None = None
+) -> Graph:
+    """Create the LangGraph workflow for the intake process.
+
+    With a ``checkpointer`` each turn is invoked with only its new message
+    (see ``turn_input``) under the conversation's ``thread_config``; without
+    one the caller passes the whole state and gets it back.
+    """
+    print(f"Creating intake workflow ({mode})...")
+    if mode not in WORKFLOW_MODES:
+        raise ValueError(f"Unknown workflow mode: {mode}")
     workflow = StateGraph(IntakeState)
 
-    workflow.add_node("classify_intent", classify_intent)
-    workflow.add_node("classify_jotform_is_required", classify_jotform_is_required)
-    workflow.add_node("get_required_fields", get_required_fields)
-    workflow.add_node("extract_fields", extract_fields)
-    workflow.add_node("determine_next_question", determine_next_question)
-    workflow.add_node("store_current_state", store_current_state)
+    def add_node(name, func, afunc):
+        # invoke() runs the sync version, ainvoke()/astream() the async one.
+        node = RunnableCallable(
+            instrument_node(name, func, REQUIRED_FIELDS),
+            instrument_node(name, afunc, REQUIRED_FIELDS),
+            name=name,
+            trace=False,
+        )
+        workflow.add_node(name, node)
+
+    add_node("open_turn", open_turn, aopen_turn)
+    workflow.set_entry_point("open_turn")
+
+    if mode == "fused":
+        add_node("fused_turn", fused_turn, afused_turn)
+        add_node("store_current_state", store_current_state, astore_current_state)
+        workflow.add_edge("open_turn", "fused_turn")
+        workflow.add_conditional_edges("fused_turn", fused_turn_router)
+        return workflow.compile(checkpointer=checkpointer)
 
+    add_node("classify_intent", classify_intent, aclassify_intent)
+    add_node(
+        "classify_jotform_is_required",
+        classify_jotform_is_required,
+        aclassify_jotform_is_required,
+    )
+    add_node("get_required_fields", get_required_fields, aget_required_fields)
+    add_node("extract_fields", extract_fields, aextract_fields)
+    add_node(
+        "determine_next_question", determine_next_question, adetermine_next_question
+    )
+    add_node("store_current_state", store_current_state, astore_current_state)
+
+    workflow.add_edge("open_turn", "classify_intent")
     workflow.add_conditional_edges(
         "classify_intent",
         classify_intent_router,
@@ -365,9 +820,146 @@ def create_intake_workflow() -> Graph:
     workflow.add_edge("extract_fields", "determine_next_question")
     workflow.add_edge("determine_next_question", "store_current_state")
 
-    workflow.set_entry_point("classify_intent")
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def get_intake_workflow(mode: str = settings.WORKFLOW_MODE) -> Graph:
+    """The checkpointed workflow for ``mode``, compiled once on first use."""
+    workflow = _workflows.get(mode)
+    if workflow is None:
+        with _init_lock:
+            workflow = _workflows.get(mode)
+            if workflow is None:
+                workflow = _workflows[mode] = create_intake_workflow(
+                    mode, get_checkpointer()
+                )
+    return workflow
+
+
+def turn_input(channel: str, contact_info: str, message: str) -> Dict:
+    """Input of a checkpointed turn: the rest of the state is resumed."""
+    return {"channel": channel, "contact_info": contact_info, "new_message": message}
+
+
+async def wait_for_thread(key: str):
+    """Wait until runs already started on thread ``key`` have finished."""
+    previous = _thread_runs.get(key)
+    if previous is not None:
+        await previous
+
+
+async def run_intake_turn(
+    channel: str,
+    contact_info: str,
+    message: str,
+    mode: str = settings.WORKFLOW_MODE,
+) -> IntakeState:
+    """Run one turn of a conversation and return as soon as its reply is known.
+
+    The state is resumed from the conversation's checkpoint, so only the new
+    message is passed in. The graph is consumed with ``astream``: once a node
+    in REPLY_NODES has produced the reply, the caller gets that state while
+    the remaining nodes (store_current_state) finish in a tracked background
+    task. Turns that end without a reply node, such as the JotForm link,
+    return when the graph ends. Errors raised before the reply propagate to
+    the caller.
+
+    Runs of a thread are chained, so a turn resumes from the checkpoint of
+    the previous one even if that is still being stored. The checkpoint is
+    written once, when the graph ends (``checkpoint_during=False``), and the
+    thread is deleted once the conversation has ended.
+
+    A checkpointer shared by several workers (``shared``) may find that
+    another worker advanced the conversation meanwhile. The reply is then
+    held until the checkpoint is committed, and a turn that lost is run
+    again on the newer state, so no answer is acknowledged and then dropped.
+    """
+    config = thread_config(channel, contact_info)
+    key = config["configurable"]["thread_id"]
+    loop = asyncio.get_running_loop()
+    previous = _thread_runs.get(key)
+    finished = _thread_runs[key] = loop.create_future()
+    reply: asyncio.Future = loop.create_future()
+
+    async def drive():
+        latest = None
+        try:
+            if previous is not None:
+                await previous
+            graph = get_intake_workflow(mode)
+            saver = graph.checkpointer
+            for attempt in range(1, TURN_ATTEMPTS + 1):
+                latest = answer = None
+                async for update in graph.astream(
+                    turn_input(channel, contact_info, message),
+                    config,
+                    stream_mode="updates",
+                    checkpoint_during=False,
+                ):
+                    for node, node_state in update.items():
+                        if node_state is not None:
+                            latest = node_state
+                        if node in REPLY_NODES and answer is None:
+                            answer = node_state
+                            if not saver.shared:
+                                reply.set_result(node_state)
+                if latest is not None and latest["status"] in ENDED_STATUSES:
+                    await saver.adelete_thread(key)
+                if await saver.acommit(config):
+                    break
+                if attempt == TURN_ATTEMPTS:
+                    raise RuntimeError(f"Conversation {key} keeps changing elsewhere")
+                print(
+                    f"Conversation {key} was advanced by another worker; "
+                    "running the turn again"
+                )
+            if answer is not None and not reply.done():
+                reply.set_result(answer)
+        except Exception as e:
+            if reply.done():
+                raise
+            reply.set_exception(e)
+            return
+        finally:
+            if not reply.done():
+                if latest is None:
+                    # Not cancel(): callers only catch Exception.
+                    reply.set_exception(RuntimeError("intake run produced no state"))
+                else:
+                    reply.set_result(latest)
+            if _thread_runs.get(key) is finished:
+                del _thread_runs[key]
+            finished.set_result(None)
+
+    background_tasks.spawn(drive(), "intake_turn")
+    return await reply
+
+
+async def ainvoke_intake_workflow(
+    channel: str,
+    contact_info: str,
+    message: str,
+    mode: str = settings.WORKFLOW_MODE,
+) -> IntakeState:
+    """Run one whole turn, persistence and checkpoint included."""
+    state = await run_intake_turn(channel, contact_info, message, mode)
+    await wait_for_thread(thread_id(channel, contact_info))
+    return state
+
+
+async def get_conversation(channel: str, contact_info: str) -> IntakeState | None:
+    """The checkpointed state of an ongoing conversation, or None."""
+    await wait_for_thread(thread_id(channel, contact_info))
+    found = await get_checkpointer().aget_tuple(thread_config(channel, contact_info))
+    if found is None:
+        return None
+    # channel_values also holds LangGraph's internal channels.
+    values = found.checkpoint["channel_values"]
+    return {key: values[key] for key in IntakeState.__annotations__ if key in values}
 
 
-# Create the workflow instance
-intake_workflow = create_intake_workflow()
+async def end_conversation(channel: str, contact_info: str):
+    """Forget a conversation, e.g. after a turn failed."""
+    key = thread_id(channel, contact_info)
+    await wait_for_thread(key)
+    await get_checkpointer().adelete_thread(key)
@@ -0,0 +1,296 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+from config import settings
+from core.outbox import SheetsOutbox
+from core.schemas import IntakeRecord, get_schema
+import random
+import sqlite3
+import threading
+import time
+
+
+class SheetsWriteBehind:
+    """Background write-behind stage that batches Google Sheets upserts.
+
+    Pending writes are coalesced per (intent, contact_info) so only the latest
+    row is sent, then flushed as one batch per worksheet when either the batch
+    size or the flush interval is reached. A row that still fails after
+    ``max_attempts`` is dropped, and flushed on its own for its last attempt
+    so rows batched with it are not dropped too. With an outbox, every row is
+    made durable before ``submit`` returns, failed flushes are retried with
+    exponential backoff, rows out of attempts are dead-lettered instead of
+    dropped, and undelivered rows are replayed after a restart.
+    """
+
+    def __init__(
+        self,
+        flush_rows: Callable[[str, List[IntakeRecord]], bool],
+        outbox: SheetsOutbox | None = None,
+        batch_size: int = settings.SHEETS_BATCH_SIZE,
+        flush_interval: float = settings.SHEETS_FLUSH_INTERVAL,
+        max_pending: int = settings.SHEETS_MAX_PENDING,
+        submit_timeout: float = settings.SHEETS_SUBMIT_TIMEOUT,
+        retry_base_delay: float = settings.SHEETS_RETRY_BASE_DELAY,
+        retry_max_delay: float = settings.SHEETS_RETRY_MAX_DELAY,
+        max_attempts: int = settings.SHEETS_MAX_ATTEMPTS,
+        compact_interval: float = settings.SHEETS_OUTBOX_COMPACT_INTERVAL,
+    ):
+        self.flush_rows = flush_rows
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_attempts = max_attempts
+        self.compact_interval = compact_interval
+        self._compacted_at = time.monotonic()
+        self._pending: "OrderedDict[Tuple[str, str], IntakeRecord]" = OrderedDict()
+        self._outbox_ids: Dict[Tuple[str, str], List[int]] = {}
+        self._attempts: Dict[Tuple[str, str], int] = {}
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._replayed = False
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "dead_lettered": 0,
+            "replayed": 0,
+            "retries": 0,
+            "flushes": 0,
+            "flushed_rows": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, data: IntakeRecord, intent: str) -> bool:
+        """Queue a row for ``intent``; blocks briefly when the queue is full."""
+        key = (intent, data.contact_info)
+        deadline = time.monotonic() + self.submit_timeout
+        with self._cond:
+            self._ensure_started()
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"Sheets write queue full, rejecting write for {key}")
+                    self.stats["rejected"] += 1
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+
+        record_id = None
+        if self.outbox is not None:
+            try:
+                record_id = self.outbox.append(intent, data.as_dict())
+            except sqlite3.Error as e:
+                print(f"Error writing Sheets outbox, keeping row in memory: {str(e)}")
+
+        with self._cond:
+            self._enqueue(key, data, record_id)
+            self.stats["submitted"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, force: bool = False):
+        """Write every due row now, one batch per worksheet."""
+        now = time.monotonic()
+        with self._cond:
+            keys = [
+                key
+                for key in self._pending
+                if force or self._retry_at.get(key, 0) <= now
+            ]
+            batch = [
+                (key, self._pending.pop(key), self._outbox_ids.pop(key, []))
+                for key in keys
+            ]
+            last_tries = {
+                key
+                for key in keys
+                if self._attempts.get(key, 0) >= self.max_attempts - 1
+            }
+            self._cond.notify_all()
+        if not batch:
+            return
+
+        groups: Dict[str, List[Tuple[Tuple[str, str], IntakeRecord, List[int]]]] = {}
+        singles = []
+        for item in batch:
+            if item[0] in last_tries:
+                # Alone, a row that can never be written only fails itself.
+                singles.append((item[0][0], [item]))
+            else:
+                groups.setdefault(item[0][0], []).append(item)
+
+        started = time.perf_counter()
+        for intent, items in [*groups.items(), *singles]:
+            try:
+                success = self.flush_rows(intent, [data for _, data, _ in items])
+            except Exception as e:
+                print(f"Error flushing Sheets writes for {intent}: {str(e)}")
+                success = False
+            if success:
+                self.stats["flushed_rows"] += len(items)
+                self._acknowledge(items)
+            else:
+                self.stats["flush_errors"] += 1
+                self._requeue(items)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats["flushes"] += 1
+        self.stats["last_flush_ms"] = elapsed_ms
+        self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+
+    def start(self):
+        """Start the drainer thread, replaying the outbox on first start."""
+        with self._cond:
+            self._ensure_started()
+
+    def stop(self):
+        """Stop the background thread and flush whatever is still queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush(force=True)
+
+    def _enqueue(self, key: Tuple[str, str], data: IntakeRecord, record_id: int | None):
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+            self._pending.move_to_end(key)
+        self._pending[key] = data
+        if record_id is not None:
+            self._outbox_ids.setdefault(key, []).append(record_id)
+
+    def _acknowledge(
+        self, items: List[Tuple[Tuple[str, str], IntakeRecord, List[int]]]
+    ):
+        ids = []
+        with self._cond:
+            for key, _, record_ids in items:
+                ids.extend(record_ids)
+                if key not in self._pending:
+                    self._attempts.pop(key, None)
+                    self._retry_at.pop(key, None)
+        if self.outbox is not None:
+            # Superseded rows are acknowledged too: upserts are idempotent, so
+            # the latest row for a contact stands in for every earlier one.
+            self.outbox.ack(ids)
+
+    def _requeue(self, items: List[Tuple[Tuple[str, str], IntakeRecord, List[int]]]):
+        deferred = []
+        dead = []
+        with self._cond:
+            for key, data, record_ids in items:
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    self._retry_at.pop(key, None)
+                    if self.outbox is None:
+                        print(
+                            f"Dropping Sheets write for {key} after {attempts} attempts"
+                        )
+                        self.stats["dropped"] += 1
+                    else:
+                        print(
+                            f"Dead-lettering Sheets write for {key} after "
+                            f"{attempts} attempts"
+                        )
+                        self.stats["dead_lettered"] += 1
+                        dead.append((record_ids, attempts))
+                    continue
+                self._attempts[key] = attempts
+                self._retry_at[key] = time.monotonic() + self._backoff(attempts)
+                self.stats["retries"] += 1
+                if key in self._pending:
+                    # A newer row arrived while this one was in flight.
+                    self._outbox_ids.setdefault(key, [])[:0] = record_ids
+                else:
+                    self._pending[key] = data
+                    self._outbox_ids[key] = record_ids
+                deferred.append((record_ids, attempts, self._retry_at[key]))
+        if self.outbox is not None:
+            for record_ids, attempts, retry_at in deferred:
+                delay = retry_at - time.monotonic()
+                self.outbox.defer(record_ids, attempts, time.time() + delay)
+            for record_ids, attempts in dead:
+                self.outbox.dead_letter(record_ids, attempts)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _replay(self):
+        """Requeue rows left in the outbox by a previous process."""
+        self._replayed = True
+        if self.outbox is None:
+            return
+        now_wall = time.time()
+        now = time.monotonic()
+        for record_id, intent, data, attempts, next_attempt_at in self.outbox.load():
+            schema = get_schema(intent)
+            if schema is None:
+                print(f"Skipping outbox row {record_id} with unknown intent {intent}")
+                continue
+            data = schema.from_dict(data)
+            key = (schema.intent, data.contact_info)
+            self._enqueue(key, data, record_id)
+            if attempts:
+                self._attempts[key] = attempts
+                self._retry_at[key] = now + max(next_attempt_at - now_wall, 0)
+            self.stats["replayed"] += 1
+        if self.stats["replayed"]:
+            print(f"Replayed {self.stats['replayed']} Sheets writes from the outbox")
+
+    def _ensure_started(self):
+        if not self._replayed:
+            self._replay()
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="sheets-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _ready_count(self) -> int:
+        now = time.monotonic()
+        return sum(1 for key in self._pending if self._retry_at.get(key, 0) <= now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and self._ready_count() < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            self.flush()
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        """Compact the outbox every ``compact_interval`` seconds (0 never)."""
+        if self.outbox is None or not self.compact_interval:
+            return
+        if time.monotonic() - self._compacted_at < self.compact_interval:
+            return
+        self._compacted_at = time.monotonic()
+        try:
+            if self.outbox.compact():
+                print("Compacted the Sheets outbox")
+        except sqlite3.Error as e:
+            print(f"Error compacting Sheets outbox: {str(e)}")
@@ -1,13 +1,141 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from routers import sms, gmail, store, chat
+from core import capture
+from core.checkpoints import checkpointer_stats, close_checkpointer
+from core.dispatcher import dispatcher
+from core.metrics import http_request_seconds, metrics, new_trace_id, trace_id_var
+from core.openai_client import close_async_client, get_async_client
+from core.static_assets import StaticAssetCache
+from core.store import form_service
+from core.tasks import background_tasks
+from core.workflow import get_embeddings, get_intake_workflow, intent_cache, llm_cache
+from config import settings
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, PlainTextResponse
+import asyncio
+import time
+
+
+def prewarm():
+    """Build the lazily created clients and graph before a request needs them.
+
+    Runs in a worker thread; a step that fails is logged and retried lazily
+    by the first request that needs it.
+    """
+    started = time.perf_counter()
+    steps = [
+        ("intake workflow", get_intake_workflow),
+        ("Google Sheets", form_service.get_sheets_service),
+        ("outbound transports", dispatcher.warm_up),
+    ]
+    if intent_cache is not None:
+        steps.append(("embeddings", get_embeddings))
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"Pre-warm of {name} failed: {str(e)}")
+    print(f"Pre-warm finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+# Index page and /static files, served from memory with gzip/brotli variants
+static_assets = StaticAssetCache("static", settings.STATIC_CHECK_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Replay Sheets writes a previous process left in the outbox
+    form_service.start()
+    # Read and precompress /static, then watch it for changes
+    await asyncio.to_thread(static_assets.load)
+    static_assets.start()
+    # The /chat OpenAI client and its connection pool live as long as the app;
+    # built in a thread because importing openai is slow, closed below
+    await asyncio.to_thread(get_async_client)
+    # Create the LLM clients, compiled graph and Sheets connection up front
+    # ("blocking") or while the first requests are served ("background")
+    if settings.STARTUP_PREWARM == "blocking":
+        await asyncio.to_thread(prewarm)
+    elif settings.STARTUP_PREWARM == "background":
+        app.state.prewarm = asyncio.create_task(asyncio.to_thread(prewarm))
+    # Deliver SMS and email replies from a background worker pool
+    dispatcher.start()
+    # Workers for SMS turns acknowledged before they run (SMS_FAST_ACK)
+    sms.sms_queue.start()
+    yield
+    static_assets.stop()
+    # Let debounced SMS turns and state writes detached from their replies
+    # finish; queued turns need the SMS workers, so those stop afterwards
+    await background_tasks.drain()
+    await sms.sms_queue.stop()
+    # Write conversation checkpoints still waiting to be flushed; this and the
+    # other blocking shutdown steps run in a thread, off the event loop
+    await asyncio.to_thread(close_checkpointer)
+    await dispatcher.stop()
+    # Close the /chat OpenAI client and its connection pool
+    await close_async_client()
+    # Flush any Sheets writes still waiting in the write-behind queue
+    await asyncio.to_thread(form_service.close)
+    if llm_cache is not None:
+        await asyncio.to_thread(llm_cache.close)
+    if intent_cache is not None:
+        await asyncio.to_thread(intent_cache.save)
+    if capture.traffic_recorder is not None:
+        await asyncio.to_thread(capture.traffic_recorder.close)
+
+
+# Components that keep their own counters are read at scrape time
+metrics.register_stats("sheets_client", lambda: form_service.sheets.stats)
+if form_service.write_behind is not None:
+    metrics.register_stats(
+        "sheets_write_behind",
+        lambda: {
+            **form_service.write_behind.stats,
+            "queue_depth": form_service.write_behind.queue_depth,
+        },
+    )
+metrics.register_stats(
+    "outbound_dispatcher",
+    lambda: {**dispatcher.stats, "queue_depth": dispatcher.queue_depth},
+)
+metrics.register_stats(
+    "sms_turn_queue",
+    lambda: {
+        **sms.sms_queue.stats,
+        "queue_depth": sms.sms_queue.queue_depth,
+        "busy_workers": sms.sms_queue.busy_workers,
+    },
+)
+metrics.register_stats(
+    "background_tasks",
+    lambda: {**background_tasks.stats, "in_flight": background_tasks.in_flight},
+)
+metrics.register_stats(
+    "workflow_checkpoints",
+    checkpointer_stats,
+)
+metrics.register_stats("static_assets", lambda: static_assets.stats)
+metrics.register_stats("sms_coalescer", lambda: sms.sms_turns.stats)
+metrics.register_stats("email_coalescer", lambda: gmail.email_turns.stats)
+if llm_cache is not None:
+    for prompt_name in llm_cache.stats:
+        metrics.register_stats(
+            f"llm_cache_{prompt_name}",
+            lambda prompt_name=prompt_name: llm_cache.stats[prompt_name],
+        )
+if intent_cache is not None:
+    metrics.register_stats(
+        "intent_cache", lambda: {**intent_cache.stats, "size": len(intent_cache)}
+    )
+if capture.traffic_recorder is not None:
+    metrics.register_stats("traffic_capture", lambda: capture.traffic_recorder.stats)
 
 app = FastAPI(
     title="Multi-Channel Intake System",
     description="A sophisticated multi-channel intake system for healthcare processing",
     version="1.0.0",
+    lifespan=lifespan,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -17,19 +145,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Tag the request with a trace ID (X-Request-ID) and record its latency."""
+    trace_id = request.headers.get("X-Request-ID") or new_trace_id()
+    token = trace_id_var.set(trace_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+        trace_id_var.reset(token)
+    response.headers["X-Request-ID"] = trace_id
+    return response
+
+
 app.include_router(sms.router, prefix="/sms", tags=["sms"])
 app.include_router(gmail.router, prefix="/gmail", tags=["gmail"])
 app.include_router(store.router, prefix="/store", tags=["store"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 
 
-@app.get("/", response_class=HTMLResponse)
-async def index():
-    with open("static/index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of latency, token, error and queue metrics."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def index(request: Request):
+    # Revalidated on every load (cheap 304s) so page changes show up at once
+    response = static_assets.response(request, "index.html", "no-cache")
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
+
 
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(request: Request, path: str):
+    response = static_assets.response(
+        request, path, f"public, max-age={settings.STATIC_MAX_AGE}"
+    )
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,40 +1,62 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
-import openai
+import asyncio
+import uuid
+from core.openai_client import get_async_client
 from core.prompts import SYSTEM_PROMPT
-from core.helpers import data_parse_from_chat, complete_reply, extract_json_from_reply
+from core.helpers import (
+    COMPLETE_REPLY_PREFIX,
+    JsonObjectScanner,
+    complete_reply,
+    data_parse_from_chat,
+)
 from core.store import form_service
 
 router = APIRouter()
 
 
+def chat_contact_info(body: dict) -> str:
+    """Contact key for a /chat submission's sheet row.
+
+    Sheets writes are upserted and coalesced per (intent, contact_info), so
+    every chat session needs its own key: the client's ``session_id`` when it
+    sends one, otherwise a fresh id for this request.
+    """
+    return f"chat-{body.get('session_id') or uuid.uuid4().hex}"
+
+
 @router.post("/")
 async def chat_endpoint(request: Request):
     body = await request.json()
     messages = body["messages"]
+    contact_info = chat_contact_info(body)
     if not any(msg.get("role") == "system" for msg in messages):
         messages = [{"role": "system", "content": SYSTEM_PROMPT}] + messages
 
-    client = openai.OpenAI(api_key=openai.api_key)
-    response = client.chat.completions.create(
+    client = get_async_client()
+    response = await client.chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         temperature=0.2,
         stream=True,
     )
 
-    def stream_generator():
-        collected = []
-        for chunk in response:
-            chunk_message = chunk.choices[0].delta.content
-            if chunk_message:
-                collected.append(chunk_message)
-                current_reply = "".join(collected)
-                complete_flag = complete_reply(current_reply)
+    async def stream_generator():
+        reply_prefix = ""
+        complete_flag = False
+        scanner = JsonObjectScanner()
+        try:
+            async for chunk in response:
+                chunk_message = chunk.choices[0].delta.content
+                if not chunk_message:
+                    continue
+                # Only the opening words decide whether this is the final reply.
+                if len(reply_prefix) < len(COMPLETE_REPLY_PREFIX):
+                    reply_prefix += chunk_message
+                    complete_flag = complete_reply(reply_prefix)
                 if not complete_flag:
                     yield chunk_message
-                collected_data = extract_json_from_reply(current_reply)
-                if collected_data:
+                for collected_data in scanner.feed(chunk_message):
                     print(collected_data)
                     if collected_data.get("intent") == "PRIVATE_PAY":
                         yield "\nThanks! We’ll prepare your quote and send a credit card form shortly to confirm."
@@ -42,11 +64,18 @@ async def chat_endpoint(request: Request):
                         yield "\nThank you! We’ll forward this to dispatch and confirm shortly."
                     elif collected_data.get("intent") == "DISCHARGE":
                         yield "\nGot it! Our dispatch team will review this now and follow up shortly."
-                    parsed_data = data_parse_from_chat(collected_data, "chat", "user")
-                    success = form_service.store_intake_data(
-                        parsed_data, collected_data.get("intent")
+                    parsed_data = data_parse_from_chat(
+                        collected_data, "chat", contact_info
+                    )
+                    success = await asyncio.to_thread(
+                        form_service.store_intake_data,
+                        parsed_data,
+                        collected_data.get("intent"),
                     )
                     if success:
                         print("State stored successfully.")
+        finally:
+            # Runs when the browser disconnects too: stop the upstream generation.
+            await response.close()
 
     return StreamingResponse(stream_generator(), media_type="text/plain")
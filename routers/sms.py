@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Request, HTTPException
-import asyncio
-from twilio.rest import Client
+from fastapi import APIRouter, Request, HTTPException, Response
+from twilio.request_validator import RequestValidator
 from config import settings
-from typing import Dict
-from core.workflow import intake_workflow, IntakeState
+from core import capture
+from core.dispatcher import dispatcher
+from core.tasks import background_tasks
+from core.coalescer import TurnCoalescer, merge_messages
+from core.turn_queue import TurnQueue
+from core.workflow import end_conversation, run_intake_turn
+import time
 
 router = APIRouter()
-twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
 
-# Store active SMS conversations
-active_sms: Dict[str, IntakeState] = {}
+# One workflow run at a time per phone number; bursts become a single turn
+sms_turns = TurnCoalescer(settings.INBOUND_DEBOUNCE)
+# Background workers for SMS_FAST_ACK mode
+sms_queue = TurnQueue(settings.SMS_WORKERS, settings.SMS_MAX_QUEUE)
+twilio_validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+
+EMPTY_TWIML = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+ERROR_REPLY = "I apologize, but I encountered an error. Please try again later."
 
 
 @router.post("/")
 async def handle_incoming_sms(request: Request):
     """Handle incoming SMS messages."""
-    response = ""
     form = await request.form()
     # Get the message details
     from_number = form.get("From")
@@ -24,28 +32,62 @@ async def handle_incoming_sms(request: Request):
 
     if not from_number or not message_body:
         raise HTTPException(status_code=400, detail="Missing required parameters")
+    # Checked before capture, so forged requests never reach the replay log
+    if settings.SMS_VALIDATE_SIGNATURE and not is_valid_twilio_request(request, form):
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    capture.record_inbound("sms", from_number, message_body)
+
+    if settings.SMS_FAST_ACK:
+        if not sms_queue.admit():
+            print(f"SMS queue full, rejecting message from {from_number}")
+            raise HTTPException(status_code=503, detail="Too many pending messages")
+        # Acknowledge right away. The burst is debounced outside the queue, so
+        # only running the turn (and texting the reply) takes a worker.
+        received_at = time.perf_counter()
+        background_tasks.spawn(
+            sms_turns.submit(
+                from_number,
+                message_body,
+                lambda messages: sms_queue.run(
+                    lambda: run_queued_sms_turn(from_number, messages), received_at
+                ),
+            ),
+            "sms_turn",
+        )
+        return Response(content=EMPTY_TWIML, media_type="application/xml")
 
-    # Initialize or get existing conversation state
-    if from_number not in active_sms:
-        active_sms[from_number] = IntakeState(
-            messages=[],
-            intent="",
-            required_fields=[],
-            collected_fields={},
-            contact_info=from_number,
-            channel="sms",
-            status="initialized",
+    try:
+        response = await sms_turns.submit(
+            from_number,
+            message_body,
+            lambda messages: run_sms_turn(from_number, messages),
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return response if response is not None else ""
+
+
+def is_valid_twilio_request(request: Request, form) -> bool:
+    """Check the X-Twilio-Signature header against the URL Twilio called."""
+    url = str(request.url)
+    if settings.SMS_WEBHOOK_URL:
+        url = settings.SMS_WEBHOOK_URL
+    return twilio_validator.validate(
+        url, dict(form), request.headers.get("X-Twilio-Signature", "")
+    )
 
-    # Update the state with the new message
-    state = active_sms[from_number]
-    state["messages"].append(("user", message_body))
 
+async def run_sms_turn(from_number: str, messages: list[str]):
+    """Run one workflow turn for the merged messages and text back the reply.
+
+    A failed turn ends the conversation and its exception propagates.
+    """
+    response = ""
     try:
-        # Run the workflow
+        # Run the workflow on the conversation's checkpointed state; the state
+        # is persisted after the reply goes out
         print("Run the workflow")
-        new_state = await asyncio.to_thread(intake_workflow.invoke, state)
-        active_sms[from_number] = new_state
+        new_state = await run_intake_turn("sms", from_number, merge_messages(messages))
 
         # Get the last assistant message
         last_message = next(
@@ -60,40 +102,60 @@ async def handle_incoming_sms(request: Request):
             print(f"JotForm required for {from_number}, sending link")
             # If JotForm is required, send the link
             response = last_message
-            del active_sms[from_number]
-            return
+            capture.record_outcome("sms", from_number, new_state["status"])
         elif new_state["status"] == "complete":
             # Handle completion
             if new_state["intent"] == "PRIVATE_PAY":
                 reply = "Thanks! We’ll prepare your quote and send a credit card form shortly to confirm."
-            elif new_state["intent"] == "INSURANCE_CASE_MANAGERS":
+            elif new_state["intent"] in ("CASE_MANAGER", "INSURANCE_CASE_MANAGERS"):
                 reply = "Thank you! We’ll forward this to dispatch and confirm shortly."
-            elif new_state["intent"] == "DISCHARGES":
+            elif new_state["intent"] in ("DISCHARGE", "DISCHARGES"):
                 reply = "Got it! Our dispatch team will review this now and follow up shortly."
+            else:
+                reply = last_message
             response = reply
-            # Clean up
-            del active_sms[from_number]
+            capture.record_outcome("sms", from_number, new_state["status"])
         else:
             # Continue the conversation
             response = last_message or "Could you please provide more information?"
-    except Exception as e:
-        response = "I apologize, but I encountered an error. Please try again later."
-        del active_sms[from_number]
-        raise HTTPException(status_code=500, detail=str(e))
+    except Exception:
+        await end_conversation("sms", from_number)
+        capture.record_outcome("sms", from_number, "error")
+        raise
     await send_sms(from_number, response)
     return response
 
 
-async def send_sms(to: str, message: str):
-    """Send an SMS message."""
-    print("Sending response message to:", to)
+async def run_queued_sms_turn(from_number: str, messages: list[str]):
+    """``run_sms_turn`` on a TurnQueue worker, where no HTTP request waits.
+
+    A failure is texted to the contact as an apology and re-raised for the
+    queue, which logs it and counts it in its ``errors`` stat.
+    """
     try:
-        message = twilio_client.messages.create(
-            body=message, from_=settings.TWILIO_PHONE_NUMBER, to=to
-        )
-        return {"status": "success", "message_sid": message.sid}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await run_sms_turn(from_number, messages)
+    except Exception:
+        await send_sms(from_number, ERROR_REPLY)
+        raise
+
+
+async def send_sms(to: str, message: str):
+    """Queue an SMS reply with the outbound dispatcher."""
+    print("Queueing response message to:", to)
+    message_id = await dispatcher.send("sms", to, message)
+    return {"status": "queued", "message_id": message_id}
+
+
+@router.get("/queue")
+async def sms_queue_stats():
+    """Queue depth and end-to-end turn latency for SMS_FAST_ACK mode."""
+    return {
+        "queue_depth": sms_queue.queue_depth,
+        "busy_workers": sms_queue.busy_workers,
+        "latency_p50_ms": sms_queue.latency_percentile(50),
+        "latency_p95_ms": sms_queue.latency_percentile(95),
+        **sms_queue.stats,
+    }
 
 
 @router.post("/status")
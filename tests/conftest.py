@@ -0,0 +1,9 @@
+import os
+
+# Offline defaults, set before config.py is imported by any test module.
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SHEETS_BACKEND", "local")
+os.environ.setdefault("SHEETS_OUTBOX_PATH", "")
+os.environ.setdefault("DISPATCH_TRANSPORT", "fake")
+os.environ.setdefault("STARTUP_PREWARM", "off")
+os.environ.setdefault("CAPTURE_PATH", "")
@@ -0,0 +1,51 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from types import SimpleNamespace
+from routers import chat
+import json
+
+SUMMARY = json.dumps({"intent": "DISCHARGE", "patient_name": "Ada", "weight": "150"})
+
+
+class FakeStream:
+    def __init__(self, text):
+        self.chunks = [text[i : i + 7] for i in range(0, len(text), 7)]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            delta = SimpleNamespace(content=chunk)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        pass
+
+
+def test_chat_sessions_get_their_own_sheet_key(monkeypatch):
+    async def create(**kwargs):
+        return FakeStream(f"Thanks, all set. {SUMMARY}")
+
+    completions = SimpleNamespace(create=create)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(chat, "get_async_client", lambda: client)
+    stored = []
+    monkeypatch.setattr(
+        chat.form_service,
+        "store_intake_data",
+        lambda data, intent: stored.append(data.contact_info) or True,
+    )
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    messages = [{"role": "user", "content": "hi"}]
+    with TestClient(app) as http:
+        for body in (
+            {"messages": messages},
+            {"messages": messages},
+            {"messages": messages, "session_id": "abc"},
+        ):
+            assert http.post("/chat/", json=body).status_code == 200
+    assert len(stored) == 3 and len(set(stored)) == 3
+    assert stored[2] == "chat-abc"
+    assert all(key.startswith("chat-") for key in stored)
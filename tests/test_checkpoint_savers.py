@@ -0,0 +1,151 @@
+"""Conformance of both checkpointers to LangGraph's BaseCheckpointSaver API."""
+
+from typing import Annotated, TypedDict
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.graph import StateGraph
+from core.checkpoints import LatestCheckpointSaver, SQLiteCheckpointSaver
+import operator
+import pytest
+import time
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def saver(request, tmp_path):
+    if request.param == "memory":
+        saver = LatestCheckpointSaver(3600)
+    else:
+        saver = SQLiteCheckpointSaver(3600, str(tmp_path / "ck.sqlite3"), 3600)
+    yield saver
+    saver.close()
+
+
+def thread(thread_id: str = "sms:+15550001", checkpoint_id: str | None = None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id is not None:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def put_state(saver, config, values: dict, step: int = 1):
+    checkpoint = create_checkpoint(empty_checkpoint(), None, step)
+    checkpoint["channel_values"] = values
+    return saver.put(config, checkpoint, {"step": step, "source": "loop"}, {})
+
+
+def test_missing_thread(saver):
+    assert saver.get_tuple(thread()) is None
+    assert list(saver.list(thread())) == []
+
+
+def test_put_and_get_tuple(saver):
+    first = put_state(saver, thread(), {"intent": "PRIVATE_PAY"})
+    second = put_state(saver, first, {"intent": "DISCHARGE"}, step=2)
+    found = saver.get_tuple(thread())
+    assert found.config == second
+    assert found.checkpoint["channel_values"] == {"intent": "DISCHARGE"}
+    assert found.metadata == {"step": 2, "source": "loop"}
+    assert found.parent_config == first
+    # Only the latest checkpoint is kept.
+    assert saver.get_tuple(second) is not None
+    assert saver.get_tuple(first) is None
+
+
+def test_put_writes(saver):
+    config = put_state(saver, thread(), {"intent": ""})
+    saver.put_writes(config, [("intent", "DISCHARGE"), ("status", "x")], "task-1")
+    # A repeated write of the same task and index is ignored.
+    saver.put_writes(config, [("intent", "PRIVATE_PAY")], "task-1")
+    found = saver.get_tuple(thread())
+    assert found.pending_writes == [
+        ("task-1", "intent", "DISCHARGE"),
+        ("task-1", "status", "x"),
+    ]
+    # Writes belong to their checkpoint and are dropped with it.
+    put_state(saver, config, {"intent": "DISCHARGE"}, step=2)
+    assert saver.get_tuple(thread()).pending_writes == []
+
+
+def test_list(saver):
+    put_state(saver, thread("sms:1"), {"n": 1})
+    put_state(saver, thread("sms:2"), {"n": 2}, step=5)
+    assert [t.checkpoint["channel_values"] for t in saver.list(thread("sms:1"))] == [
+        {"n": 1}
+    ]
+    everything = sorted(
+        found.config["configurable"]["thread_id"] for found in saver.list(None)
+    )
+    assert everything == ["sms:1", "sms:2"]
+    filtered = list(saver.list(None, filter={"step": 5}))
+    assert [found.config["configurable"]["thread_id"] for found in filtered] == [
+        "sms:2"
+    ]
+    assert list(saver.list(thread("sms:1"), limit=0)) == []
+    assert list(saver.list(thread("sms:1"), before=thread("sms:1", "x"))) == []
+
+
+def test_delete_thread(saver):
+    put_state(saver, thread(), {"n": 1})
+    saver.delete_thread("sms:+15550001")
+    assert saver.get_tuple(thread()) is None
+    if isinstance(saver, SQLiteCheckpointSaver):
+        saver.flush()
+        assert saver.get_tuple(thread()) is None
+
+
+def test_expired_threads(saver):
+    saver.ttl = 0.05
+    put_state(saver, thread(), {"n": 1})
+    time.sleep(0.1)
+    assert saver.get_tuple(thread()) is None
+    assert saver.sweep() >= 1
+
+
+@pytest.mark.asyncio
+async def test_async_api(saver):
+    checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+    checkpoint["channel_values"] = {"n": 1}
+    config = await saver.aput(thread(), checkpoint, {"step": 1}, {})
+    await saver.aput_writes(config, [("n", 2)], "task-1")
+    found = await saver.aget_tuple(thread())
+    assert found.checkpoint["channel_values"] == {"n": 1}
+    assert found.pending_writes == [("task-1", "n", 2)]
+    assert [found.config async for found in saver.alist(thread())] == [config]
+    assert await saver.acommit(config)
+    await saver.adelete_thread("sms:+15550001")
+    assert await saver.aget_tuple(thread()) is None
+
+
+def test_sqlite_checkpoints_survive_a_restart(tmp_path):
+    path = str(tmp_path / "ck.sqlite3")
+    saver = SQLiteCheckpointSaver(3600, path, 3600)
+    config = put_state(saver, thread(), {"n": 1})
+    assert saver.threads_in_memory == 1
+    saver.close()
+    reopened = SQLiteCheckpointSaver(3600, path, 3600)
+    found = reopened.get_tuple(thread())
+    assert found.config == config
+    assert found.checkpoint["channel_values"] == {"n": 1}
+    reopened.close()
+
+
+class Turns(TypedDict):
+    messages: Annotated[list, operator.add]
+
+
+def test_graph_resumes_from_the_saver(saver):
+    graph = StateGraph(Turns)
+    graph.add_node(
+        "reply", lambda state: {"messages": [f"reply {len(state['messages'])}"]}
+    )
+    graph.set_entry_point("reply")
+    graph.set_finish_point("reply")
+    app = graph.compile(checkpointer=saver)
+    config = thread()
+    app.invoke({"messages": ["hi"]}, config)
+    # The second turn only passes its message; the rest is resumed.
+    assert app.invoke({"messages": ["bye"]}, config)["messages"] == [
+        "hi",
+        "reply 1",
+        "bye",
+        "reply 3",
+    ]
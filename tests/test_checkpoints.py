@@ -0,0 +1,90 @@
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from core.checkpoints import SQLiteCheckpointSaver
+import pytest
+
+
+def thread(thread_id: str = "sms:+15550001") -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+def put_state(saver, config, values: dict, step: int = 1) -> dict:
+    checkpoint = create_checkpoint(empty_checkpoint(), None, step)
+    checkpoint["channel_values"] = values
+    return saver.put(config, checkpoint, {"step": step}, {})
+
+
+def values(saver, config) -> dict | None:
+    found = saver.get_tuple(config)
+    return found.checkpoint["channel_values"] if found is not None else None
+
+
+@pytest.fixture
+def two_workers(tmp_path):
+    """Two savers sharing one database, like two uvicorn workers on a host."""
+    path = str(tmp_path / "checkpoints.sqlite3")
+    # A long flush interval keeps the background flusher out of the way.
+    first = SQLiteCheckpointSaver(3600, path, 3600)
+    second = SQLiteCheckpointSaver(3600, path, 3600)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_concurrent_turns_on_one_thread_conflict(two_workers):
+    first, second = two_workers
+    config = thread()
+    put_state(first, config, {"turn": 0})
+    assert first.commit(config)
+
+    # Both workers resume the thread from the same checkpoint...
+    assert values(first, config) == values(second, config) == {"turn": 0}
+    put_state(first, config, {"turn": "first"})
+    put_state(second, config, {"turn": "second"})
+
+    # ...the first commit wins and the second turn must run again.
+    assert first.commit(config)
+    assert not second.commit(config)
+    assert second.stats["conflicts"] == 1
+    assert values(second, config) == {"turn": "first"}
+
+    # Re-run on the newer state, the second turn commits.
+    put_state(second, config, {"turn": "second again"}, step=2)
+    assert second.commit(config)
+    assert values(first, config) == {"turn": "second again"}
+
+
+def test_new_thread_created_by_both_workers(two_workers):
+    first, second = two_workers
+    config = thread("email:jane@example.com")
+    assert values(first, config) is None and values(second, config) is None
+    put_state(first, config, {"by": "first"})
+    put_state(second, config, {"by": "second"})
+    assert second.commit(config)
+    assert not first.commit(config)
+    assert values(first, config) == {"by": "second"}
+
+
+def test_delete_of_a_thread_advanced_elsewhere_conflicts(two_workers):
+    first, second = two_workers
+    config = thread()
+    put_state(first, config, {"turn": 0})
+    first.commit(config)
+    values(first, config)
+    values(second, config)
+    put_state(second, config, {"turn": 1})
+    assert second.commit(config)
+    first.delete_thread(config["configurable"]["thread_id"])
+    assert not first.commit(config)
+    assert values(first, config) == {"turn": 1}
+
+
+def test_workers_taking_turns_never_conflict(two_workers):
+    first, second = two_workers
+    config = thread()
+    for turn in range(4):
+        worker = (first, second)[turn % 2]
+        values(worker, config)
+        put_state(worker, config, {"turn": turn}, step=turn)
+        assert worker.commit(config)
+    assert first.stats["conflicts"] == second.stats["conflicts"] == 0
+    assert values(first, config) == {"turn": 3}
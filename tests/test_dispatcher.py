@@ -0,0 +1,84 @@
+from core.dispatcher import FakeTransport, OutboundDispatcher
+import asyncio
+import pytest
+
+
+class PermanentFailure(FakeTransport):
+    def is_retryable(self, error: Exception) -> bool:
+        return False
+
+
+async def result_of(dispatcher: OutboundDispatcher, message_id: str):
+    while dispatcher.result(message_id) is None:
+        await asyncio.sleep(0.005)
+    return dispatcher.result(message_id)
+
+
+def dispatcher_for(transports, **options) -> OutboundDispatcher:
+    options = {"workers": 2, "retry_base_delay": 0.01, "max_attempts": 4, **options}
+    return OutboundDispatcher(transports, **options)
+
+
+@pytest.mark.asyncio
+async def test_sends_through_the_transport():
+    sms = FakeTransport()
+    dispatcher = dispatcher_for({"sms": sms})
+    dispatcher.start()
+    message_id = await dispatcher.send("sms", "+15550001", "Hello")
+    result = await result_of(dispatcher, message_id)
+    await dispatcher.stop()
+    assert (result.status, result.attempts, result.provider_id) == ("sent", 1, "fake-1")
+    assert [(m.to, m.body) for m in sms.sent] == [("+15550001", "Hello")]
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_are_retried():
+    sms = FakeTransport(failures=2)
+    dispatcher = dispatcher_for({"sms": sms})
+    dispatcher.start()
+    result = await result_of(dispatcher, await dispatcher.send("sms", "+1555", "Hi"))
+    await dispatcher.stop()
+    assert (result.status, result.attempts) == ("sent", 3)
+    assert dispatcher.stats["retries"] == 2 and len(sms.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts():
+    dispatcher = dispatcher_for({"sms": FakeTransport(failures=10)}, max_attempts=2)
+    dispatcher.start()
+    result = await result_of(dispatcher, await dispatcher.send("sms", "+1555", "Hi"))
+    await dispatcher.stop()
+    assert (result.status, result.attempts) == ("failed", 2)
+    assert result.error == "fake transport failure"
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_fail_at_once():
+    dispatcher = dispatcher_for({"sms": PermanentFailure(failures=1)})
+    dispatcher.start()
+    result = await result_of(dispatcher, await dispatcher.send("sms", "+1555", "Hi"))
+    await dispatcher.stop()
+    assert (result.status, result.attempts) == ("failed", 1)
+    assert dispatcher.stats["retries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_paces_a_channel_without_delaying_others():
+    sms, email = FakeTransport(), FakeTransport()
+    dispatcher = dispatcher_for(
+        {"sms": sms, "email": email}, rate_limits={"sms": 20, "email": 0}
+    )
+    dispatcher.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sms_ids = [await dispatcher.send("sms", "+1555", f"#{i}") for i in range(6)]
+    email_id = await dispatcher.send("email", "a@example.com", "Hi", "Subject")
+    await result_of(dispatcher, email_id)
+    email_done = loop.time() - started
+    for message_id in sms_ids:
+        await result_of(dispatcher, message_id)
+    sms_done = loop.time() - started
+    await dispatcher.stop()
+    # One token up front, then one every 50 ms.
+    assert sms_done >= 0.25
+    assert email_done < 0.05
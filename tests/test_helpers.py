@@ -0,0 +1,55 @@
+from core.helpers import JsonObjectScanner
+import json
+import pytest
+
+REPLY = (
+    'Thanks! Here is the summary: {"patient_name": "Jane \\"JJ\\" Doe", '
+    '"notes": "needs {wheelchair} \\\\ oxygen", "stops": {"pickup": "1 Main St"}}'
+    ' and a second one {"intent": "DISCHARGE"} done'
+)
+EXPECTED = [
+    {
+        "patient_name": 'Jane "JJ" Doe',
+        "notes": "needs {wheelchair} \\ oxygen",
+        "stops": {"pickup": "1 Main St"},
+    },
+    {"intent": "DISCHARGE"},
+]
+
+
+def scan(chunks) -> list:
+    scanner = JsonObjectScanner()
+    return [found for chunk in chunks for found in scanner.feed(chunk)]
+
+
+def test_whole_reply():
+    assert scan([REPLY]) == EXPECTED
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_fixed_size_chunks(size):
+    chunks = [REPLY[i : i + size] for i in range(0, len(REPLY), size)]
+    assert scan(chunks) == EXPECTED
+
+
+def test_every_split_point():
+    # Splits inside strings, right after a backslash and between braces.
+    for cut in range(len(REPLY) + 1):
+        assert scan([REPLY[:cut], REPLY[cut:]]) == EXPECTED, cut
+
+
+def test_objects_are_returned_once_as_they_complete():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('{"a": 1') == []
+    assert scanner.feed("}") == [{"a": 1}]
+    assert scanner.feed(" trailing text") == []
+
+
+def test_invalid_and_non_object_json_is_skipped():
+    assert scan(['{"a": } [1, 2] {"b": 2}']) == [{"b": 2}]
+
+
+def test_matches_json_loads_on_generated_objects():
+    objects = [{"n": i, "s": "x" * i + '"{}\\'} for i in range(20)]
+    text = " ".join(json.dumps(o) for o in objects)
+    assert scan([text[i : i + 5] for i in range(0, len(text), 5)]) == objects
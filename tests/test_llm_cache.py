@@ -0,0 +1,39 @@
+from core.llm_cache import LLMResponseCache
+import time
+
+
+def disk_keys(cache: LLMResponseCache) -> set:
+    with cache._db_lock:
+        return {key for (key,) in cache._conn.execute("SELECT key FROM llm_cache")}
+
+
+def test_purge_deletes_only_expired_rows(tmp_path):
+    cache = LLMResponseCache(["intent"], 10, ttl=0.05, path=str(tmp_path / "c.db"))
+    cache.set("old", "PRIVATE_PAY")
+    cache.ttl = 60
+    cache.set("new", "DISCHARGE")
+    cache.flush()
+    time.sleep(0.1)
+    assert cache.purge_expired() == 1
+    assert disk_keys(cache) == {"new"}
+    cache.close()
+
+
+def test_flusher_purges_expired_rows(tmp_path):
+    cache = LLMResponseCache(
+        ["intent"],
+        10,
+        ttl=0.01,
+        path=str(tmp_path / "c.db"),
+        flush_interval=0.01,
+        purge_interval=0.05,
+    )
+    cache.set("old", "PRIVATE_PAY")
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and not disk_keys(cache):
+        time.sleep(0.01)
+    assert disk_keys(cache) == {"old"}
+    while time.monotonic() < deadline and disk_keys(cache):
+        time.sleep(0.01)
+    assert disk_keys(cache) == set()
+    cache.close()
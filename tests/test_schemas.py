@@ -0,0 +1,52 @@
+from core.schemas import FieldSpec, IntakeSchema, normalize_column
+import pytest
+
+
+@pytest.fixture
+def schema():
+    return IntakeSchema(
+        "TEST_INTAKE",
+        "TEST",
+        [
+            FieldSpec("patient_name", "Full name", "patient name"),
+            FieldSpec("weight", "Weight", "patient weight"),
+        ],
+    )
+
+
+@pytest.fixture
+def record(schema):
+    return schema.record_type(
+        "sms", "+1555", "Ada", "150", "2026-01-01T00:00:00", "pending"
+    )
+
+
+def test_projection_follows_the_header_order(schema, record):
+    header = ["status", "Weight", "Contact_Info", "patient_name"]
+    project = schema.projection(normalize_column(name) for name in header)
+    assert project(record) == ["pending", "150", "+1555", "Ada"]
+
+
+def test_projection_leaves_unknown_columns_blank(schema, record):
+    project = schema.projection(["patient_name", "notes", "weight", "extra"])
+    assert project(record) == ["Ada", "", "150", ""]
+
+
+def test_projection_of_one_or_no_columns(schema, record):
+    assert schema.projection(["weight"])(record) == ["150"]
+    assert schema.projection(["notes"])(record) == [""]
+    assert schema.projection([])(record) == []
+
+
+def test_projection_is_cached_per_header(schema):
+    first = schema.projection(["channel", "weight"])
+    assert schema.projection(iter(["channel", "weight"])) is first
+    assert schema.projection(["weight", "channel"]) is not first
+
+
+def test_project_matches_the_schema_header(schema, record):
+    header = [normalize_column(name) for name in schema.header]
+    assert schema.project(record, header) == list(record.values()[:-1])
+    assert schema.project(record, header) == [
+        record.as_dict()[column] for column in schema.columns
+    ]
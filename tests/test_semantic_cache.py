@@ -0,0 +1,39 @@
+from core.semantic_cache import SemanticIntentCache
+import numpy as np
+
+VECTORS = {
+    "ride home": [1.0, 0.0, 0.0],
+    "insurance": [0.0, 1.0, 0.0],
+    "discharge": [0.0, 0.0, 1.0],
+    "quote": [1.0, 1.0, 0.0],
+}
+
+
+def open_cache(path) -> SemanticIntentCache:
+    return SemanticIntentCache(VECTORS.get, threshold=0.99, max_size=4, path=path)
+
+
+def test_load_compacts_slots_changed_since_the_last_save(tmp_path):
+    path = str(tmp_path / "intents.npy")
+    cache = open_cache(path)
+    cache.confirm("ride home", "PRIVATE_PAY")
+    cache.confirm("insurance", "INSURANCE_CASE_MANAGERS")
+    cache.confirm("discharge", "DISCHARGE")
+    cache.save()
+    # An eviction rewrote the middle row, then the process died before saving.
+    vectors = np.load(path, mmap_mode="r+")
+    vectors[1] = [0.6, 0.0, 0.8]
+    vectors.flush()
+    del vectors, cache
+
+    cache = open_cache(path)
+    assert len(cache) == 2
+    assert cache.lookup("ride home") == "PRIVATE_PAY"
+    assert cache.lookup("discharge") == "DISCHARGE"
+    assert cache.lookup("insurance") is None
+    cache.confirm("quote", "PRIVATE_PAY")
+    assert len(cache) == 3 and cache.stats["evictions"] == 0
+
+    # The compacted layout was saved, so it loads cleanly again.
+    cache.save()
+    assert len(open_cache(path)) == 3
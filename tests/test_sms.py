@@ -0,0 +1,76 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from config import settings
+from core import capture
+from core.coalescer import TurnCoalescer
+from core.turn_queue import TurnQueue
+from routers import sms
+import asyncio
+import pytest
+
+
+def test_forged_webhook_is_rejected_before_capture(monkeypatch, tmp_path):
+    recorder = capture.TrafficRecorder(str(tmp_path / "capture.jsonl"))
+    monkeypatch.setattr(capture, "traffic_recorder", recorder)
+    monkeypatch.setattr(settings, "SMS_VALIDATE_SIGNATURE", True)
+    app = FastAPI()
+    app.include_router(sms.router, prefix="/sms")
+    with TestClient(app) as client:
+        response = client.post(
+            "/sms/",
+            data={"From": "+15550001", "Body": "hello"},
+            headers={"X-Twilio-Signature": "forged"},
+        )
+    recorder.close()
+    assert response.status_code == 403
+    assert recorder.stats["messages"] == 0
+    assert (tmp_path / "capture.jsonl").read_text() == ""
+
+
+@pytest.mark.asyncio
+async def test_failed_background_turn_texts_an_apology(monkeypatch):
+    sent = []
+
+    async def failing_turn(*args):
+        raise RuntimeError("LLM unavailable")
+
+    async def forget(*args):
+        pass
+
+    async def send_sms(to, message):
+        sent.append((to, message))
+
+    monkeypatch.setattr(sms, "run_intake_turn", failing_turn)
+    monkeypatch.setattr(sms, "end_conversation", forget)
+    monkeypatch.setattr(sms, "send_sms", send_sms)
+    queue = TurnQueue(1, 10)
+    queue.start()
+    result = await queue.run(lambda: sms.run_queued_sms_turn("+15550001", ["hello"]))
+    await queue.stop()
+    assert result is None
+    assert sent == [("+15550001", sms.ERROR_REPLY)]
+    assert queue.stats["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_debounce_does_not_hold_queue_workers(monkeypatch):
+    """A burst of contacts debounces concurrently even with a single worker."""
+    queue = TurnQueue(1, 10)
+    coalescer = TurnCoalescer(0.2)
+    queue.start()
+
+    async def turn():
+        return "reply"
+
+    started = asyncio.get_running_loop().time()
+    results = await asyncio.gather(
+        *(
+            coalescer.submit(f"+1555000{i}", "hi", lambda _: queue.run(turn))
+            for i in range(5)
+        )
+    )
+    elapsed = asyncio.get_running_loop().time() - started
+    await queue.stop()
+    assert results == ["reply"] * 5
+    # Debounced inside the workers, five contacts would take 5 x 0.2 s.
+    assert elapsed < 0.5
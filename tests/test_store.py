@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+from core.local_sheets import LocalSpreadsheet
+from core.schemas import get_schema
+from core.store import ContactRowIndex
+import gspread
+import pytest
+
+PRIVATE_PAY = get_schema("PRIVATE_PAY")
+
+
+class NoHeaderReads:
+    """Worksheet proxy that fails any read of the header row."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def row_values(self, row):
+        raise AssertionError("header re-read")
+
+    def batch_get(self, ranges, major_dimension="ROWS"):
+        raise AssertionError("header re-read")
+
+
+@pytest.fixture
+def worksheet(tmp_path):
+    spreadsheet = LocalSpreadsheet(str(tmp_path / "sheets.json"))
+    return spreadsheet.worksheet(PRIVATE_PAY.sheet)
+
+
+def test_resync_reads_only_the_contact_column(worksheet):
+    index = ContactRowIndex(worksheet, ttl=0)
+    index.load()
+    worksheet.append_rows([["sms", "+1"], ["sms", "+2"]])
+    index.worksheet = NoHeaderReads(worksheet)
+    index.resync()
+    assert index.rows == {"+1": 2, "+2": 3}
+    assert index.last_row == 3
+    assert index.stats == {"loads": 1, "resyncs": 1, "drifts": 0}
+
+
+def test_resync_reloads_the_header_when_the_column_moved(worksheet):
+    index = ContactRowIndex(worksheet, ttl=0)
+    index.load()
+    header = list(reversed(PRIVATE_PAY.header))
+    worksheet.update("1:1", [header])
+    worksheet.append_rows([[""] * (len(header) - 2) + ["+1", "sms"]])
+    index.resync()
+    assert index.contact_col == len(header) - 1
+    assert index.rows == {"+1": 2}
+    assert index.stats["loads"] == 2
+
+
+def test_resync_reloads_the_header_on_a_bad_range(worksheet):
+    index = ContactRowIndex(worksheet, ttl=0)
+    index.load()
+    worksheet.append_rows([["sms", "+1"]])
+    error = {"error": {"code": 400, "message": "Range exceeds grid limits"}}
+    calls = []
+
+    def col_values(col):
+        calls.append(col)
+        if len(calls) == 1:
+            raise gspread.exceptions.APIError(SimpleNamespace(json=lambda: error))
+        return worksheet.col_values(col)
+
+    index.worksheet = SimpleNamespace(
+        col_values=col_values, row_values=worksheet.row_values
+    )
+    index.resync()
+    assert index.rows == {"+1": 2}
+    assert index.stats["loads"] == 2
@@ -0,0 +1,21 @@
+from core import workflow
+from core.checkpoints import LatestCheckpointSaver
+import pytest
+
+
+class EmptyGraph:
+    """A compiled graph stand-in whose run yields no state at all."""
+
+    checkpointer = LatestCheckpointSaver(60)
+
+    async def astream(self, *args, **kwargs):
+        return
+        yield
+
+
+@pytest.mark.asyncio
+async def test_turn_without_state_raises_an_exception(monkeypatch):
+    monkeypatch.setattr(workflow, "get_intake_workflow", lambda mode: EmptyGraph())
+    with pytest.raises(RuntimeError, match="produced no state"):
+        await workflow.run_intake_turn("sms", "+15550001", "hello")
+    assert "sms:+15550001" not in workflow._thread_runs
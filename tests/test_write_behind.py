@@ -0,0 +1,164 @@
+from config import settings
+from core.outbox import SheetsOutbox
+from core.schemas import get_schema, normalize_column
+from core.store import FormService
+from core.write_behind import SheetsWriteBehind
+import os
+import pytest
+
+PRIVATE_PAY = get_schema("PRIVATE_PAY")
+
+
+def row(contact_info: str, **fields) -> object:
+    return PRIVATE_PAY.record("sms", contact_info, fields, "in_progress")
+
+
+def write_behind(flush_rows, outbox=None, **options) -> SheetsWriteBehind:
+    # No backoff, and a drainer that never flushes on its own: tests call flush().
+    options = {
+        "batch_size": 1000,
+        "flush_interval": 3600,
+        "retry_base_delay": 0,
+        "compact_interval": 0,
+        **options,
+    }
+    return SheetsWriteBehind(flush_rows, outbox, **options)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return SheetsOutbox(str(tmp_path / "outbox.sqlite3"))
+
+
+@pytest.fixture
+def sheets(tmp_path, monkeypatch):
+    """A FormService writing synchronously to a LocalSpreadsheet."""
+    monkeypatch.setattr(settings, "SHEETS_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_SHEETS_PATH", str(tmp_path / "sheets.json"))
+    monkeypatch.setattr(settings, "SHEETS_WRITE_BEHIND", False)
+    return FormService()
+
+
+def sheet_rows(service: FormService) -> list:
+    """Data rows of the PRIVATE_PAY worksheet as dicts keyed by column."""
+    values = service.sheets.worksheet(PRIVATE_PAY.sheet).get_all_values()
+    header = [normalize_column(name) for name in values[0]]
+    return [dict(zip(header, line)) for line in values[1:]]
+
+
+def test_rows_of_a_contact_coalesce_into_one_upsert(sheets):
+    batches = []
+
+    def flush_rows(intent, rows):
+        batches.append(len(rows))
+        return sheets._store_rows_in_sheets(intent, rows)
+
+    stage = write_behind(flush_rows)
+    stage.submit(row("+15550001", patient_name="Jane"), "PRIVATE_PAY")
+    stage.submit(row("+15550002", patient_name="Joe"), "PRIVATE_PAY")
+    stage.submit(row("+15550001", patient_name="Jane", weight="150"), "PRIVATE_PAY")
+    stage.flush()
+    stage.submit(row("+15550001", patient_name="Jane", weight="155"), "PRIVATE_PAY")
+    stage.stop()
+    assert batches == [2, 1]
+    assert stage.stats["coalesced"] == 1
+    rows = sheet_rows(sheets)
+    # The later flush updated the contact's row instead of appending one.
+    assert sorted((r["contact_info"], r["weight"]) for r in rows) == [
+        ("+15550001", "155"),
+        ("+15550002", ""),
+    ]
+
+
+def test_failed_flush_is_retried(sheets):
+    failures = [True]
+
+    def flush_rows(intent, rows):
+        if failures and failures.pop():
+            return False
+        return sheets._store_rows_in_sheets(intent, rows)
+
+    stage = write_behind(flush_rows)
+    stage.submit(row("+15550001", patient_name="Jane"), "PRIVATE_PAY")
+    stage.flush()
+    assert stage.queue_depth == 1 and sheet_rows(sheets) == []
+    stage.flush()
+    stage.stop()
+    assert stage.stats["retries"] == 1 and stage.stats["flush_errors"] == 1
+    assert [r["patient_name"] for r in sheet_rows(sheets)] == ["Jane"]
+
+
+def test_outbox_rows_are_replayed_after_a_restart(sheets, outbox):
+    # Sheets is down for the whole life of the first process.
+    down = write_behind(lambda intent, rows: False, outbox, retry_base_delay=60)
+    down.submit(row("+15550001", patient_name="Jane"), "PRIVATE_PAY")
+    down.submit(row("+15550002", patient_name="Joe"), "PRIVATE_PAY")
+    down.stop()
+    assert len(outbox) == 2
+
+    restarted = write_behind(sheets._store_rows_in_sheets, outbox)
+    restarted.start()
+    assert restarted.stats["replayed"] == 2
+    # Replayed rows keep their backoff; force past it.
+    restarted.flush(force=True)
+    restarted.stop()
+    assert len(outbox) == 0
+    assert sorted(r["patient_name"] for r in sheet_rows(sheets)) == ["Jane", "Joe"]
+
+
+def test_rows_out_of_attempts_are_dead_lettered(outbox):
+    stage = write_behind(lambda intent, rows: False, outbox, max_attempts=3)
+    stage.submit(row("+15550001"), "PRIVATE_PAY")
+    for _ in range(3):
+        stage.flush()
+    stage.stop()
+    assert len(outbox) == 0
+    [(_, intent, data, attempts)] = outbox.dead_letters()
+    assert (intent, data["contact_info"], attempts) == ("PRIVATE_PAY", "+15550001", 3)
+    assert stage.stats["dead_lettered"] == 1
+
+
+def test_rows_out_of_attempts_are_dropped_without_outbox():
+    stage = write_behind(lambda intent, rows: False, max_attempts=2)
+    stage.submit(row("+15550001"), "PRIVATE_PAY")
+    stage.flush()
+    stage.flush()
+    stage.stop()
+    assert stage.queue_depth == 0
+    assert stage.stats["dropped"] == 1
+
+
+def test_a_poison_row_does_not_take_its_batch_down(outbox):
+    written = []
+
+    def flush_rows(intent, rows):
+        if any(r.contact_info == "poison" for r in rows):
+            return False
+        written.extend(r.contact_info for r in rows)
+        return True
+
+    stage = write_behind(flush_rows, outbox, max_attempts=3)
+    stage.submit(row("poison"), "PRIVATE_PAY")
+    stage.submit(row("+15550001"), "PRIVATE_PAY")
+    for _ in range(3):
+        stage.flush()
+    stage.stop()
+    # The good row was batched with the poison one until its last attempt.
+    assert written == ["+15550001"]
+    assert [data["contact_info"] for _, _, data, _ in outbox.dead_letters()] == [
+        "poison"
+    ]
+    assert len(outbox) == 0
+
+
+def test_compact_reclaims_acknowledged_rows(outbox):
+    ids = [
+        outbox.append("PRIVATE_PAY", {"contact_info": str(i), "notes": "x" * 2000})
+        for i in range(400)
+    ]
+    size = os.path.getsize(outbox.path)
+    assert not outbox.compact()
+    outbox.ack(ids)
+    assert outbox.compact()
+    assert os.path.getsize(outbox.path) < size / 4
+    assert outbox.stats["compactions"] == 1